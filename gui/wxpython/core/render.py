@@ -15,6 +15,7 @@ Classes:
  - render::Layer
  - render::MapLayer
  - render::Overlay
+ - render::RenderCache
  - render::Map
 
 (C) 2006-2014 by the GRASS Development Team
@@ -32,11 +33,20 @@ import sys
 import glob
 import math
 import copy
+import shutil
 import tempfile
 import types
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 
 import wx
 
+try:
+    import numpy as np
+    hasNumPy = True
+except ImportError:
+    hasNumPy = False
+
 from grass.script import core as grass
 from grass.script.utils import try_remove
 from grass.pydispatch.signal import Signal
@@ -51,6 +61,95 @@ from core.settings import UserSettings
 
 USE_GPNMCOMP = True
 
+#: maximum number of rendered layers kept by the render cache
+RENDER_CACHE_SIZE = 32
+
+#: d.vect parameters which make the image depend on the attributes, the
+#: layers using them are not cached
+ATTR_PARAMS = ('where', 'rgb_column', 'size_column', 'rot_column',
+               'attribute_column', 'width_column', 'zcolor')
+
+
+def ReadPnm(filename, width, height, components):
+    """Read a binary PPM or PGM image (as written by the display drivers)
+
+    :param filename: image file name
+    :param width: expected image width
+    :param height: expected image height
+    :param components: 3 for PPM, 1 for PGM
+
+    :return: array of unsigned bytes with shape (height, width, components)
+    """
+    fd = open(filename, 'rb')
+    try:
+        header = []
+        while len(header) < 4:
+            line = fd.readline()
+            if not line:
+                raise GException(_("Invalid PNM file <%s>") % filename)
+            if line.startswith('#'):
+                continue
+            header.extend(line.split())
+        magic, ncols, nrows, maxval = header[:4]
+        if magic not in ('P5', 'P6') or \
+                (magic == 'P6') != (components == 3):
+            raise GException(_("Unsupported PNM file <%s>") % filename)
+        if int(ncols) != width or int(nrows) != height:
+            raise GException(_("Expecting %(w)dx%(h)d image but got "
+                               "%(c)sx%(r)s image.") % {'w': width, 'h': height,
+                                                        'c': ncols, 'r': nrows})
+        data = np.fromfile(fd, dtype=np.uint8,
+                           count=width * height * components)
+    finally:
+        fd.close()
+    if data.size != width * height * components:
+        raise GException(_("Invalid PNM file <%s>") % filename)
+    data = data.reshape((height, width, components))
+    maxval = int(maxval)
+    if maxval != 255:
+        data = (data.astype(np.uint16) * 255 // maxval).astype(np.uint8)
+    return data
+
+
+def CompositeImages(maps, masks, opacities, bgcolor, width, height, output):
+    """Composite PPM images with their masks and opacities into a PPM
+    image, the result is the same of g.pnmcomp
+
+    :param maps: list of PPM files (from bottom to top)
+    :param masks: list of PGM mask files, a missing mask means an
+                  opaque image
+    :param opacities: list of opacities <0;1>
+    :param bgcolor: background color as (r, g, b) tuple
+    :param width: image width
+    :param height: image height
+    :param output: output PPM file
+    """
+    out = np.empty((height, width, 3), dtype=np.uint8)
+    out[:] = bgcolor[:3]
+    for mapfile, maskfile, opacity in zip(maps, masks, opacities):
+        image = ReadPnm(mapfile, width, height, 3)
+        if not maskfile or not os.path.exists(maskfile):
+            out[:] = image
+            continue
+        mask = ReadPnm(maskfile, width, height, 1).astype(np.uint16)
+        opacity = float(opacity)
+        if opacity == 1.0:
+            blended = (out * (255 - mask) + image * mask) // 255
+        else:
+            # same rounding of g.pnmcomp
+            alpha = (mask.astype(np.float32) *
+                     np.float32(opacity)).astype(np.uint16)
+            blended = (out * (255 - alpha) + image * alpha) // 256
+            blended[(mask == 0)[:, :, 0]] = out[(mask == 0)[:, :, 0]]
+        out = blended.astype(np.uint8)
+
+    fd = open(output, 'wb')
+    try:
+        fd.write('P6\n%d %d\n255\n' % (width, height))
+        out.tofile(fd)
+    finally:
+        fd.close()
+
 
 class Layer(object):
     """Virtual class which stores information about layers (map layers and
@@ -389,6 +488,194 @@ class Overlay(Layer):
                        active, hidden, opacity)
         self.id = id
 
+class RenderCache(object):
+    def __init__(self, size=RENDER_CACHE_SIZE):
+        """Cache of the images of the rendered map layers
+
+        The images are stored in a temporary directory and identified by
+        the layer command, the region, the image size and the modification
+        time of the files of the map, so an unchanged layer is not
+        rendered again when other layers change or when the display goes
+        back to a previous extent.
+
+        :param size: maximum number of images in the cache
+        """
+        self.size = size
+        self.cachedir = None
+        self.entries = OrderedDict() # key -> (mapfile, maskfile)
+
+    def _gisenv(self, env):
+        """Read the GRASS variables from the GISRC file of the environment
+
+        The file is read at each call, the current mapset or location can
+        be changed during the session.
+        """
+        gisrc = env.get('GISRC', os.environ.get('GISRC'))
+        gisenv = dict()
+        try:
+            with open(gisrc) as f:
+                for line in f:
+                    if ':' not in line:
+                        continue
+                    key, value = line.split(':', 1)
+                    gisenv[key.strip()] = value.strip()
+        except (IOError, TypeError):
+            return None
+        for key in ('GISDBASE', 'LOCATION_NAME', 'MAPSET'):
+            if key not in gisenv:
+                return None
+        return gisenv
+
+    def _mapFiles(self, layer, name, gisenv):
+        """Get the files of a map which affect the rendered image"""
+        if '@' not in name:
+            return None
+        name, mapset = name.split('@', 1)
+        curmapset = gisenv['MAPSET']
+        location = os.path.join(gisenv['GISDBASE'],
+                                gisenv['LOCATION_NAME'])
+        if layer.type == 'raster':
+            files = [os.path.join(location, mapset, element, name)
+                     for element in ('cell', 'fcell', 'cellhd', 'colr',
+                                     'cats', 'quant')]
+            files.append(os.path.join(location, curmapset, 'colr2', mapset,
+                                      name))
+            # the values of a reclassified map are read from its base map
+            files.extend(self._reclassFiles(location, mapset, name))
+            # r.mask creates the mask as a reclass, only its cellhd is written
+            files.extend([os.path.join(location, curmapset, element, 'MASK')
+                          for element in ('cell', 'cellhd')])
+            files.extend(self._reclassFiles(location, curmapset, 'MASK'))
+        else:
+            vdir = os.path.join(location, mapset, 'vector', name)
+            if not os.path.isdir(vdir):
+                return None
+            files = [os.path.join(vdir, f) for f in os.listdir(vdir)]
+        return files
+
+    def _reclassFiles(self, location, mapset, name):
+        """Get the files of the base map of a reclassified map, an empty
+        list if the map is not a reclass"""
+        base = self._reclassBase(os.path.join(location, mapset,
+                                              'cellhd', name))
+        if not base:
+            return []
+        bname, bmapset = base
+        return [os.path.join(location, bmapset, element, bname)
+                for element in ('cell', 'fcell', 'cellhd')]
+
+    def _reclassBase(self, cellhd):
+        """Get the name and mapset of the base map of a reclassified map,
+        None if the map is not a reclass"""
+        try:
+            with open(cellhd) as f:
+                if not f.readline().startswith('reclass'):
+                    return None
+                base = dict()
+                for line in f:
+                    if ':' not in line:
+                        continue
+                    key, value = line.split(':', 1)
+                    base[key.strip()] = value.strip()
+        except IOError:
+            return None
+        if 'name' not in base or 'mapset' not in base:
+            return None
+        return base['name'], base['mapset']
+
+    def GetKey(self, layer, env):
+        """Get the cache key of a layer, None if the layer is not cached
+
+        Only raster and vector map layers with fully qualified map name
+        are cached, vector map layers colored from the attribute table
+        (d.vect -a) are not cached.
+
+        :param layer: Layer instance
+        :param env: environment used for rendering
+        """
+        if layer.type not in ('raster', 'vector') or not layer.mapfile:
+            return None
+        params = layer.cmd[1]
+        if 'map' not in params or \
+                any(params.get(p) for p in ATTR_PARAMS):
+            return None
+        if layer.cmd[0] == 'd.vect' and 'a' in params.get('flags', ''):
+            return None
+        gisenv = self._gisenv(env)
+        if gisenv is None:
+            return None
+        files = self._mapFiles(layer, params['map'], gisenv)
+        if files is None:
+            return None
+        mtimes = list()
+        for f in files:
+            try:
+                mtimes.append(os.path.getmtime(f))
+            except OSError:
+                mtimes.append(None)
+
+        return (layer.GetCmd(string=True), env.get('GRASS_REGION'),
+                env.get('GRASS_RENDER_WIDTH'), env.get('GRASS_RENDER_HEIGHT'),
+                env.get('GRASS_RENDER_IMMEDIATE'), env.get('GISRC'),
+                tuple(mtimes))
+
+    def Get(self, key, layer):
+        """Copy the cached images into the layer files
+
+        :return: True if the images were found in the cache
+        """
+        if key is None or key not in self.entries:
+            return False
+        mapfile, maskfile = self.entries.pop(key)
+        self.entries[key] = (mapfile, maskfile)
+        try:
+            shutil.copyfile(mapfile, layer.mapfile)
+            if maskfile:
+                shutil.copyfile(maskfile, layer.maskfile)
+        except (IOError, OSError):
+            self.Remove(key)
+            return False
+        Debug.msg(3, "RenderCache.Get(): layer=%s" % layer.name)
+        return True
+
+    def Put(self, key, layer):
+        """Store the images of a rendered layer"""
+        if key is None or not os.path.exists(layer.mapfile):
+            return
+        if self.cachedir is None:
+            self.cachedir = tempfile.mkdtemp(prefix='grass_render_')
+        if key in self.entries:
+            self.Remove(key)
+        fd, mapfile = tempfile.mkstemp(suffix='.ppm', dir=self.cachedir)
+        os.close(fd)
+        maskfile = None
+        try:
+            shutil.copyfile(layer.mapfile, mapfile)
+            if os.path.exists(layer.maskfile):
+                maskfile = mapfile.rsplit('.', 1)[0] + '.pgm'
+                shutil.copyfile(layer.maskfile, maskfile)
+        except (IOError, OSError):
+            try_remove(mapfile)
+            return
+        self.entries[key] = (mapfile, maskfile)
+        while len(self.entries) > self.size:
+            self.Remove(next(iter(self.entries)))
+
+    def Remove(self, key):
+        """Remove an image from the cache"""
+        mapfile, maskfile = self.entries.pop(key)
+        for f in (mapfile, maskfile):
+            if f:
+                try_remove(f)
+
+    def Clear(self):
+        """Remove all the images and the cache directory"""
+        for key in list(self.entries.keys()):
+            self.Remove(key)
+        if self.cachedir:
+            shutil.rmtree(self.cachedir, ignore_errors=True)
+            self.cachedir = None
+
 class Map(object):
     def __init__(self, gisrc = None):
         """Map composition (stack of map layers and overlays)
@@ -434,6 +721,12 @@ class Map(object):
         # is some layer being downloaded?
         self.downloading = False
 
+        # images of the rendered layers
+        self.renderCache = RenderCache()
+        # pool of threads rendering the layers
+        self.renderPool = None
+        self.renderPoolSize = None
+
         self.layerChanged = Signal('Map.layerChanged')
         self.updateProgress = Signal('Map.updateProgress')
 
@@ -866,6 +1159,9 @@ class Map(object):
     def _renderLayers(self, env, force = False, overlaysOnly = False):
         """Render all map layers into files
 
+        The layers are rendered concurrently by a pool of threads, the
+        layers found in the render cache are not rendered.
+
         :param bool force: True to force rendering
         :param bool overlaysOnly: True to render only overlays
 
@@ -884,22 +1180,34 @@ class Map(object):
 
         self.ReportProgress(layer=None)
 
-
+        toRender = list()
         for layer in layers:
             # skip non-active map layers
             if not layer or not layer.active:
                 continue
+            if not force and not layer.forceRender:
+                continue
+            # each layer sets its own output file
+            layer.SetEnvironment(env.copy())
+            key = self.renderCache.GetKey(layer, env)
+            # forced rendering refreshes the cached images
+            if not force and self.renderCache.Get(key, layer):
+                layer.forceRender = False
+                continue
+            toRender.append((layer, key))
 
-            # render
-            if force or layer.forceRender:
-                layer.SetEnvironment(env)
-                if not layer.Render():
-                    continue
+        failed = self._renderParallel(toRender)
 
-            if layer.IsDownloading():
-                self.downloading = True
+        rendered = [layer for layer, key in toRender]
+        for layer in layers:
+            # skip non-active map layers
+            if not layer or not layer.active or layer in failed:
+                continue
 
-            self.ReportProgress(layer=layer)
+            if layer not in rendered:
+                if layer.IsDownloading():
+                    self.downloading = True
+                self.ReportProgress(layer=layer)
 
             # skip map layers when rendering fails
             if not os.path.exists(layer.mapfile):
@@ -915,6 +1223,54 @@ class Map(object):
 
         return maps, masks, opacities
 
+    def _getRenderPool(self):
+        """Get the pool of threads used to render the layers"""
+        nprocs = UserSettings.Get(group='display', key='nprocs',
+                                  subkey='value')
+        nprocs = max(1, int(nprocs))
+        if self.renderPool is None or self.renderPoolSize != nprocs:
+            if self.renderPool is not None:
+                self.renderPool.close()
+            self.renderPool = ThreadPool(nprocs)
+            self.renderPoolSize = nprocs
+        return self.renderPool
+
+    def _renderParallel(self, toRender):
+        """Render layers, d.* commands are run by the pool of threads,
+        WMS layers (which manage their own thread) in the main thread
+
+        :param toRender: list of (layer, cache key)
+
+        :return: list of layers which failed
+        """
+        failed = list()
+
+        def render(item):
+            layer, key = item
+            return layer, key, layer.Render()
+
+        def done(layer, key, mapfile):
+            if not mapfile:
+                failed.append(layer)
+                return
+            self.renderCache.Put(key, layer)
+            if layer.IsDownloading():
+                self.downloading = True
+            self.ReportProgress(layer=layer)
+
+        for item in toRender:
+            if item[0].type == 'wms':
+                done(*render(item))
+        items = [item for item in toRender if item[0].type != 'wms']
+        if len(items) == 1:
+            done(*render(items[0]))
+        elif items:
+            # report the progress as the layers are rendered
+            for result in self._getRenderPool().imap_unordered(render, items):
+                done(*result)
+
+        return failed
+
     def GetMapsMasksAndOpacities(self, force, windres, env):
         """
         Used by Render function.
@@ -952,32 +1308,26 @@ class Map(object):
 
         maps, masks, opacities = self.GetMapsMasksAndOpacities(force, windres, env)
 
-        # ugly hack for MSYS
-        if sys.platform != 'win32':
-            mapstr = ",".join(maps)
-            maskstr = ",".join(masks)
-        else:
-            mapstr = ""
-            for item in maps:
-                mapstr += item.replace('\\', '/')
-            mapstr = mapstr.rstrip(',')
-            maskstr = ""
-            for item in masks:
-                maskstr += item.replace('\\', '/')
-            maskstr = maskstr.rstrip(',')
-
-        # run g.pngcomp to get composite image
-        bgcolor = ':'.join(map(str, UserSettings.Get(group = 'display', key = 'bgcolor',
-                                                     subkey = 'color')))
-
-        if maps:
+        # composite image, g.pnmcomp is used when NumPy is not available
+        bgcolor = UserSettings.Get(group = 'display', key = 'bgcolor',
+                                   subkey = 'color')
+
+        if maps and hasNumPy:
+            try:
+                CompositeImages(maps, masks, opacities, bgcolor,
+                                self.width, self.height, self.mapfile)
+            except (GException, IOError) as e:
+                print >> sys.stderr, _("ERROR: Rendering failed. Details: %s") % e
+                wx.EndBusyCursor()
+                return None
+        elif maps:
             ret, msg = RunCommand('g.pnmcomp',
                                   getErrorMsg = True,
                                   overwrite = True,
                                   input = '%s' % ",".join(maps),
                                   mask = '%s' % ",".join(masks),
                                   opacity = '%s' % ",".join(opacities),
-                                  bgcolor = bgcolor,
+                                  bgcolor = ':'.join(map(str, bgcolor)),
                                   width = self.width,
                                   height = self.height,
                                   output = self.mapfile,
@@ -1326,10 +1676,14 @@ class Map(object):
         """Clean layer stack - go trough all layers and remove them
         from layer list.
 
-        Removes also mapfile and maskfile.
+        Removes also mapfile and maskfile and the render cache.
         """
         self._clean(self.layers)
         self._clean(self.overlays)
+        self.renderCache.Clear()
+        if self.renderPool is not None:
+            self.renderPool.close()
+            self.renderPool = None
 
     def ReverseListOfLayers(self):
         """Reverse list of layers"""
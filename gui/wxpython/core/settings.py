@@ -166,6 +166,9 @@ class Settings:
                 'driver': {
                     'type': 'cairo'
                     },
+                'nprocs': {
+                    'value': 4
+                    },
                 'alignExtent' : {
                     'enabled' : True
                     },
@@ -5,6 +5,7 @@
 
 List of classes:
  - base::Log
+ - base::PagedAttributeData
  - base::VirtualAttributeList
  - base::DbMgrBase
  - base::DbMgrNotebookBase
@@ -36,6 +37,7 @@ import tempfile
 import copy
 import types
 import math
+from collections import OrderedDict
 
 from core import globalvar
 import wx
@@ -53,6 +55,7 @@ from dbmgr.vinfo      import VectorDBInfo, GetUnicodeValue, CreateDbInfoDesc
 from core.debug       import Debug
 from dbmgr.dialogs    import ModifyTableRecord, AddColumnDialog
 from core.settings    import UserSettings
+from core.gthread     import gThread
 
 class Log:
     """The log output SQL is redirected to the status bar of the
@@ -66,11 +69,236 @@ class Log:
         if self.parent:
             self.parent.SetStatusText(text_string.strip())
 
+class PagedAttributeData:
+    """Attribute data loaded on demand by pages of rows
+
+    Only the recently displayed pages are kept in memory. The rows are
+    filtered and sorted by the database driver, the pages adjacent to
+    the requested one are loaded in background.
+    """
+    def __init__(self, driver, database, table, key, columns, ctypes,
+                 where = None, thread = None, pageSize = 500, maxPages = 40,
+                 orderBy = None, count = None):
+        """
+        :param driver: database driver
+        :param database: database name
+        :param table: attribute table name
+        :param key: name of key column
+        :param columns: list of displayed columns
+        :param ctypes: list of python types of displayed columns
+        :param where: where statement or None
+        :param thread: gThread used for loading in background, if None
+                       the pages are loaded only when requested
+        :param pageSize: number of rows in page
+        :param maxPages: maximal number of pages kept in memory
+        :param orderBy: (column, ascending) pair used to sort rows or None
+        :param count: number of rows if already known, if None it is
+                      read from database
+        """
+        self.driver   = driver
+        self.database = database
+        self.table    = table
+        self.key      = key
+        self.columns  = columns
+        self.ctypes   = ctypes
+        self.where    = where
+        self.pageSize = pageSize
+        self.maxPages = maxPages
+
+        self.orderBy   = orderBy # (column, ascending)
+        self.pages     = OrderedDict()
+        self.requested = set() # pages requested in background
+        self.generation = 0    # changed when cached pages become invalid
+        self.thread    = thread
+
+        if count is None:
+            count = int(self._select('SELECT COUNT(*) FROM %s%s' % \
+                                         (self.table, self._whereClause()))[0][0])
+        self.count = count
+
+    def _whereClause(self):
+        if self.where:
+            return ' WHERE %s' % self.where
+        return ''
+
+    def _select(self, sql):
+        """Run select statement
+
+        :return: list of records (list of values)
+        """
+        # see VirtualAttributeList._loadData()
+        fs = '{_sep_}'
+        ret, out, msg = RunCommand('db.select',
+                                   read = True,
+                                   getErrorMsg = True,
+                                   quiet = True,
+                                   flags = 'c',
+                                   separator = fs,
+                                   sql = sql,
+                                   driver = self.driver,
+                                   database = self.database)
+        if ret != 0:
+            raise GException(_("Unable to read attribute data.\n\n%s") % msg)
+
+        return [line.split(fs) for line in out.splitlines() if line]
+
+    def _orderClause(self):
+        if not self.orderBy:
+            return ''
+        column, ascending = self.orderBy
+        order = ' ORDER BY %s %s' % (column, 'ASC' if ascending else 'DESC')
+        if column != self.key:
+            # make the order unique
+            order += ', %s ASC' % self.key
+
+        return order
+
+    def _pageStatement(self, page):
+        """Get select statement of given page"""
+        return 'SELECT %s FROM %s%s%s LIMIT %d OFFSET %d' % \
+            (','.join([self.key] + self.columns), self.table,
+             self._whereClause(), self._orderClause(),
+             self.pageSize, page * self.pageSize)
+
+    def _fetchPage(self, page):
+        """Read page from database
+
+        :return: list of (category, values) pairs
+        """
+        rows = []
+        for record in self._select(self._pageStatement(page)):
+            if len(record) != len(self.columns) + 1:
+                raise GException(_("Inconsistent number of columns "
+                                   "in the table <%(table)s>.") % \
+                                     {'table' : self.table})
+            values = []
+            for ctype, value in zip(self.ctypes, record[1:]):
+                if ctype == types.StringType:
+                    try:
+                        value = GetUnicodeValue(value)
+                    except UnicodeDecodeError:
+                        value = _("Unable to decode value. "
+                                  "Set encoding in GUI preferences ('Attributes').")
+                values.append(value)
+            try:
+                cat = int(record[0])
+            except ValueError:
+                cat = -1
+            rows.append((cat, values))
+
+        return rows
+
+    def _prefetchPage(self, page):
+        """Read page in background thread"""
+        try:
+            return self._fetchPage(page)
+        except GException as e:
+            Debug.msg(1, "PagedAttributeData._prefetchPage(): %s" % e.value)
+            return None
+
+    def _storePage(self, page, rows):
+        self.pages[page] = rows
+        while len(self.pages) > self.maxPages:
+            self.pages.popitem(last = False)
+
+    def _onPagePrefetched(self, event):
+        """Page read in background, store it in cache"""
+        page = event.kwds['page']
+        generation = event.userdata
+        if generation != self.generation:
+            return
+        self.requested.discard(page)
+        if event.ret is not None and page not in self.pages:
+            self._storePage(page, event.ret)
+
+    def _prefetch(self, page):
+        """Request pages adjacent to given page in background"""
+        if not self.thread:
+            return
+        npages = (self.count - 1) // self.pageSize + 1
+        for p in (page + 1, page - 1):
+            if p < 0 or p >= npages or p in self.pages or p in self.requested:
+                continue
+            self.requested.add(p)
+            self.thread.Run(callable = self._prefetchPage, page = p,
+                            userdata = self.generation,
+                            ondone = self._onPagePrefetched)
+
+    def GetPage(self, page):
+        """Get rows of page, read it from database if not cached
+
+        :return: list of (category, values) pairs
+        """
+        if page in self.pages:
+            rows = self.pages.pop(page)
+            self.pages[page] = rows # recently used
+        else:
+            rows = self._fetchPage(page)
+            self._storePage(page, rows)
+        self._prefetch(page)
+
+        return rows
+
+    def GetRow(self, item):
+        """Get row of given list item
+
+        :return: (category, values) pair
+        :return: None if row is not available
+        """
+        if item < 0 or item >= self.count:
+            return None
+        try:
+            rows = self.GetPage(item // self.pageSize)
+        except GException as e:
+            Debug.msg(1, "PagedAttributeData.GetRow(): %s" % e.value)
+            return None
+        idx = item % self.pageSize
+        if idx >= len(rows):
+            return None
+
+        return rows[idx]
+
+    def SetOrder(self, column, ascending = True):
+        """Sort rows by given column"""
+        self.orderBy = (column, ascending)
+        self.Clear()
+
+    def Clear(self):
+        """Drop cached pages"""
+        self.pages.clear()
+        self.requested.clear()
+        self.generation += 1
+
+    def GetCats(self):
+        """Get categories of all rows (in current order)"""
+        sql = 'SELECT %s FROM %s%s%s' % (self.key, self.table,
+                                         self._whereClause(), self._orderClause())
+
+        return [record[0] for record in self._select(sql)]
+
+    def GetMaxCat(self):
+        """Get maximal category in the table"""
+        value = self._select('SELECT MAX(%s) FROM %s' % (self.key, self.table))[0][0]
+        if not value:
+            return 0
+
+        return int(value)
+
+    def HasCat(self, cat):
+        """Check if record with given category exists in the table"""
+        return len(self._select('SELECT %s FROM %s WHERE %s = %d LIMIT 1' % \
+                                    (self.key, self.table, self.key, cat))) > 0
+
 class VirtualAttributeList(wx.ListCtrl,
                            listmix.ListCtrlAutoWidthMixin,
                            listmix.ColumnSorterMixin):
     """Support virtual list class for Attribute Table Manager (browse page)
     """
+    # drivers supporting LIMIT and OFFSET clauses (paged loading)
+    pagedDrivers = ('sqlite', 'pg', 'mysql')
+    # tables with more rows are loaded by pages
+    pagedMinRows = 10000
+
     def __init__(self, parent, log, dbMgrData, layer, pages):
         # initialize variables
         self.parent  = parent
@@ -83,6 +311,9 @@ class VirtualAttributeList(wx.ListCtrl,
         self.fieldCalc = None
         self.fieldStats = None      
         self.columns = {} # <- LoadData()
+        self.pager = None # <- LoadData()
+        self.pagerCount = None # (query, number of rows) <- LoadData()
+        self.thread = None
         
         self.sqlFilter = {}
 
@@ -173,6 +404,103 @@ class VirtualAttributeList(wx.ListCtrl,
         except:
             keyId = -1
         
+        # large tables are loaded by pages when displayed
+        oldPager = self.pager
+        topItem = self.GetTopItem() if oldPager else 0
+        self.pager = None
+        driver = self.mapDBInfo.layers[layer]['driver']
+        if not sql and keyColumn != 'OGC_FID' and driver in self.pagedDrivers:
+            if not self.thread:
+                self.thread = gThread()
+            database = self.mapDBInfo.layers[layer]['database']
+            # the number of rows is read again only when records are
+            # added or deleted (see InvalidateCount())
+            query = (driver, database, tableName, where)
+            count = None
+            if self.pagerCount and self.pagerCount[0] == query:
+                count = self.pagerCount[1]
+            # keep the order of the reloaded rows
+            orderBy = None
+            if oldPager and oldPager.orderBy and oldPager.orderBy[0] in columns:
+                orderBy = oldPager.orderBy
+            pager = PagedAttributeData(driver = driver, database = database,
+                                       table = tableName, key = keyColumn, columns = columns,
+                                       ctypes = [self.columns[col]['ctype'] for col in columns],
+                                       where = where, thread = self.thread,
+                                       orderBy = orderBy, count = count)
+            self.pagerCount = (query, pager.count)
+            if pager.count > self.pagedMinRows:
+                self.pager = pager
+        
+        if self.pager:
+            self.sqlFilter = {"where" : where}
+            self._loadColumns(columns)
+            self.SetItemCount(self.pager.count)
+            # stay on the displayed page
+            if 0 < topItem < self.pager.count:
+                self.EnsureVisible(min(topItem + self.GetCountPerPage() - 1,
+                                       self.pager.count - 1))
+        elif not self._loadData(layer, tableName, columns, keyId, where, sql):
+            return
+        
+        if where:
+            item = -1
+            while True:
+                item = self.GetNextItem(item)
+                if item == -1:
+                    break
+                self.SetItemState(item, wx.LIST_STATE_SELECTED, wx.LIST_STATE_SELECTED)
+        
+        i = 0
+        for col in columns:
+            width = self.columns[col]['length'] * 6 # FIXME
+            if width < 60:
+                width = 60
+            if width > 300:
+                width = 300
+            self.SetColumnWidth(col = i, width = width)
+            i += 1
+        
+        self.SendSizeEvent()
+        
+        self.log.write(_("Number of loaded records: %d") % \
+                           self.GetItemCount())
+        
+        return keyId
+    
+    def _loadColumns(self, columns):
+        """Reset data and set list columns"""
+        # These two should probably be passed to init more cleanly
+        # setting the numbers of items = number of elements in the dictionary
+        self.itemDataMap  = {}
+        self.itemIndexMap = []
+        self.itemCatsMap  = {}
+        
+        self.DeleteAllItems()
+        
+        # self.ClearAll()
+        for i in range(self.GetColumnCount()):
+            self.DeleteColumn(0)
+        
+        i = 0
+        info = wx.ListItem()
+        info.m_mask = wx.LIST_MASK_TEXT | wx.LIST_MASK_IMAGE | wx.LIST_MASK_FORMAT
+        info.m_image = -1
+        info.m_format = 0
+        for column in columns:
+            info.m_text = column
+            self.InsertColumnInfo(i, info)
+            i += 1
+            
+            if i >= 256:
+                self.log.write(_("Can display only 256 columns."))
+        
+    def _loadData(self, layer, tableName, columns, keyId, where, sql):
+        """Load all records of the table into list
+
+        :return: True on success
+        :return: False on error
+        """
         # read data
         # FIXME: Max. number of rows, while the GUI is still usable
 
@@ -212,30 +540,7 @@ class VirtualAttributeList(wx.ListCtrl,
             ret = RunCommand('v.db.select',
                              **cmdParams)
         
-        # These two should probably be passed to init more cleanly
-        # setting the numbers of items = number of elements in the dictionary
-        self.itemDataMap  = {}
-        self.itemIndexMap = []
-        self.itemCatsMap  = {}
-        
-        self.DeleteAllItems()
-        
-        # self.ClearAll()
-        for i in range(self.GetColumnCount()):
-            self.DeleteColumn(0)
-        
-        i = 0
-        info = wx.ListItem()
-        info.m_mask = wx.LIST_MASK_TEXT | wx.LIST_MASK_IMAGE | wx.LIST_MASK_FORMAT
-        info.m_image = -1
-        info.m_format = 0
-        for column in columns:
-            info.m_text = column
-            self.InsertColumnInfo(i, info)
-            i += 1
-            
-            if i >= 256:
-                self.log.write(_("Can display only 256 columns."))
+        self._loadColumns(columns)
         
         i = 0
         outFile.seek(0)
@@ -257,7 +562,7 @@ class VirtualAttributeList(wx.ListCtrl,
                                    "in the table <%(table)s>.") % \
                                {'table' : tableName })
                 self.columns = {} # because of IsEmpty method
-                return
+                return False
 
             self.AddDataRow(i, record, columns, keyId)
             
@@ -268,30 +573,7 @@ class VirtualAttributeList(wx.ListCtrl,
         
         self.SetItemCount(i)
         
-        if where:
-            item = -1
-            while True:
-                item = self.GetNextItem(item)
-                if item == -1:
-                    break
-                self.SetItemState(item, wx.LIST_STATE_SELECTED, wx.LIST_STATE_SELECTED)
-        
-        i = 0
-        for col in columns:
-            width = self.columns[col]['length'] * 6 # FIXME
-            if width < 60:
-                width = 60
-            if width > 300:
-                width = 300
-            self.SetColumnWidth(col = i, width = width)
-            i += 1
-        
-        self.SendSizeEvent()
-        
-        self.log.write(_("Number of loaded records: %d") % \
-                           self.GetItemCount())
-        
-        return keyId
+        return True
     
     def AddDataRow(self, i, record, columns, keyId):
         """Add row to the data list"""
@@ -362,19 +644,62 @@ class VirtualAttributeList(wx.ListCtrl,
         cats = []
         item = self.GetFirstSelected()
         while item != -1:
-            cats.append(self.GetItemText(item))
+            if self.pager:
+                cats.append(str(self.GetItemCat(item)))
+            else:
+                cats.append(self.GetItemText(item))
             item = self.GetNextSelected(item)
 
         return cats
 
     def GetItems(self):
         """Return list of items (category numbers)"""
+        if self.pager:
+            return self.pager.GetCats()
+        
         cats = []
         for item in range(self.GetItemCount()):
             cats.append(self.GetItemText(item))
         
         return cats
 
+    def GetItemCat(self, item):
+        """Return category number of given item"""
+        if self.pager:
+            row = self.pager.GetRow(item)
+            if row is None:
+                return -1
+            return row[0]
+        
+        return self.itemCatsMap[self.itemIndexMap[item]]
+
+    def GetMaxCat(self):
+        """Return maximal category number in the table"""
+        if self.pager:
+            return self.pager.GetMaxCat()
+        
+        if len(self.itemCatsMap.values()) > 0:
+            return max(self.itemCatsMap.values())
+        return 0
+
+    def HasCat(self, cat):
+        """Check if record with given category number exists"""
+        if self.pager:
+            return self.pager.HasCat(cat)
+        
+        return cat in self.itemCatsMap.values()
+
+    def InvalidateCount(self):
+        """Read the number of rows again when data are reloaded
+
+        Called when records are added or deleted.
+        """
+        self.pagerCount = None
+
+    def IsPaged(self):
+        """Check if data are loaded by pages (see PagedAttributeData)"""
+        return self.pager is not None
+
     def GetColumnText(self, index, col):
         """Return column text"""
         item = self.GetItem(index, col)
@@ -386,6 +711,12 @@ class VirtualAttributeList(wx.ListCtrl,
 
     def OnGetItemText(self, item, col):
         """Get item text"""
+        if self.pager:
+            row = self.pager.GetRow(item)
+            if row is None:
+                return ''
+            return row[1][col]
+        
         index = self.itemIndexMap[item]
         s = self.itemDataMap[index][col]
         return s
@@ -573,6 +904,13 @@ class VirtualAttributeList(wx.ListCtrl,
 
     def SortItems(self, sorter = cmp):
         """Sort items"""
+        if self.pager:
+            # sorted by database driver
+            self.pager.SetOrder(self.GetColumn(self._col).GetText(),
+                                self._colSortFlag[self._col])
+            self.Refresh()
+            return
+        
         items = list(self.itemDataMap.keys())
         items.sort(self.Sorter)
         self.itemIndexMap = items
@@ -1307,7 +1645,7 @@ class DbMgrBrowsePage(DbMgrNotebookBase):
             return
         table     = self.dbMgrData['mapDBInfo'].layers[self.selLayer]['table']
         keyColumn = self.dbMgrData['mapDBInfo'].layers[self.selLayer]['key']
-        cat       = tlist.itemCatsMap[tlist.itemIndexMap[item]]
+        cat       = tlist.GetItemCat(item)
 
         # (column name, value)
         data = []
@@ -1365,9 +1703,11 @@ class DbMgrBrowsePage(DbMgrNotebookBase):
                                 idx = i
                             
                             if column['ctype'] != types.StringType:
-                                tlist.itemDataMap[item][idx] = column['ctype'] (values[i])
+                                value = column['ctype'] (values[i])
                             else: # -> string
-                                tlist.itemDataMap[item][idx] = values[i]
+                                value = values[i]
+                            if not tlist.IsPaged():
+                                tlist.itemDataMap[item][idx] = value
                         except ValueError:
                             raise ValueError(_("Value '%(value)s' needs to be entered as %(type)s.") % \
                                                  {'value' : str(values[i]),
@@ -1410,11 +1750,8 @@ class DbMgrBrowsePage(DbMgrNotebookBase):
         for i in range(tlist.GetColumnCount()): 
             columnName.append(tlist.GetColumn(i).GetText())
 
-        # maximal category number
-        if len(tlist.itemCatsMap.values()) > 0:
-            maxCat = max(tlist.itemCatsMap.values())
-        else:
-            maxCat = 0 # starting category '1'
+        # maximal category number (0 -> starting category '1')
+        maxCat = tlist.GetMaxCat()
         
         # key column must be always presented
         if keyColumn not in columnName:
@@ -1450,7 +1787,7 @@ class DbMgrBrowsePage(DbMgrNotebookBase):
                 cat = -1
 
             try:
-                if cat in tlist.itemCatsMap.values():
+                if tlist.HasCat(cat):
                     raise ValueError(_("Record with category number %d "
                                        "already exists in the table.") % cat)
 
@@ -1495,15 +1832,16 @@ class DbMgrBrowsePage(DbMgrNotebookBase):
                 del values[0]
                 
             # add new item to the tlist
-            if len(tlist.itemIndexMap) > 0:
-                index = max(tlist.itemIndexMap) + 1
-            else:
-                index = 0
-            
-            tlist.itemIndexMap.append(index)
-            tlist.itemDataMap[index] = values
-            tlist.itemCatsMap[index] = cat
-            tlist.SetItemCount(tlist.GetItemCount() + 1)
+            if not tlist.IsPaged():
+                if len(tlist.itemIndexMap) > 0:
+                    index = max(tlist.itemIndexMap) + 1
+                else:
+                    index = 0
+                
+                tlist.itemIndexMap.append(index)
+                tlist.itemDataMap[index] = values
+                tlist.itemCatsMap[index] = cat
+                tlist.SetItemCount(tlist.GetItemCount() + 1)
 
             self.listOfSQLStatements.append('INSERT INTO %s (%s) VALUES(%s)' % \
                                                 (table,
@@ -1511,6 +1849,10 @@ class DbMgrBrowsePage(DbMgrNotebookBase):
                                                  valuesString.rstrip(',')))
             
             self.ApplyCommands(self.listOfCommands, self.listOfSQLStatements)
+            
+            tlist.InvalidateCount()
+            if tlist.IsPaged():
+                tlist.Update()
 
         
     def OnDataItemDelete(self, event):
@@ -1524,10 +1866,10 @@ class DbMgrBrowsePage(DbMgrNotebookBase):
         indeces = []
         # collect SQL statements
         while item != -1:
-            index = dlist.itemIndexMap[item]
-            indeces.append(index)
+            if not dlist.IsPaged():
+                indeces.append(dlist.itemIndexMap[item])
             
-            cat = dlist.itemCatsMap[index]
+            cat = dlist.GetItemCat(item)
             
             self.listOfSQLStatements.append('DELETE FROM %s WHERE %s=%d' % \
                                                 (table, key, cat))
@@ -1546,25 +1888,25 @@ class DbMgrBrowsePage(DbMgrNotebookBase):
                 return False
         
         # restore maps
-        i = 0
-        indexTemp = copy.copy(dlist.itemIndexMap)
-        dlist.itemIndexMap = []
-        dataTemp = copy.deepcopy(dlist.itemDataMap)
-        dlist.itemDataMap = {}
-        catsTemp = copy.deepcopy(dlist.itemCatsMap)
-        dlist.itemCatsMap = {}
-        
-        i = 0
-        for index in indexTemp:
-            if index in indeces:
-                continue
-            dlist.itemIndexMap.append(i)
-            dlist.itemDataMap[i] = dataTemp[index]
-            dlist.itemCatsMap[i] = catsTemp[index]
-            
-            i += 1
+        if not dlist.IsPaged():
+            indexTemp = copy.copy(dlist.itemIndexMap)
+            dlist.itemIndexMap = []
+            dataTemp = copy.deepcopy(dlist.itemDataMap)
+            dlist.itemDataMap = {}
+            catsTemp = copy.deepcopy(dlist.itemCatsMap)
+            dlist.itemCatsMap = {}
             
-        dlist.SetItemCount(len(dlist.itemIndexMap))
+            i = 0
+            for index in indexTemp:
+                if index in indeces:
+                    continue
+                dlist.itemIndexMap.append(i)
+                dlist.itemDataMap[i] = dataTemp[index]
+                dlist.itemCatsMap[i] = catsTemp[index]
+                
+                i += 1
+                
+            dlist.SetItemCount(len(dlist.itemIndexMap))
         
         # deselect items
         item = dlist.GetFirstSelected()
@@ -1575,6 +1917,10 @@ class DbMgrBrowsePage(DbMgrNotebookBase):
         # submit SQL statements
         self.ApplyCommands(self.listOfCommands, self.listOfSQLStatements)
         
+        dlist.InvalidateCount()
+        if dlist.IsPaged():
+            dlist.Update()
+        
         return True
 
     def OnDataItemDeleteAll(self, event):
@@ -1584,13 +1930,15 @@ class DbMgrBrowsePage(DbMgrNotebookBase):
             deleteDialog = wx.MessageBox(parent = self,
                                          message = _("All data records (%d) will be permanently deleted "
                                                    "from table. Do you want to delete them?") % \
-                                             (len(dlist.itemIndexMap)),
+                                             (dlist.GetItemCount()),
                                          caption = _("Delete records"),
                                          style = wx.YES_NO | wx.CENTRE)
             if deleteDialog != wx.YES:
                 return
 
         dlist.DeleteAllItems()
+        dlist.pager = None
+        dlist.InvalidateCount()
         dlist.itemDataMap  = {}
         dlist.itemIndexMap = []
         dlist.SetItemCount(0)
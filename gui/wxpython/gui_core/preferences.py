@@ -624,6 +624,24 @@ class PreferencesDialog(PreferencesBaseDialog):
                       flag = wx.ALIGN_RIGHT,
                       pos = (row, 1))
         
+        #
+        # number of layers rendered in parallel
+        #
+        row += 1
+        gridSizer.Add(item = wx.StaticText(parent = panel, id = wx.ID_ANY,
+                                         label = _("Number of layers rendered in parallel:")),
+                      flag = wx.ALIGN_LEFT |
+                      wx.ALIGN_CENTER_VERTICAL,
+                      pos = (row, 0))
+        nprocs = wx.SpinCtrl(parent = panel, id = wx.ID_ANY, size = (150, -1),
+                             initial = self.settings.Get(group = 'display', key = 'nprocs', subkey = 'value'),
+                             min = 1, max = 64, name = "GetValue")
+        self.winId['display:nprocs:value'] = nprocs.GetId()
+
+        gridSizer.Add(item = nprocs,
+                      flag = wx.ALIGN_RIGHT,
+                      pos = (row, 1))
+
         #
         # Statusbar mode
         #
@@ -14,7 +14,7 @@ from grass.pygrass.modules import Module
 from grass.pygrass.utils import get_mapset_raster, findmaps
 
 from grass.pygrass.modules.grid.split import split_region_tiles
-from grass.pygrass.modules.grid.patch import rpatch_map
+from grass.pygrass.modules.grid.patch import rpatch_map, rpatch_tiles
 
 
 def select(parms, ptype):
@@ -367,6 +367,41 @@ def cmd_exe(args):
     os.remove(gisrc_dst)
 
 
+def get_region_env(bbox, region):
+    """Return a string that can be used as GRASS_REGION environmental
+    variable, with the extent of the bounding box and the resolution
+    of the region.
+
+    :param bbox: a dict with the north, south, east and west values
+    :type bbox: dict
+    :param region: the region with the resolution and projection to use
+    :type region: Region object
+    :returns: a string with the region values
+    """
+    rows = int(round((bbox['north'] - bbox['south']) / region.nsres))
+    cols = int(round((bbox['east'] - bbox['west']) / region.ewres))
+    return ("proj: %d;zone: %d;north: %r;south: %r;east: %r;west: %r;"
+            "cols: %d;rows: %d;e-w resol: %r;n-s resol: %r;" %
+            (region.proj, region.zone, bbox['north'], bbox['south'],
+             bbox['east'], bbox['west'], cols, rows,
+             region.ewres, region.nsres))
+
+
+def cmd_exe_shared(args):
+    """Execute a cmd in the current mapset, with a region that is valid
+    only for the process of the command.
+
+    :param args: is a tuple that contains the GRASS_REGION string and the
+                 dictionary with all the parameter of a GRASS module
+    :type args: tuple
+    :returns: the return code of the command
+    """
+    reg_env, cmd = args
+    env = os.environ.copy()
+    env['GRASS_REGION'] = reg_env
+    return sub.Popen(get_cmd(cmd), env=env).wait()
+
+
 class GridModule(object):
     # TODO maybe also i.* could be supported easily
     """Run GRASS raster commands in a multiprocessing mode.
@@ -383,6 +418,18 @@ class GridModule(object):
                       of processor available.
     :param split: if True use r.tile to split all the inputs.
     :type split: bool
+    :param shared_mapset: if True run all the tiles in the current mapset,
+                          setting the region of each tile with GRASS_REGION
+                          and writing each tile in a temporary raster map,
+                          instead of creating a new mapset for each tile and
+                          copying the inputs into it.
+    :type shared_mapset: bool
+    :param blend: method used to patch the overlapping cells of the tiles:
+                  'crop' (default) keeps only the cells of each tile
+                  without the overlap, 'mean' computes the mean of the
+                  overlapping tiles, 'feather' computes a mean weighted by
+                  the distance from the border of each tile.
+    :type blend: str
     :param run_: if False only instantiate the object
     :type run_: bool
     :param args: give all the parameters to the command
@@ -398,8 +445,13 @@ class GridModule(object):
     def __init__(self, cmd, width=None, height=None, overlap=0, processes=None,
                  split=False, debug=False, region=None, move=None, log=False,
                  start_row=0, start_col=0, out_prefix='',
-                 *args, **kargs):
+                 shared_mapset=False, blend='crop', *args, **kargs):
         kargs['run_'] = False
+        if shared_mapset and move:
+            raise ValueError(_("The shared_mapset and move options can not "
+                               "be used together"))
+        self.shared_mapset = shared_mapset
+        self.blend = blend
         self.mset = Mapset()
         self.module = Module(cmd, *args, **kargs)
         self.width = width
@@ -506,6 +558,38 @@ class GridModule(object):
                               cmd, groups))
         return works
 
+    def get_tile_name(self, name, row, col):
+        """Return the name of the raster map of a tile, used when the
+        tiles share the current mapset"""
+        return "%s_%s" % (name, self.msetstr % (self.start_row + row,
+                                                self.start_col + col))
+
+    def get_works_shared(self):
+        """Return a list of tuple with the parameters for cmd_exe_shared
+        function"""
+        works = []
+        cmd = self.module.get_dict()
+        routputs = [k for k in self.module.outputs
+                    if self.module.outputs[k].typedesc == 'raster']
+        for row, box_row in enumerate(self.bboxes):
+            for col, box in enumerate(box_row):
+                tcmd = dict(cmd)
+                tcmd['outputs'] = [(k, self.get_tile_name(v, row, col)
+                                    if k in routputs else v)
+                                   for k, v in cmd['outputs']]
+                if self.inlist:
+                    cols = len(box_row)
+                    inputs = dict(cmd['inputs'])
+                    for key in self.inlist:
+                        inputs[key] = "%s@%s" % (self.inlist[key][row * cols +
+                                                                  col],
+                                                 self.mset.name)
+                    tcmd['inputs'] = inputs.items()
+                bbox = dict(north=box.north, south=box.south,
+                            east=box.east, west=box.west)
+                works.append((get_region_env(bbox, self.region), tcmd))
+        return works
+
     def define_mapset_inputs(self):
         """Add the mapset information to the input maps
         """
@@ -527,18 +611,26 @@ class GridModule(object):
         """
         self.module.flags.overwrite = True
         self.define_mapset_inputs()
+        if self.shared_mapset:
+            exe, works = cmd_exe_shared, self.get_works_shared()
+        else:
+            exe, works = cmd_exe, self.get_works()
         if self.debug:
-            for wrk in self.get_works():
-                cmd_exe(wrk)
+            returncodes = [exe(wrk) for wrk in works]
         else:
             pool = mltp.Pool(processes=self.processes)
-            result = pool.map_async(cmd_exe, self.get_works())
+            result = pool.map_async(exe, works)
             result.wait()
             if not result.successful():
                 raise RuntimeError(_("Execution of subprocesses was not successful"))
+            returncodes = result.get()
+        if any(returncodes):
+            raise RuntimeError(_("Execution of subprocesses was not successful"))
 
         if patch:
-            if self.move:
+            if self.shared_mapset:
+                self.patch_shared()
+            elif self.move:
                 os.environ['GISRC'] = self.gisrc_dst
                 self.n_mset.current()
                 self.patch()
@@ -567,7 +659,10 @@ class GridModule(object):
                     fil.close()
 
         if clean:
-            self.clean_location()
+            if self.shared_mapset:
+                self.rm_tile_outputs()
+            else:
+                self.clean_location()
             self.rm_tiles()
             if self.n_mset:
                 gisdbase, location = os.path.split(self.move)
@@ -578,9 +673,19 @@ class GridModule(object):
                 sht.rmtree(os.path.join(self.move, 'PERMANENT'))
                 sht.rmtree(os.path.join(self.move, self.mset.name))
 
+    def get_patch_bboxes(self):
+        """Return the bounding boxes without and with overlap used to patch
+        the tiles, the latter is None if the overlap is cropped"""
+        bboxes = split_region_tiles(width=self.width, height=self.height)
+        obboxes = None
+        if self.blend != 'crop':
+            obboxes = split_region_tiles(width=self.width, height=self.height,
+                                         overlap=self.overlap)
+        return bboxes, obboxes
+
     def patch(self):
         """Patch the final results."""
-        bboxes = split_region_tiles(width=self.width, height=self.height)
+        bboxes, obboxes = self.get_patch_bboxes()
         loc = Location()
         mset = loc[self.mset.name]
         mset.visible.extend(loc.mapsets())
@@ -590,7 +695,40 @@ class GridModule(object):
                 rpatch_map(otm.value,
                            self.mset.name, self.msetstr, bboxes,
                            self.module.flags.overwrite,
-                           self.start_row, self.start_col, self.out_prefix)
+                           self.start_row, self.start_col, self.out_prefix,
+                           blend=self.blend, obbox_list=obboxes,
+                           processes=self.processes)
+
+    def get_tile_outputs(self, name):
+        """Return the names of the tiles of an output, a list of names
+        for each row of tiles"""
+        return [[self.get_tile_name(name, row, col)
+                 for col in range(len(box_row))]
+                for row, box_row in enumerate(self.bboxes)]
+
+    def patch_shared(self):
+        """Patch the final results of the tiles computed in the current
+        mapset."""
+        bboxes, obboxes = self.get_patch_bboxes()
+        for otmap in self.module.outputs:
+            otm = self.module.outputs[otmap]
+            if otm.typedesc == 'raster' and otm.value:
+                rpatch_tiles(otm.value, self.get_tile_outputs(otm.value),
+                             bboxes, self.module.flags.overwrite,
+                             self.out_prefix, blend=self.blend,
+                             obbox_list=obboxes, processes=self.processes)
+
+    def rm_tile_outputs(self):
+        """Remove the raster maps of the tiles computed in the current
+        mapset."""
+        names = []
+        for otmap in self.module.outputs:
+            otm = self.module.outputs[otmap]
+            if otm.typedesc == 'raster' and otm.value:
+                for row in self.get_tile_outputs(otm.value):
+                    names.extend(row)
+        if names:
+            Module('g.remove', flags='f', type='rast', name=names)
 
     def rm_tiles(self):
         """Remove all the tiles."""
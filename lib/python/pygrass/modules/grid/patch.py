@@ -6,21 +6,35 @@ Created on Tue Apr  2 18:57:42 2013
 """
 from __future__ import (nested_scopes, generators, division, absolute_import,
                         with_statement, print_function, unicode_literals)
+import multiprocessing as mltp
+
+import numpy as np
+
 from grass.pygrass.gis.region import Region
 from grass.pygrass.raster import RasterRow
+from grass.pygrass.raster.buffer import Buffer
 from grass.pygrass.utils import coor2pixel
 
+#: Methods used to compute the values of the overlapping tiles
+BLEND_METHODS = ('crop', 'mean', 'feather')
+
+#: Null value of CELL raster maps
+CELL_NULL = -2147483648
+
 
-def get_start_end_index(bbox_list):
+def get_start_end_index(bbox_list, reg=None):
     """Convert a Bounding Box to a list of the index of
     column start, end, row start and end
 
     :param bbox_list: a list of BBox object to convert
     :type bbox_list: list of BBox object
+    :param reg: the region used to convert the coordinates, if None the
+                current region is used
+    :type reg: Region object
 
     """
     ss_list = []
-    reg = Region()
+    reg = reg if reg else Region()
     for bbox in bbox_list:
         r_start, c_start = coor2pixel((bbox.west, bbox.north), reg)
         r_end, c_end = coor2pixel((bbox.east, bbox.south), reg)
@@ -38,21 +52,200 @@ def rpatch_row(rast, rasts, bboxes):
     :param bboxes: a list of BBox object
     :type bboxes: list of BBox object
     """
-    sei = get_start_end_index(bboxes)
-    # instantiate two buffer
-    buff = rasts[0][0]
-    rbuff = rasts[0][0]
-    r_start, r_end, c_start, c_end = sei[0]
-    for row in range(r_start, r_end):
-        for col, ras in enumerate(rasts):
-            r_start, r_end, c_start, c_end = sei[col]
-            buff = ras.get_row(row, buff)
-            rbuff[c_start:c_end] = buff[c_start:c_end]
-        rast.put_row(rbuff)
+    rpatch_block(rast, rasts, bboxes)
+
+
+def rpatch_block(rast, rasts, bboxes, reg=None):
+    """Patch a row of bound boxes, reading each raster as a single block
+    and writing all the rows of the output stripe with one call.
+
+    :param rast: a Raster object to write
+    :type rast: Raster object
+    :param rasts: a list of Raster object to read
+    :type rasts: list of Raster object
+    :param bboxes: a list of BBox object
+    :type bboxes: list of BBox object
+    :param reg: the region of the output raster
+    :type reg: Region object
+    """
+    reg = reg if reg else Region()
+    sei = get_start_end_index(bboxes, reg)
+    r_start, r_end = sei[0][:2]
+    stripe = Buffer((r_end - r_start, reg.cols), rast.mtype)
+    for ras, (r_start, r_end, c_start, c_end) in zip(rasts, sei):
+        stripe[:, c_start:c_end] = ras.read_block(r_start, c_start,
+                                                  r_end - r_start,
+                                                  c_end - c_start)
+    rast.write_block(stripe)
+
+
+def get_feather_weights(index, rows, cols):
+    """Return the weights used to blend a tile with the feather method:
+    the weight decreases linearly going towards the border of the tile
+    that overlaps another tile, the borders on the region limits are not
+    weighted.
+
+    :param index: the row start, row end, column start and column end of
+                  the tile, with the overlap
+    :type index: tuple
+    :param rows: the number of rows of the region
+    :type rows: int
+    :param cols: the number of columns of the region
+    :type cols: int
+
+    >>> get_feather_weights((0, 3, 2, 6), 3, 6)
+    array([[ 1.,  2.,  3.,  4.],
+           [ 1.,  2.,  3.,  4.],
+           [ 1.,  2.,  3.,  4.]])
+    """
+    def ramp(start, end, size):
+        idx = np.arange(start, end, dtype=np.float64)
+        first = idx - start + 1 if start > 0 else np.inf
+        last = end - idx if end < size else np.inf
+        return np.minimum(first, last) * np.ones(end - start)
+
+    r_start, r_end, c_start, c_end = index
+    weights = np.minimum.outer(ramp(r_start, r_end, rows),
+                               ramp(c_start, c_end, cols))
+    weights[np.isinf(weights)] = 1.
+    return weights
+
+
+def _read_block(args):
+    """Read a block of a raster map, executed by the workers of the
+    process pool: the raster is opened by the worker itself because the
+    raster library is not thread safe and its state cannot be shared
+    between processes.
+
+    :return: a tuple with the map type and the block as numpy array
+    """
+    name, mapset, r_start, r_end, c_start, c_end = args
+    ras = RasterRow(name, mapset)
+    ras.open('r')
+    try:
+        block = ras.read_block(r_start, c_start, r_end - r_start,
+                               c_end - c_start)
+        return ras.mtype, np.array(block)
+    finally:
+        ras.close()
+
+
+def _to_float(mtype, block):
+    """Return a float copy of a block with the null values set to NaN"""
+    if mtype == 'CELL':
+        fblock = np.array(block, dtype=np.float64)
+        fblock[block == CELL_NULL] = np.nan
+        return fblock
+    return np.array(block, dtype=np.float64)
+
+
+def rpatch_tile_maps(rast, tiles, bbox_list, reg=None, blend='crop',
+                     obbox_list=None, processes=None):
+    """Patch raster maps computed on tiles into an open raster.
+
+    Each output stripe, corresponding to a row of tiles, is written with
+    a single call; the blocks of the tiles that contribute to the stripe
+    are read in parallel by a pool of processes, each process opens the
+    tiles it reads.
+
+    :param rast: a Raster object open in write mode
+    :type rast: Raster object
+    :param tiles: a list with a list of (name, mapset) tuples for each row
+                  of tiles
+    :type tiles: list of list of tuple
+    :param bbox_list: a list of BBox object without overlap
+    :type bbox_list: list of list of BBox object
+    :param reg: the region of the output raster
+    :type reg: Region object
+    :param blend: the method used to compute the overlapping cells: `crop`
+                  uses only the cells of the tile without the overlap,
+                  `mean` computes the mean of all the tiles and `feather`
+                  computes a mean weighted with the distance from the border
+                  of each tile
+    :type blend: str
+    :param obbox_list: a list of BBox object with overlap, required by the
+                       `mean` and `feather` methods
+    :type obbox_list: list of list of BBox object
+    :param processes: number of processes used to read the tiles, if None
+                      the number of processors available, if 1 the tiles
+                      are read by the current process
+    :type processes: int
+    """
+    if blend not in BLEND_METHODS:
+        raise ValueError(_("Blend method {0} not supported, valid methods "
+                           "are: {1}").format(blend, ', '.join(BLEND_METHODS)))
+    reg = reg if reg else Region()
+    sei = [get_start_end_index(row, reg) for row in bbox_list]
+    if blend == 'crop':
+        osei = sei
+    else:
+        if obbox_list is None:
+            raise ValueError(_("The bounding boxes with overlap are required "
+                               "by the {0} method").format(blend))
+        osei = [get_start_end_index(row, reg) for row in obbox_list]
+
+    pool = mltp.Pool(processes) if processes != 1 else None
+    try:
+        for trow in range(len(sei)):
+            r_start, r_end = sei[trow][0][:2]
+            # select the blocks of the tiles that overlap the stripe
+            blocks = []
+            rows = [trow] if blend == 'crop' else range(len(osei))
+            for orow in rows:
+                for ocol, (tr_start, tr_end, c_start, c_end) in \
+                        enumerate(osei[orow]):
+                    br_start, br_end = max(tr_start, r_start), min(tr_end,
+                                                                    r_end)
+                    if br_start < br_end:
+                        blocks.append((orow, ocol, br_start, br_end,
+                                       c_start, c_end))
+            args = [tiles[blk[0]][blk[1]] + blk[2:] for blk in blocks]
+            data = pool.map(_read_block, args) if pool else \
+                [_read_block(arg) for arg in args]
+
+            stripe = Buffer((r_end - r_start, reg.cols), rast.mtype)
+            if blend == 'crop':
+                for blk, (mtype, block) in zip(blocks, data):
+                    stripe[:, blk[4]:blk[5]] = block
+            else:
+                num = np.zeros(stripe.shape)
+                den = np.zeros(stripe.shape)
+                for (orow, ocol, br_start, br_end, c_start, c_end), \
+                        (mtype, block) in zip(blocks, data):
+                    values = _to_float(mtype, block)
+                    if blend == 'feather':
+                        weights = get_feather_weights(osei[orow][ocol],
+                                                      reg.rows, reg.cols)
+                        tr_start = osei[orow][ocol][0]
+                        weights = weights[br_start - tr_start:
+                                          br_end - tr_start]
+                    else:
+                        weights = np.ones(values.shape)
+                    valid = ~np.isnan(values)
+                    weights[~valid] = 0.
+                    values[~valid] = 0.
+                    rstripe = slice(br_start - r_start, br_end - r_start)
+                    num[rstripe, c_start:c_end] += values * weights
+                    den[rstripe, c_start:c_end] += weights
+                nulls = den == 0
+                den[nulls] = 1.
+                result = num / den
+                if rast.mtype == 'CELL':
+                    result = np.rint(result)
+                    result[nulls] = CELL_NULL
+                else:
+                    result[nulls] = np.nan
+                stripe[:] = result
+            rast.write_block(stripe)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
 
 
 def rpatch_map(raster, mapset, mset_str, bbox_list, overwrite=False,
-               start_row=0, start_col=0, prefix=''):
+               start_row=0, start_col=0, prefix='', blend='crop',
+               obbox_list=None, processes=None):
     # TODO is prefix useful??
     """Patch raster using a bounding box list to trim the raster.
 
@@ -72,26 +265,63 @@ def rpatch_map(raster, mapset, mset_str, bbox_list, overwrite=False,
     :type start_col: int
     :param prefix: the prefix of output raster
     :type prefix: str
+    :param blend: the method used to compute the overlapping cells, see
+                  `rpatch_tile_maps`
+    :type blend: str
+    :param obbox_list: a list of BBox object with overlap
+    :type obbox_list: list of BBox object
+    :param processes: number of processes used to read the tiles, see
+                      `rpatch_tile_maps`
+    :type processes: int
     """
+    tiles = [[(raster, mset_str % (start_row + row, start_col + col))
+              for col in range(len(rbbox))]
+             for row, rbbox in enumerate(bbox_list)]
     # Instantiate the RasterRow input objects
     rast = RasterRow(prefix + raster, mapset)
-    rtype = RasterRow(name=raster, mapset=mset_str % (0, 0))
+    rtype = RasterRow(*tiles[0][0])
+    rtype.open('r')
+    rast.open('w', mtype=rtype.mtype, overwrite=overwrite)
+    rtype.close()
+    try:
+        rpatch_tile_maps(rast, tiles, bbox_list, blend=blend,
+                         obbox_list=obbox_list, processes=processes)
+    finally:
+        rast.close()
+
+
+def rpatch_tiles(raster, tile_names, bbox_list, overwrite=False, prefix='',
+                 blend='crop', obbox_list=None, processes=None):
+    """Patch raster tiles that are in the current mapset using a bounding
+    box list to trim the tiles.
+
+    :param raster: the name of output raster
+    :type raster: str
+    :param tile_names: a list with a list of tile names for each row
+    :type tile_names: list of list of str
+    :param bbox_list: a list of BBox object to convert
+    :type bbox_list: list of BBox object
+    :param overwrite: overwrite existing raster
+    :type overwrite: bool
+    :param prefix: the prefix of output raster
+    :type prefix: str
+    :param blend: the method used to compute the overlapping cells, see
+                  `rpatch_tile_maps`
+    :type blend: str
+    :param obbox_list: a list of BBox object with overlap
+    :type obbox_list: list of BBox object
+    :param processes: number of processes used to read the tiles, see
+                      `rpatch_tile_maps`
+    :type processes: int
+    """
+    tiles = [[(name, '') for name in names] for names in tile_names]
+    rast = RasterRow(prefix + raster)
+    rtype = RasterRow(*tiles[0][0])
     rtype.open('r')
     rast.open('w', mtype=rtype.mtype, overwrite=overwrite)
     rtype.close()
-    rasts = []
-    for row, rbbox in enumerate(bbox_list):
-        rrasts = []
-        for col in range(len(rbbox)):
-            rrasts.append(RasterRow(name=raster,
-                                    mapset=mset_str % (start_row + row,
-                                                       start_col + col)))
-            rrasts[-1].open('r')
-        rasts.append(rrasts)
-        rpatch_row(rast, rrasts, rbbox)
-
-        for rst in rrasts:
-            rst.close()
-            del(rst)
-
-    rast.close()
+    try:
+        rpatch_tile_maps(rast, tiles, bbox_list, blend=blend,
+                         obbox_list=obbox_list, processes=processes)
+    finally:
+        rast.close()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Test the split of the region and the result of GridModule on a small region
+"""
+from grass.gunittest import TestCase, test
+
+from grass.script.core import list_strings
+
+from grass.pygrass.gis import Location
+from grass.pygrass.modules.grid.grid import GridModule
+from grass.pygrass.modules.grid.split import split_region_tiles
+
+
+class GridModuleTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Compute the reference map in a single run on a 60x80 region"""
+        cls.use_temp_region()
+        cls.runModule('g.region', n=60, s=0, w=0, e=80, res=1)
+        cls.runModule('r.mapcalc', overwrite=True,
+                      expression="tmp_grid_in = if(col() == 5, null(), "
+                                 "row() * col() % 17)")
+        cls.runModule('r.neighbors', input='tmp_grid_in',
+                      output='tmp_grid_ref', size=3, overwrite=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.runModule('g.remove', flags='f', type='raster',
+                      pattern='tmp_grid_*')
+        cls.del_temp_region()
+
+    def test_split(self):
+        """The tiles cover the region, the overlap is inside the region"""
+        bboxes = split_region_tiles(width=30, height=25, overlap=1)
+        self.assertEqual([len(row) for row in bboxes], [3, 3, 3])
+        self.assertEqual([(b.north, b.south) for b in zip(*bboxes)[0]],
+                         [(60, 34), (36, 9), (11, 0)])
+        self.assertEqual([(b.west, b.east) for b in bboxes[0]],
+                         [(0, 31), (29, 61), (59, 80)])
+
+    def run_grid(self, output, **kargs):
+        """Run r.neighbors on 3x3 tiles"""
+        grd = GridModule('r.neighbors', width=30, height=25, overlap=1,
+                         processes=2, input='tmp_grid_in', output=output,
+                         size=3, overwrite=True, **kargs)
+        grd.run()
+        return grd
+
+    def test_shared_mapset(self):
+        """The tiles computed in the current mapset match a single run"""
+        self.run_grid('tmp_grid_shared', shared_mapset=True)
+        self.assertRastersNoDifference(actual='tmp_grid_shared',
+                                       reference='tmp_grid_ref',
+                                       precision=1e-6)
+        # the maps of the tiles are removed
+        self.assertEqual(list_strings('raster',
+                                      pattern='tmp_grid_shared_*'), [])
+
+    def test_mapsets(self):
+        """The tiles computed in their own mapsets match a single run"""
+        self.run_grid('tmp_grid_mapsets')
+        self.assertRastersNoDifference(actual='tmp_grid_mapsets',
+                                       reference='tmp_grid_ref',
+                                       precision=1e-6)
+        # the mapsets of the tiles are removed
+        self.assertEqual(Location().mapsets('rneighbors_*'), [])
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Test the patch of the tiles computed on a small region with the result of
+a single run on the whole region
+"""
+import os
+
+from grass.gunittest import TestCase, test
+
+from grass.script.core import run_command
+
+from grass.pygrass.gis.region import Region
+from grass.pygrass.modules.grid.grid import get_region_env
+from grass.pygrass.modules.grid.patch import BLEND_METHODS, rpatch_tiles
+from grass.pygrass.modules.grid.split import split_region_tiles
+
+
+#: The expressions computed on the tiles and on the whole region, with nulls
+EXPRESSIONS = {'CELL': "if(x() == y(), null(), int(x() * 3 + y()))",
+               'DCELL': "if(x() == y(), null(), double(x()) / y())"}
+
+
+class PatchTestCase(TestCase):
+
+    width = 30
+    height = 25
+    overlap = 2
+
+    @classmethod
+    def setUpClass(cls):
+        """Compute the expressions on the whole 60x80 region and on each
+        tile with overlap"""
+        cls.use_temp_region()
+        cls.runModule('g.region', n=60, s=0, w=0, e=80, res=1)
+        cls.bboxes = split_region_tiles(width=cls.width, height=cls.height)
+        cls.obboxes = split_region_tiles(width=cls.width, height=cls.height,
+                                         overlap=cls.overlap)
+        region = Region()
+        cls.tiles = {}
+        for mtype, expression in EXPRESSIONS.items():
+            name = 'tmp_patch_%s' % mtype.lower()
+            cls.runModule('r.mapcalc', overwrite=True,
+                          expression="%s = %s" % (name, expression))
+            tiles = []
+            for row, box_row in enumerate(cls.obboxes):
+                tiles.append([])
+                for col, box in enumerate(box_row):
+                    tile = '%s_%d_%d' % (name, row, col)
+                    bbox = dict(north=box.north, south=box.south,
+                                east=box.east, west=box.west)
+                    env = dict(os.environ)
+                    env['GRASS_REGION'] = get_region_env(bbox, region)
+                    run_command('r.mapcalc', overwrite=True, env=env,
+                                expression="%s = %s" % (tile, expression))
+                    tiles[row].append(tile)
+            cls.tiles[mtype] = tiles
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.runModule('g.remove', flags='f', type='raster',
+                      pattern='tmp_patch_*')
+        cls.del_temp_region()
+
+    def patch(self, mtype, blend, processes):
+        """Patch the tiles and compare the result with the single run"""
+        name = 'tmp_patch_%s' % mtype.lower()
+        output = '%s_%s' % (name, blend)
+        rpatch_tiles(output, self.tiles[mtype], self.bboxes, overwrite=True,
+                     blend=blend, obbox_list=self.obboxes,
+                     processes=processes)
+        self.assertRasterFitsInfo(raster=output,
+                                  reference=dict(datatype=mtype, rows=60,
+                                                 cols=80))
+        self.assertRastersNoDifference(actual=output, reference=name,
+                                       precision=1e-9)
+
+    def test_cell(self):
+        """Patch CELL tiles with all the blend methods"""
+        for blend in BLEND_METHODS:
+            self.patch('CELL', blend, processes=1)
+
+    def test_dcell(self):
+        """Patch DCELL tiles with all the blend methods"""
+        for blend in BLEND_METHODS:
+            self.patch('DCELL', blend, processes=1)
+
+    def test_processes(self):
+        """The tiles read by several processes give the same result"""
+        self.patch('DCELL', 'crop', processes=2)
+        self.patch('CELL', 'feather', processes=2)
+
+
+if __name__ == '__main__':
+    test()
@@ -11,9 +11,17 @@ else:
     from itertools import zip_longest
 from xml.etree.ElementTree import fromstring
 import time
+import heapq
+from copy import deepcopy
+from threading import Thread
+if sys.version_info[0] == 2:
+    from Queue import Queue, Empty
+else:
+    from queue import Queue, Empty
 
-from grass.exceptions import CalledModuleError
+from grass.exceptions import CalledModuleError, ScriptError
 from grass.script.core import Popen, PIPE
+from grass.script.task import get_interface_description
 from grass.pygrass.errors import GrassError, ParameterError
 from grass.pygrass.utils import docstring_property
 from grass.pygrass.modules.interface.parameter import Parameter
@@ -58,21 +66,44 @@ def _get_bash(self, *args, **kargs):
     return self.get_bash()
 
 
+class _ModuleJob(object):
+    """Private class used by ParallelModuleQueue to store a queued Module
+    with its scheduling options and its execution results"""
+    def __init__(self, module, priority=0, depends=None, retries=0):
+        self.module = module
+        self.priority = priority
+        self.depends = list(depends) if depends else []
+        self.retries = retries
+        self.attempts = 0
+        self.returncode = None
+        self.error = None
+        self.time = None
+        self.start = None
+
+
 class ParallelModuleQueue(object):
     """This class is designed to run an arbitrary number of pygrass Module
     processes in parallel.
 
     Objects of type grass.pygrass.modules.Module can be put into the
-    queue using put() method. When the queue is full with the maximum
-    number of parallel processes it will wait for all processes to finish,
-    sets the stdout and stderr of the Module object and removes it
-    from the queue when its finished.
+    queue using put() method. A new Module process is started as soon as
+    one of the running processes finishes, therefore a slow module keeps
+    busy only one of the available processes. When all the processes are
+    running put() waits until the first one finishes, sets the stdout and
+    stderr of the finished Module object and starts the next one.
+
+    Modules can have a priority, modules with higher priority are started
+    first, and can depend on other modules put into the same queue, in
+    this case they are started only when all the modules they depend on
+    have successfully finished. Failed modules can be run again for a
+    given number of retries.
 
-    To finish the queue before the maximum number of parallel
-    processes was reached call wait() .
+    To wait for all the queued Module processes call wait().
 
-    This class will raise a GrassError in case a Module process exits
-    with a return code other than 0.
+    The wait() method raises a GrassError in case a Module process exits
+    with a return code other than 0. The return code, the execution time
+    and the number of attempts of each finished Module can be read using
+    get_stats().
 
     Usage:
 
@@ -113,6 +144,8 @@ class ParallelModuleQueue(object):
     ...     mapcalc_list.append(new_mapcalc)
     ...     m = new_mapcalc(expression="test_pygrass_%i = %i"%(i, i))
     ...     queue.put(m)
+    >>> queue.get_num_run_procs() <= 5
+    True
     >>> queue.wait()
     >>> queue.get_num_run_procs()
     0
@@ -126,101 +159,66 @@ class ParallelModuleQueue(object):
     0
     0
 
-    Check with a queue size of 8 and 4 processes
+    Check priorities and dependencies with a queue size of 2, the third
+    module is started only when the first one has finished
 
-    >>> queue = ParallelModuleQueue(nprocs=8)
-    >>> mapcalc_list = []
-    >>> new_mapcalc = copy.deepcopy(mapcalc)
-    >>> mapcalc_list.append(new_mapcalc)
-    >>> m = new_mapcalc(expression="test_pygrass_1 =1")
-    >>> queue.put(m)
-    >>> queue.get_num_run_procs()
-    1
-    >>> new_mapcalc = copy.deepcopy(mapcalc)
-    >>> mapcalc_list.append(new_mapcalc)
-    >>> m = new_mapcalc(expression="test_pygrass_2 =2")
-    >>> queue.put(m)
-    >>> queue.get_num_run_procs()
-    2
-    >>> new_mapcalc = copy.deepcopy(mapcalc)
-    >>> mapcalc_list.append(new_mapcalc)
-    >>> m = new_mapcalc(expression="test_pygrass_3 =3")
-    >>> queue.put(m)
-    >>> queue.get_num_run_procs()
-    3
-    >>> new_mapcalc = copy.deepcopy(mapcalc)
-    >>> mapcalc_list.append(new_mapcalc)
-    >>> m = new_mapcalc(expression="test_pygrass_4 =4")
-    >>> queue.put(m)
-    >>> queue.get_num_run_procs()
-    4
+    >>> queue = ParallelModuleQueue(nprocs=2)
+    >>> first = mapcalc.copy()(expression="test_pygrass_1 = 1")
+    >>> second = mapcalc.copy()(expression="test_pygrass_2 = 2")
+    >>> third = mapcalc.copy()(expression="test_pygrass_3 = test_pygrass_1")
+    >>> queue.put(first)
+    >>> queue.put(second, priority=1)
+    >>> queue.put(third, depends=[first])
     >>> queue.wait()
-    >>> queue.get_num_run_procs()
-    0
-    >>> queue.get_max_num_procs()
-    8
-    >>> for mapcalc in mapcalc_list:
-    ...     print(mapcalc.popen.returncode)
-    0
-    0
-    0
-    0
-
-    Check with a queue size of 3 and 4 processes
-
-    >>> queue = ParallelModuleQueue(nprocs=3)
-    >>> mapcalc_list = []
-    >>> new_mapcalc = copy.deepcopy(mapcalc)
-    >>> mapcalc_list.append(new_mapcalc)
-    >>> m = new_mapcalc(expression="test_pygrass_1 =1")
-    >>> queue.put(m)
-    >>> queue.get_num_run_procs()
-    1
-    >>> new_mapcalc = copy.deepcopy(mapcalc)
-    >>> mapcalc_list.append(new_mapcalc)
-    >>> m = new_mapcalc(expression="test_pygrass_2 =2")
-    >>> queue.put(m)
-    >>> queue.get_num_run_procs()
+    >>> [stat['returncode'] for stat in queue.get_stats()]
+    [0, 0, 0]
+    >>> queue.get_stats()[-1]['name']
+    'r.mapcalc'
+
+    Failed modules raise a GrassError when wait() is called
+
+    >>> queue = ParallelModuleQueue(nprocs=2, retries=1)
+    >>> fail = mapcalc.copy()(expression="test_pygrass_1 = unknown_map")
+    >>> queue.put(fail)
+    >>> queue.wait()                                 # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    ...
+    GrassError: Error running module r.mapcalc ...
+    >>> queue.get_stats()[0]['attempts']
     2
-    >>> new_mapcalc = copy.deepcopy(mapcalc)
-    >>> mapcalc_list.append(new_mapcalc)
-    >>> m = new_mapcalc(expression="test_pygrass_3 =3")
-    >>> queue.put(m) # Now it will wait until all procs finish and set the counter back to 0
-    >>> queue.get_num_run_procs()
-    0
-    >>> new_mapcalc = copy.deepcopy(mapcalc)
-    >>> mapcalc_list.append(new_mapcalc)
-    >>> m = new_mapcalc(expression="test_pygrass_%i = %i"%(i, i))
-    >>> queue.put(m)
-    >>> queue.get_num_run_procs()
-    1
-    >>> queue.wait()
-    >>> queue.get_num_run_procs()
-    0
-    >>> queue.get_max_num_procs()
-    3
-    >>> for mapcalc in mapcalc_list:
-    ...     print(mapcalc.popen.returncode)
-    0
-    0
-    0
-    0
 
     """
-    def __init__(self, nprocs=1):
+    def __init__(self, nprocs=1, retries=0):
         """Constructor
 
         :param nprocs: The maximum number of Module processes that
                        can be run in parallel, defualt is 1, if None
                        then use all the available CPUs.
         :type nprocs: int
+        :param retries: The default number of times a failed Module is
+                        run again
+        :type retries: int
         """
         nprocs = int(nprocs) if nprocs else cpu_count()
         self._num_procs = nprocs
-        self._list = nprocs * [None]
-        self._proc_count = 0
-
-    def put(self, module):
+        self._retries = int(retries)
+        # counter used to keep the insertion order of modules with the
+        # same priority
+        self._count = 0
+        # heap of (-priority, count, job) of the modules ready to run
+        self._ready = []
+        # modules that are waiting for their dependencies
+        self._waiting = []
+        self._running = []
+        # jobs finished by the threads that wait for the processes
+        self._done = Queue()
+        # id of the finished modules and their success
+        self._status = {}
+        self._queued = set()
+        self._finished = []
+        self._failed = []
+
+    def put(self, module, priority=0, depends=None, retries=None):
         """Put the next Module object in the queue
 
         To run the Module objects in parallel the run\_ and finish\_ options
@@ -229,35 +227,51 @@ class ParallelModuleQueue(object):
         :param module: a preconfigured Module object with run\_ and finish\_
                        set to False
         :type module: Module object
+        :param priority: modules with higher priority are started first
+        :type priority: int
+        :param depends: list of Module objects, already put into the queue,
+                        that must finish successfully before the module
+                        is started
+        :type depends: list
+        :param retries: number of times the module is run again if it fails,
+                        default is the retries value of the queue
+        :type retries: int
         """
-        self._list[self._proc_count] = module
+        for dep in depends or []:
+            if id(dep) not in self._queued:
+                raise ParameterError(_("Module <%s> must be put into the "
+                                       "queue before its dependent modules")
+                                     % dep.name)
         # Force that finish is False, otherwise the execution
         # will not be parallel
-        self._list[self._proc_count].finish_ = False
-        self._list[self._proc_count].run()
-        self._proc_count += 1
-
-        if self._proc_count == self._num_procs:
-            self.wait()
+        module.finish_ = False
+        job = _ModuleJob(module, priority, depends,
+                         self._retries if retries is None else int(retries))
+        self._queued.add(id(module))
+        if job.depends:
+            self._waiting.append(job)
+            self._release_waiting()
+        else:
+            self._push(job)
+        self._schedule()
 
     def get(self, num):
-        """Get a Module object from the queue
+        """Get a running Module object from the queue
 
         :param num: the number of the object in queue
         :type num: int
         :returns: the Module object or None if num is not in the queue
         """
-        if num < self._num_procs:
-            return self._list[num]
+        if num < len(self._running):
+            return self._running[num].module
         return None
 
     def get_num_run_procs(self):
-        """Get the number of Module processes that are in the queue running
-        or finished
+        """Get the number of Module processes that are running in the queue
 
-        :returns: the number fo Module processes running/finished in the queue
+        :returns: the number of Module processes running in the queue
         """
-        return self._proc_count
+        return len(self._running)
 
     def get_max_num_procs(self):
         """Return the maximum number of parallel Module processes
@@ -275,23 +289,123 @@ class ParallelModuleQueue(object):
         :type nprocs: int
         """
         self._num_procs = int(nprocs)
-        self.wait()
+        self._schedule()
+
+    def get_stats(self):
+        """Return the name, the command, the return code, the execution
+        time, the number of attempts and the exception raised waiting for
+        the process (if any) of the finished modules, in order of
+        completion. Modules that were not run because a dependency failed
+        have a return code set to None.
+
+        :returns: a list of dictionaries
+        """
+        return [{'name': job.module.name, 'cmd': job.module.get_bash(),
+                 'returncode': job.returncode, 'time': job.time,
+                 'attempts': job.attempts, 'priority': job.priority,
+                 'error': job.error}
+                for job in self._finished]
 
     def wait(self):
-        """Wait for all Module processes that are in the list to finish
+        """Wait for all Module processes that are in the queue to finish
         and set the modules stdout and stderr output options
         """
-        for proc in self._list:
-            if proc:
-                stdout, stderr = proc.popen.communicate(input=proc.stdin)
-                proc.outputs['stdout'].value = stdout if stdout else ''
-                proc.outputs['stderr'].value = stderr if stderr else ''
-
-                if proc.popen.returncode != 0:
-                    GrassError(("Error running module %s") % (proc.name))
-
-        self._list = self._num_procs * [None]
-        self._proc_count = 0
+        while self._ready or self._running:
+            self._schedule()
+            if self._running:
+                self._collect(block=True)
+        failed, self._failed = self._failed, []
+        if failed:
+            raise GrassError(_("Error running module %s") %
+                             ', '.join([job.module.get_bash()
+                                        for job in failed]))
+
+    def _push(self, job):
+        """Add a job to the heap of the jobs ready to run"""
+        self._count += 1
+        heapq.heappush(self._ready, (-job.priority, self._count, job))
+
+    def _schedule(self):
+        """Collect the finished processes and start the ready modules,
+        if all the processes are busy wait until one of them finishes"""
+        self._collect(block=False)
+        while self._ready:
+            while self._ready and len(self._running) < self._num_procs:
+                self._start(heapq.heappop(self._ready)[2])
+            if self._ready:
+                self._collect(block=True)
+
+    def _start(self, job):
+        """Run the module and start a thread waiting for its process"""
+        job.attempts += 1
+        job.start = time.time()
+        job.module.run()
+        self._running.append(job)
+        thread = Thread(target=self._communicate, args=(job, ))
+        thread.daemon = True
+        thread.start()
+
+    def _communicate(self, job):
+        """Wait for the module process, executed in a separate thread"""
+        module = job.module
+        try:
+            stdout, stderr = module.popen.communicate(input=module.stdin)
+            module.outputs['stdout'].value = stdout if stdout else ''
+            module.outputs['stderr'].value = stderr if stderr else ''
+            job.returncode = module.popen.returncode
+            job.error = None
+        except Exception as e:
+            # the job fails, the queue must not wait for it forever
+            job.returncode = -1
+            job.error = e
+        finally:
+            module.time = job.time = time.time() - job.start
+            self._done.put(job)
+
+    def _collect(self, block):
+        """Process the finished jobs, if block is True wait for at least
+        one job to finish"""
+        while self._running:
+            try:
+                # use a timeout to keep the main thread interruptible
+                job = self._done.get(block, 0.5) if block else \
+                    self._done.get_nowait()
+            except Empty:
+                if block:
+                    continue
+                return
+            block = False
+            self._running.remove(job)
+            if job.returncode != 0 and job.attempts <= job.retries:
+                get_msgr().debug(1, "Retry: %s" % job.module.get_bash())
+                self._push(job)
+                continue
+            self._finish(job)
+            self._release_waiting()
+
+    def _finish(self, job):
+        """Store the results of a job that will not be run again"""
+        self._status[id(job.module)] = job.returncode == 0
+        self._finished.append(job)
+        if job.returncode != 0:
+            self._failed.append(job)
+
+    def _release_waiting(self):
+        """Move to the ready jobs the modules whose dependencies are
+        finished, skip the modules with a failed dependency"""
+        changed = True
+        while changed:
+            changed = False
+            for job in list(self._waiting):
+                status = [self._status.get(id(dep)) for dep in job.depends]
+                if None in status:
+                    continue
+                self._waiting.remove(job)
+                changed = True
+                if all(status):
+                    self._push(job)
+                else:
+                    self._finish(job)
 
 
 class Module(object):
@@ -490,14 +604,12 @@ class Module(object):
         else:
             raise GrassError("Problem initializing the module {s}".format(s=cmd))
         try:
-            # call the command with --interface-description
-            get_cmd_xml = Popen([cmd, "--interface-description"], stdout=PIPE)
-        except OSError as e:
-            print("OSError error({0}): {1}".format(e.errno, e.strerror))
-            str_err = "Error running: `%s --interface-description`."
-            raise GrassError(str_err % self.name)
-        # get the xml of the module
-        self.xml = get_cmd_xml.communicate()[0]
+            # get the xml of the module, the module is called with
+            # --interface-description only if it is not already cached
+            self.xml = get_interface_description(self.name)
+        except ScriptError as e:
+            str_err = "Error running: `%s --interface-description`. %s"
+            raise GrassError(str_err % (self.name, e.value))
         # transform and parse the xml into an Element class:
         # http://docs.python.org/library/xml.etree.elementtree.html
         tree = fromstring(self.xml)
@@ -616,6 +728,29 @@ class Module(object):
             return self.run()
         return self
 
+    def copy(self):
+        """Return a copy of the module with the same parameters and flags
+        values, the interface description is not read again, therefore a
+        configured module can be used as a template.
+
+        >>> mapcalc = Module("r.mapcalc", overwrite=True, run_=False)
+        >>> new_mapcalc = mapcalc.copy()
+        >>> new_mapcalc(expression="test_b = 2")
+        Module('r.mapcalc')
+        >>> new_mapcalc.inputs.expression
+        u'test_b = 2'
+        >>> mapcalc.inputs.expression is None
+        True
+        """
+        # the process of the last run can not be copied
+        popen, self.popen = self.popen, None
+        try:
+            module = deepcopy(self)
+        finally:
+            self.popen = popen
+        module.time = None
+        return module
+
     def get_bash(self):
         """Return a BASH rapresentation of the Module."""
         return ' '.join(self.make_cmd())
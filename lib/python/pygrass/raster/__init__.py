@@ -142,6 +142,119 @@ class RasterRow(RasterAbstractBase):
         """
         libraster.Rast_put_row(self._fd, row.p, self._gtype)
 
+    @must_be_open
+    def read_block(self, row_off=0, col_off=0, nrows=None, ncols=None,
+                   out=None):
+        """Read a block of the map into a two dimensional Buffer.
+
+        Each row is read by `Rast_get_row` straight into the memory of the
+        output buffer, so no Python object is allocated per row. If the
+        block does not span the whole width of the region, a single row
+        buffer is reused and only the requested columns are copied.
+
+        :param row_off: first row of the block
+        :type row_off: int
+        :param col_off: first column of the block
+        :type col_off: int
+        :param nrows: number of rows to read, default until the last row
+        :type nrows: int
+        :param ncols: number of columns to read, default until the last
+                      column
+        :type ncols: int
+        :param out: Buffer instance with shape (nrows, ncols) and the same
+                    type of the map, used to store the values
+        :type out: Buffer
+
+        >>> elev = RasterRow('elevation')
+        >>> elev.open()
+        >>> block = elev.read_block(0, 0, 2, 3)
+        >>> block                   # doctest: +NORMALIZE_WHITESPACE
+        Buffer([[ 141.99613953,  141.27848816,  141.37904358],
+                [ 142.90461731,  142.39450073,  142.68611145]], dtype=float32)
+        >>> elev.close()
+
+        """
+        nrows = self._rows - row_off if nrows is None else nrows
+        ncols = self._cols - col_off if ncols is None else ncols
+        if (row_off < 0 or col_off < 0 or nrows < 0 or ncols < 0 or
+                row_off + nrows > self._rows or col_off + ncols > self._cols):
+            str_err = _("Block ({0}, {1}, {2}, {3}) out of the region "
+                        "({4} rows, {5} cols)")
+            raise IndexError(str_err.format(row_off, col_off, nrows, ncols,
+                                            self._rows, self._cols))
+        if out is None:
+            out = Buffer((nrows, ncols), self.mtype)
+        elif (out.shape != (nrows, ncols) or
+                out.dtype != RTYPE[self.mtype]['numpy'] or
+                not out.flags['C_CONTIGUOUS']):
+            str_err = _("The output buffer must be a C contiguous array "
+                        "with shape {0} and type {1}")
+            raise ValueError(str_err.format((nrows, ncols), self.mtype))
+
+        if col_off == 0 and ncols == self._cols:
+            address = out.ctypes.data
+            stride = out.strides[0]
+            for row in range(row_off, row_off + nrows):
+                libraster.Rast_get_row(self._fd, ctypes.c_void_p(address),
+                                       row, self._gtype)
+                address += stride
+        else:
+            row_buffer = Buffer((self._cols,), self.mtype)
+            for irow, row in enumerate(range(row_off, row_off + nrows)):
+                libraster.Rast_get_row(self._fd, row_buffer.p, row,
+                                       self._gtype)
+                out[irow] = row_buffer[col_off:col_off + ncols]
+        return out
+
+    @must_be_open
+    def write_block(self, array):
+        """Write sequentially a block of rows, the number of columns of the
+        block must be equal to the number of columns of the region.
+
+        The array is converted to the map type once, then every row is
+        passed to `Rast_put_row` as a pointer inside the array memory.
+
+        :param array: two dimensional array with shape (nrows, cols)
+        :type array: Buffer or numpy.ndarray
+        """
+        if array.ndim != 2 or array.shape[1] != self._cols:
+            str_err = _("The block must be a two dimensional array "
+                        "with {0} columns")
+            raise ValueError(str_err.format(self._cols))
+        array = np.ascontiguousarray(array, dtype=RTYPE[self.mtype]['numpy'])
+        address = array.ctypes.data
+        stride = array.strides[0]
+        for _row in range(array.shape[0]):
+            libraster.Rast_put_row(self._fd, ctypes.c_void_p(address),
+                                   self._gtype)
+            address += stride
+
+    @must_be_open
+    def to_numpy(self, out=None):
+        """Return the whole map in the current region as a two dimensional
+        Buffer, see `read_block`.
+
+        :param out: Buffer instance with shape (rows, cols) used to store
+                    the values
+        :type out: Buffer
+        """
+        return self.read_block(out=out)
+
+    @must_be_open
+    def from_numpy(self, array):
+        """Write the whole map from a two dimensional array with the same
+        shape of the current region, see `write_block`.
+
+        :param array: two dimensional array with shape (rows, cols)
+        :type array: Buffer or numpy.ndarray
+        """
+        if array.shape != (self._rows, self._cols):
+            str_err = _("The array shape {0} is different from the region "
+                        "shape {1}")
+            raise ValueError(str_err.format(array.shape,
+                                            (self._rows, self._cols)))
+        self.write_block(array)
+
     def open(self, mode=None, mtype=None, overwrite=None):
         """Open the raster if exist or created a new one.
 
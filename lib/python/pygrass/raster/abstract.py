@@ -7,6 +7,7 @@ Created on Fri Aug 17 16:05:25 2012
 from __future__ import (nested_scopes, generators, division, absolute_import,
                         with_statement, print_function, unicode_literals)
 import ctypes
+import numpy as np
 
 #
 # import GRASS modules
@@ -44,6 +45,43 @@ range: {min}, {max}
 proj: {proj}
 """
 
+#: Null value of CELL raster maps
+CELL_NULL = -2147483648
+
+#: Offsets of the rows and columns of the cells used by each interpolation
+INTERP_OFFSETS = {'nearest': (0, ),
+                  'bilinear': (0, 1),
+                  'bicubic': (-1, 0, 1, 2)}
+
+
+def interp_weights(frac, interp):
+    """Return the weights of the neighbour cells used by an interpolation
+    method, bicubic uses the same Catmull-Rom spline of `Rast_interp_cubic`
+
+    :param frac: the fractional distances from the first cell
+    :type frac: numpy.ndarray
+    :param interp: the interpolation method: *nearest*, *bilinear* or
+                   *bicubic*
+    :type interp: str
+
+    >>> interp_weights(np.array([0., 0.25]), 'bilinear')
+    array([[ 1.  ,  0.  ],
+           [ 0.75,  0.25]])
+    >>> interp_weights(np.array([0.5]), 'bicubic')
+    array([[-0.0625,  0.5625,  0.5625, -0.0625]])
+    """
+    if interp == 'nearest':
+        return np.ones((len(frac), 1))
+    if interp == 'bilinear':
+        return np.column_stack((1. - frac, frac))
+    frac2 = frac * frac
+    frac3 = frac2 * frac
+    return np.column_stack(((-frac3 + 2. * frac2 - frac) / 2.,
+                            (3. * frac3 - 5. * frac2 + 2.) / 2.,
+                            (-3. * frac3 + 4. * frac2 + frac) / 2.,
+                            (frac3 - frac2) / 2.))
+
+
 
 class Info(object):
     def __init__(self, name, mapset=''):
@@ -453,11 +491,92 @@ class RasterAbstractBase(object):
         if not region:
             region = Region()
         row, col = utils.coor2pixel(point.coords(), region)
-        if col < 0 or col > region.cols or row < 0 or row > region.rows:
+        if col < 0 or col >= region.cols or row < 0 or row >= region.rows:
             return None
         line = self.get_row(int(row))
         return line[int(col)]
 
+    def _get_float_row(self, row):
+        """Return a row of the map as a float array with the null values
+        set to NaN"""
+        buff = self.get_row(row)
+        values = np.array(buff, dtype=np.float64)
+        if self.mtype == 'CELL':
+            values[buff == CELL_NULL] = np.nan
+        return values
+
+    @must_be_open
+    def get_values(self, coords, region=None, interp='nearest'):
+        """Return the values of the map for an array of coordinates.
+
+        The points are sorted by row and each row of the map is read only
+        once, keeping in memory only the rows required by the
+        interpolation. The points outside the region and the points that
+        use a null cell are returned as NaN.
+
+        :param coords: the coordinates of the points, with shape (n, 2)
+        :type coords: numpy.ndarray or list of tuple
+        :param region: the region of the map, if None the current region
+        :type region: Region object
+        :param interp: the interpolation method: *nearest*, *bilinear* or
+                       *bicubic*
+        :type interp: str
+
+        >>> from grass.pygrass.raster import RasterRow
+        >>> elev = RasterRow('elevation')
+        >>> elev.open()
+        >>> reg = Region()
+        >>> values = elev.get_values([(reg.west + 5., reg.north - 5.),
+        ...                           (reg.west - 5., reg.north)])
+        >>> round(values[0], 4), bool(np.isnan(values[1]))
+        (141.9961, True)
+        >>> elev.close()
+
+        """
+        if interp not in INTERP_OFFSETS:
+            raise ValueError(_("Interpolation method <{0}> not supported, "
+                               "use one of: {1}").format(interp,
+                               ', '.join(sorted(INTERP_OFFSETS))))
+        region = region if region else Region()
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        result = np.empty(len(coords))
+        result.fill(np.nan)
+        nrows, ncols = region.rows, region.cols
+        frow = (region.north - coords[:, 1]) / region.nsres
+        fcol = (coords[:, 0] - region.west) / region.ewres
+        inside = np.nonzero((frow >= 0) & (frow < nrows) &
+                            (fcol >= 0) & (fcol < ncols))[0]
+        if not len(inside):
+            return result
+        if interp != 'nearest':
+            # interpolate between the centers of the cells
+            frow -= 0.5
+            fcol -= 0.5
+        row0 = np.floor(frow).astype(np.int64)
+        col0 = np.floor(fcol).astype(np.int64)
+        wrow = interp_weights(frow - row0, interp)
+        wcol = interp_weights(fcol - col0, interp)
+        offsets = np.array(INTERP_OFFSETS[interp])
+
+        points = inside[np.argsort(row0[inside], kind='mergesort')]
+        starts = np.nonzero(np.diff(row0[points]))[0] + 1
+        rows = {}
+        for group in np.split(points, starts):
+            needed = np.clip(row0[group[0]] + offsets, 0, nrows - 1)
+            for row in list(rows.keys()):
+                if row < needed[0]:
+                    del rows[row]
+            for row in needed:
+                if row not in rows:
+                    rows[row] = self._get_float_row(int(row))
+            block = np.vstack([rows[row] for row in needed])
+            cols = np.clip(col0[group][:, np.newaxis] + offsets, 0, ncols - 1)
+            # window has shape (rows offsets, points, columns offsets)
+            window = block[:, cols]
+            values = (window * wcol[group][np.newaxis]).sum(axis=2)
+            result[group] = (values * wrow[group].T).sum(axis=0)
+        return result
+
     @must_be_open
     def has_cats(self):
         """Return True if the raster map has categories"""
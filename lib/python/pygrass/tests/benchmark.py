@@ -316,6 +316,34 @@ def test__RasterRow_row_access__if():
     test_a.close()
     test_c.close()
 
+def test__RasterRow_block_access__add():
+    test_a = pygrass.RasterRow(name="test_a")
+    test_a.open(mode="r")
+
+    test_b = pygrass.RasterRow(name="test_b")
+    test_b.open(mode="r")
+
+    test_c = pygrass.RasterRow(name="test_c")
+    test_c.open(mode="w", mtype="FCELL", overwrite=True)
+
+    test_c.write_block(test_a.read_block() + test_b.read_block())
+
+    test_a.close()
+    test_b.close()
+    test_c.close()
+
+def test__RasterRow_block_access__if():
+    test_a = pygrass.RasterRow(name="test_a")
+    test_a.open(mode="r")
+
+    test_c = pygrass.RasterRow(name="test_c")
+    test_c.open(mode="w", mtype="CELL", overwrite=True)
+
+    test_c.write_block(test_a.read_block() > 50)
+
+    test_a.close()
+    test_c.close()
+
 def test__mapcalc__add():
     core.mapcalc("test_c = test_a + test_b", quite=True, overwrite=True)
 
@@ -191,9 +191,14 @@ def pixel2coor(pixel, region):
             libraster.Rast_col_to_easting(col, region.c_region))
 
 
-def get_raster_for_points(poi_vector, raster, column=None, region=None):
+def get_raster_for_points(poi_vector, raster, column=None, region=None,
+                          interp='nearest'):
     """Query a raster map for each point feature of a vector
 
+    The raster values are sampled with a single pass on the rows of the
+    map, see `RasterAbstractBase.get_values`, and if a column is given the
+    attribute table is updated with a single transaction.
+
     Example
 
     >>> from grass.pygrass.vector import VectorTopo
@@ -202,8 +207,11 @@ def get_raster_for_points(poi_vector, raster, column=None, region=None):
     >>> copy('schools','myschools','vect')
     >>> sch = VectorTopo('myschools')
     >>> sch.open(mode='r')
-    >>> get_raster_for_points(sch, ele)               # doctest: +ELLIPSIS
-    [(1, 633649.2856743174, 221412.94434781274, 145.06602)...
+    >>> result = get_raster_for_points(sch, ele)
+    >>> result[0]                                     # doctest: +ELLIPSIS
+    (1, 633649.2856743174, 221412.94434781274, 145.06602...)
+    >>> result.dtype.names
+    ('id', 'x', 'y', 'value')
     >>> sch.table.columns.add('elevation','double precision')
     >>> 'elevation' in sch.table.columns
     True
@@ -220,11 +228,14 @@ def get_raster_for_points(poi_vector, raster, column=None, region=None):
     :param point: point vector object
     :param raster: raster object
     :param str column: column name to update
+    :param str interp: the interpolation method: *nearest*, *bilinear* or
+                       *bicubic*
+    :return: if column is None a NumPy record array with the fields: id, x,
+             y and value, the points without a value are set to NaN;
+             otherwise True
 
     """
-    from math import isnan
-    if not column:
-        result = []
+    import numpy as np
     if region is None:
         from grass.pygrass.gis.region import Region
         region = Region()
@@ -234,21 +245,35 @@ def get_raster_for_points(poi_vector, raster, column=None, region=None):
         raster.open()
     if poi_vector.num_primitive_of('point') == 0:
         raise GrassError(_("Vector doesn't contain points"))
+    ids, cats, coords = [], [], []
     for poi in poi_vector.viter('points'):
-        val = raster.get_value(poi, region)
-        if column:
-            if val is not None and not isnan(val):
-                poi.attrs[column] = val
-        else:
-            if val is not None and not isnan(val):
-                result.append((poi.id, poi.x, poi.y, val))
-            else:
-                result.append((poi.id, poi.x, poi.y, None))
+        ids.append(poi.id)
+        cats.append(poi.cat)
+        coords.append((poi.x, poi.y))
+    coords = np.array(coords, dtype=np.float64).reshape(-1, 2)
+    values = raster.get_values(coords, region, interp)
     if not column:
-        return result
-    else:
-        poi.attrs.commit()
-        return True
+        result = np.empty(len(ids), dtype=[('id', np.int64),
+                                           ('x', np.float64),
+                                           ('y', np.float64),
+                                           ('value', np.float64)])
+        result['id'] = ids
+        result['x'] = coords[:, 0]
+        result['y'] = coords[:, 1]
+        result['value'] = values
+        return result.view(np.recarray)
+    table = poi_vector.table
+    records = [(float(val), cat) for val, cat in zip(values, cats)
+               if cat is not None and not np.isnan(val)]
+    sqlc = "UPDATE {tname} SET {col}=? WHERE {key}=?;".format(
+        tname=table.name, col=column, key=table.key)
+    if records:
+        table.execute(sqlc, many=True, values=records)
+        table.conn.commit()
+    if table.cache is not None and column in table.cache:
+        for val, cat in records:
+            table.cache.set(cat, column, val)
+    return True
 
 
 def r_export(rast, output='', fmt='png', **kargs):
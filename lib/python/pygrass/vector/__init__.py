@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
 from os.path import join, exists
+from collections import namedtuple
+import ctypes
+
+import numpy as np
+
 import grass.lib.gis as libgis
 libgis.G_gisinit('')
 import grass.lib.vector as libvect
@@ -13,9 +18,14 @@ from grass.pygrass.gis import Location
 
 from grass.pygrass.vector.geometry import GEOOBJ as _GEOOBJ
 from grass.pygrass.vector.geometry import read_line, read_next_line
+from grass.pygrass.vector.geometry import set_points, c_points_asarrays
+from grass.pygrass.vector.geometry import _as_coords
+from grass.pygrass.vector.geometry import array_point_in_ring
 from grass.pygrass.vector.geometry import Area as _Area
+from grass.pygrass.vector.geometry import Isle as _Isle
 from grass.pygrass.vector.abstract import Info
-from grass.pygrass.vector.basic import Bbox, Cats, Ilist
+from grass.pygrass.vector.basic import Bbox, BoxList, Cats, Ilist
+from grass.pygrass.vector.table import AttrsCache
 
 
 _NUMOF = {"areas": libvect.Vect_get_num_areas,
@@ -30,6 +40,256 @@ _NUMOF = {"areas": libvect.Vect_get_num_areas,
           "updated_nodes": libvect.Vect_get_num_updated_nodes,
           "volumes": libvect.Vect_get_num_volumes}
 
+#: number of attribute rows inserted with a single executemany call
+BULK_CHUNK = 10000
+
+
+#: number of features read for each batch by ``VectorTopo.viter_batches``
+BATCH_CHUNK = 10000
+
+#: a chunk of features stored by columns, the coordinates of the feature
+#: ``i`` are ``x[offsets[i]:offsets[i + 1]]``, the columns of ``bbox`` are:
+#: north, south, east, west, top and bottom (NaN for features without points)
+FeatureBatch = namedtuple('FeatureBatch',
+                          'ids types cats offsets x y z bbox')
+
+
+def _ftype_mask(ftype=None):
+    """Return the mask of the GV_* types of a list of type names, if None
+    the mask of all the line types"""
+    if ftype is None:
+        return (libvect.GV_POINTS | libvect.GV_LINES | libvect.GV_FACE |
+                libvect.GV_KERNEL)
+    mask = 0
+    for name in ftype:
+        if name not in VTYPE:
+            keys = "', '".join(sorted(VTYPE.keys()))
+            raise ValueError("ftype not supported, use one of: "
+                             "'%s'" % keys)
+        mask |= VTYPE[name]
+    return mask
+
+
+class BulkWriter(object):
+    """Write many geometry features and their attributes.
+
+    The attributes are buffered and inserted with ``executemany`` in
+    chunks of rows, inside a single transaction that is committed when
+    the writer is closed. If the map is open in ``rw`` mode the topology
+    is not updated feature by feature, but it is built again to the
+    previous level when the writer is closed: the ids of the geometry
+    objects written with ``write`` are set only then. The writer is
+    usually created with ``Vector.bulk_writer`` and used as a context
+    manager ::
+
+        >>> new = VectorTopo('newvect')
+        >>> cols = [(u'cat', 'INTEGER PRIMARY KEY'), (u'name', 'TEXT')]
+        >>> new.open('w', tab_name='newvect', tab_cols=cols)
+        >>> with new.bulk_writer(chunk=2) as writer:
+        ...     writer.write_points([(0, 0), (1, 1), (2, 2)],
+        ...                         [('a', ), ('b', ), ('c', )])
+        ...     writer.write_lines([[(0, 0), (1, 1), (2, 0)]], [('d', )])
+        >>> new.table.execute().fetchall()
+        [(1, u'a'), (2, u'b'), (3, u'c'), (4, u'd')]
+        >>> new.close()
+        >>> new.open('r')
+        >>> new.read(4)
+        Line([Point(0.000000, 0.000000), Point(1.000000, 1.000000), Point(2.000000, 0.000000)])
+        >>> new.close()
+        >>> new.remove()
+
+    """
+    def __init__(self, vector, chunk=BULK_CHUNK, set_cats=True):
+        self.vector = vector
+        self.chunk = chunk
+        self.set_cats = set_cats
+        self.rows = []
+        self.cursor = None
+        if vector.table is not None:
+            self.cursor = vector.table.conn.cursor()
+        self.c_points = ctypes.pointer(libvect.line_pnts())
+        self.c_cats = ctypes.pointer(libvect.line_cats())
+        self.c_nocats = ctypes.pointer(libvect.line_cats())
+        # number of features written, and the geometry objects written
+        # while the topology is not available with the number of the
+        # feature that gives their id once the topology is built again
+        self.n_written = 0
+        self.pending = []
+        # defer the topology update to the build on close
+        self.built = None
+        c_mapinfo = vector.c_mapinfo
+        if (c_mapinfo.contents.mode == libvect.GV_MODE_RW and
+                c_mapinfo.contents.plus.built > libvect.GV_BUILD_NONE):
+            self.built = c_mapinfo.contents.plus.built
+            libvect.Vect_build_partial(c_mapinfo, libvect.GV_BUILD_NONE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+            return
+        if self.cursor is not None:
+            # drop the attributes of the last transaction
+            self.cursor.close()
+            self.cursor = None
+            self.vector.table.conn.rollback()
+        self._build()
+
+    def _build(self):
+        """Build the topology to the level it had before writing and set
+        the ids of the geometry objects written in the meantime"""
+        if self.built is None:
+            return
+        c_mapinfo = self.vector.c_mapinfo
+        libvect.Vect_build_partial(c_mapinfo, self.built)
+        self.built = None
+        # the features are appended to the file, hence the new features
+        # are the last ones of the rebuilt topology
+        first = libvect.Vect_get_num_lines(c_mapinfo) - self.n_written
+        for geo_obj, number in self.pending:
+            self._set_id(geo_obj, first + number)
+        self.pending = []
+
+    def _set_id(self, geo_obj, line):
+        """Set the id of a geometry object from the id of its feature, the
+        id of an area is the id of the area of its centroid"""
+        if geo_obj.gtype == _Area.gtype:
+            area_id = libvect.Vect_get_centroid_area(self.vector.c_mapinfo,
+                                                     line)
+            if area_id > 0:
+                geo_obj.id = area_id
+        else:
+            geo_obj.id = line
+
+    def _write_line(self, gtype, c_points, c_cats):
+        """Write a feature, return the result of Vect_write_line"""
+        result = libvect.Vect_write_line(self.vector.c_mapinfo, gtype,
+                                         c_points, c_cats)
+        if result == -1:
+            raise GrassError("Not able to write the vector feature.")
+        self.n_written += 1
+        return result
+
+    def _write(self, gtype, c_points, c_cats, attrs=None):
+        """Write a feature and buffer its attributes, return the result of
+        Vect_write_line"""
+        vect = self.vector
+        vect.n_lines += 1
+        if self.set_cats:
+            libvect.Vect_reset_cats(c_cats)
+            libvect.Vect_cat_set(c_cats, vect.layer, vect.n_lines)
+        result = self._write_line(gtype, c_points, c_cats)
+        if self.cursor is not None and attrs is not None:
+            if hasattr(attrs, 'tolist'):
+                attrs = attrs.tolist()
+            row = [vect.n_lines, ]
+            row.extend(attrs)
+            self.rows.append(row)
+            if len(self.rows) >= self.chunk:
+                self.flush()
+        return result
+
+    def write(self, geo_obj, attrs=None):
+        """Write a geometry object, see ``Vector.write``. An area is
+        written as its boundary, the boundaries of its isles and its
+        centroid, which has the category and the attributes.
+
+        On level 2 the id of the object is set, if the topology is built
+        when the writer is closed the id is set only then; on level 1
+        the offset of the feature in the file is set.
+
+        :param geo_obj: a geometry grass object define in
+                        grass.pygrass.vector.geometry
+        :type geo_obj: geometry GRASS object
+        :param attrs: the values of the feature in the attribute table
+        :type attrs: list
+        """
+        if geo_obj.gtype == _Area.gtype:
+            result = self._write_area(geo_obj, attrs)
+        else:
+            result = self._write(geo_obj.gtype, geo_obj.c_points,
+                                 geo_obj.c_cats, attrs)
+        if self.built is not None:
+            self.pending.append((geo_obj, self.n_written))
+        elif self.vector.c_mapinfo.contents.level == 2:
+            # Vect_write_line returns 0 if the topology is not built
+            if result > 0:
+                self._set_id(geo_obj, result)
+        elif geo_obj.gtype != _Area.gtype:
+            geo_obj.offset = result
+
+    def _write_area(self, area, attrs=None):
+        """Write the boundaries and the centroid of an area, return the
+        result of Vect_write_line for the centroid"""
+        if area.boundary is None or area.centroid is None:
+            raise ValueError("The area must have a boundary and a centroid.")
+        libvect.Vect_reset_cats(self.c_nocats)
+        rings = [area.boundary]
+        for isle in area.isles or []:
+            rings.append(isle.points() if isinstance(isle, _Isle) else isle)
+        for ring in rings:
+            self._write_line(libvect.GV_BOUNDARY, ring.c_points,
+                             self.c_nocats)
+        return self._write(libvect.GV_CENTROID, area.centroid.c_points,
+                           area.c_cats, attrs)
+
+    def write_points(self, coords, attrs=None, gtype=libvect.GV_POINT):
+        """Write a point for each row of an array of coordinates
+
+        :param coords: the x, y (and z) coordinates of the points
+        :type coords: array with shape (n, 2) or (n, 3)
+        :param attrs: a sequence with the attributes of each point
+        :type attrs: sequence
+        :param gtype: the type of the features, GV_POINT or GV_CENTROID
+        :type gtype: int
+        """
+        coords = _as_coords(coords)
+        if attrs is not None and len(attrs) != len(coords):
+            raise ValueError("The number of attributes and points differ.")
+        is2D = coords.shape[1] == 2
+        c_points = self.c_points
+        for i, pnt in enumerate(coords.tolist()):
+            libvect.Vect_reset_line(c_points)
+            libvect.Vect_append_point(c_points, pnt[0], pnt[1],
+                                      0 if is2D else pnt[2])
+            self._write(gtype, c_points, self.c_cats,
+                        None if attrs is None else attrs[i])
+
+    def write_lines(self, lines, attrs=None, gtype=libvect.GV_LINE):
+        """Write a line for each array of coordinates
+
+        :param lines: the coordinates of the vertices of each line
+        :type lines: sequence of arrays with shape (n, 2) or (n, 3)
+        :param attrs: a sequence with the attributes of each line
+        :type attrs: sequence
+        :param gtype: the type of the features, GV_LINE or GV_BOUNDARY
+        :type gtype: int
+        """
+        if attrs is not None and len(attrs) != len(lines):
+            raise ValueError("The number of attributes and lines differ.")
+        for i, coords in enumerate(lines):
+            set_points(self.c_points, coords)
+            self._write(gtype, self.c_points, self.c_cats,
+                        None if attrs is None else attrs[i])
+
+    def flush(self):
+        """Insert the buffered attributes into the table"""
+        if self.rows:
+            self.vector.table.insert(self.rows, cursor=self.cursor, many=True)
+            self.rows = []
+
+    def close(self):
+        """Insert the buffered attributes, commit the transaction and
+        build the topology to the level it had before writing"""
+        if self.cursor is not None:
+            self.flush()
+            self.vector.table.conn.commit()
+            self.cursor.close()
+            self.cursor = None
+        self._build()
+
 
 #=============================================
 # VECTOR
@@ -201,6 +461,66 @@ class Vector(Info):
             # return offset into file where the feature starts (on level 1)
             geo_obj.offset = result
 
+    @must_be_open
+    def bulk_writer(self, chunk=BULK_CHUNK, set_cats=True):
+        """Return a ``BulkWriter`` to write many features, the attributes
+        are inserted in chunks and committed when the writer is closed.
+
+        :param chunk: number of attribute rows inserted at once
+        :type chunk: int
+        :param set_cats: if True, the category of the features is set
+                         using the default layer of the vector map and a
+                         progressive category value, see ``write``
+        :type set_cats: bool
+        """
+        return BulkWriter(self, chunk=chunk, set_cats=set_cats)
+
+    @must_be_open
+    def write_many(self, features, attrs=None, set_cats=True,
+                   chunk=BULK_CHUNK):
+        """Write many geometry features and their attributes, the
+        attributes are inserted in chunks and committed at the end.
+
+        :param features: a sequence of geometry objects or an array with
+                         the coordinates of points
+        :type features: sequence or array with shape (n, 2) or (n, 3)
+        :param attrs: a sequence with the values of each feature that will
+                      be insert in the attribute table
+        :type attrs: sequence
+        :param set_cats: if True, the category of the features is set
+                         using the default layer of the vector map and a
+                         progressive category value, see ``write``
+        :type set_cats: bool
+        :param chunk: number of attribute rows inserted at once
+        :type chunk: int
+
+            >>> new = VectorTopo('newvect')
+            >>> cols = [(u'cat', 'INTEGER PRIMARY KEY'), (u'name', 'TEXT')]
+            >>> new.open('w', tab_name='newvect', tab_cols=cols)
+            >>> from grass.pygrass.vector.geometry import Point
+            >>> new.write_many([Point(0, 0), Point(1, 1)], [('pub', ),
+            ...                                             ('restaurant', )])
+            >>> new.write_many(np.array([[2., 2.], [3., 3.]]))
+            >>> new.table.execute().fetchall()
+            [(1, u'pub'), (2, u'restaurant')]
+            >>> new.close()
+            >>> new.open('r')
+            >>> new.read(4)
+            Point(3.000000, 3.000000)
+            >>> new.close()
+            >>> new.remove()
+
+        """
+        with self.bulk_writer(chunk=chunk, set_cats=set_cats) as writer:
+            if isinstance(features, np.ndarray):
+                writer.write_points(features, attrs)
+            elif attrs is None:
+                for geo_obj in features:
+                    writer.write(geo_obj)
+            else:
+                for geo_obj, attr in zip(features, attrs):
+                    writer.write(geo_obj, attr)
+
     @must_be_open
     def has_color_table(self):
         """Return if vector has color table associated in file system;
@@ -408,6 +728,154 @@ class VectorTopo(Vector):
             keys = "', '".join(sorted(_GEOOBJ.keys()))
             raise ValueError("vtype not supported, use one of: '%s'" % keys)
 
+    @must_be_open
+    def viter_batches(self, vtype='lines', chunk=BATCH_CHUNK, ftype=None,
+                      layer=None, copy=False):
+        """Return an iterator of ``FeatureBatch``, each batch contains the
+        ids, the types, the categories, the coordinates and the bounding
+        boxes of a chunk of features stored in NumPy arrays.
+
+        The features are read with a single line_pnts and line_cats
+        structure and the arrays are allocated once and reused for all
+        the batches, without creating a geometry object for each feature.
+
+        :param vtype: the type of features: *lines* or *areas*, the
+                      coordinates of the areas are the coordinates of the
+                      outer ring
+        :type vtype: str
+        :param chunk: the maximum number of features of each batch
+        :type chunk: int
+        :param ftype: the types of the lines to read, e.g. ``['point',
+                      'centroid']``, if None all the lines are read; used
+                      only with *lines*
+        :type ftype: list of str
+        :param layer: the layer of the categories, if None the layer of
+                      the vector map is used; the category of the features
+                      without category is -1
+        :type layer: int
+        :param copy: if False the arrays of a batch are overwritten by the
+                     next batch, set to True to keep them
+        :type copy: bool
+
+            >>> cens = VectorTopo('census')
+            >>> cens.open(mode='r')
+            >>> batches = cens.viter_batches('areas', chunk=1000)
+            >>> batch = next(batches)
+            >>> len(batch.ids), batch.offsets[0], batch.bbox.shape
+            (1000, 0, (1000, 6))
+            >>> area = cens.viter('areas').next()
+            >>> area.id == batch.ids[0]
+            True
+            >>> area.get_centroid().cat == batch.cats[0]
+            True
+            >>> xy = area.get_points().toarray()
+            >>> (xy[:, 0] == batch.x[:batch.offsets[1]]).all()
+            True
+            >>> cens.close()
+
+        ..
+        """
+        if chunk < 1:
+            raise ValueError("chunk must be a positive number")
+        layer = self.layer if layer is None else layer
+        if vtype == 'lines':
+            n_features = len(self)
+            mask = _ftype_mask(ftype)
+        elif vtype == 'areas':
+            n_features = self.number_of('areas')
+        else:
+            raise ValueError("vtype not supported, use one of: "
+                             "'areas', 'lines'")
+
+        c_points = libvect.Vect_new_line_struct()
+        c_cats = libvect.Vect_new_cats_struct()
+        c_cat = ctypes.c_int()
+        ids = np.empty(chunk, dtype=np.int32)
+        types = np.empty(chunk, dtype=np.int32)
+        cats = np.empty(chunk, dtype=np.int32)
+        offsets = np.empty(chunk + 1, dtype=np.int64)
+        coords = np.empty((3, chunk * 4))
+        try:
+            v_id, n_batch, n_coords = 1, 0, 0
+            offsets[0] = 0
+            while v_id <= n_features:
+                if vtype == 'lines':
+                    if not libvect.Vect_line_alive(self.c_mapinfo, v_id):
+                        v_id += 1
+                        continue
+                    gtype = libvect.Vect_read_line(self.c_mapinfo, c_points,
+                                                   c_cats, v_id)
+                    if gtype < 0:
+                        raise GrassError("Error reading the feature %d "
+                                         "of the vector map." % v_id)
+                    if not gtype & mask:
+                        v_id += 1
+                        continue
+                    if not libvect.Vect_cat_get(c_cats, layer,
+                                                ctypes.byref(c_cat)):
+                        c_cat.value = -1
+                else:
+                    if not libvect.Vect_area_alive(self.c_mapinfo, v_id):
+                        v_id += 1
+                        continue
+                    if libvect.Vect_get_area_points(self.c_mapinfo, v_id,
+                                                    c_points) < 0:
+                        raise GrassError("Error reading the area %d "
+                                         "of the vector map." % v_id)
+                    gtype = libvect.GV_AREA
+                    c_cat.value = libvect.Vect_get_area_cat(self.c_mapinfo,
+                                                            v_id, layer)
+                n_points = c_points.contents.n_points
+                if n_coords + n_points > coords.shape[1]:
+                    larger = np.empty((3, max(2 * coords.shape[1],
+                                              n_coords + n_points)))
+                    larger[:, :n_coords] = coords[:, :n_coords]
+                    coords = larger
+                if n_points:
+                    coords[:, n_coords:n_coords + n_points] = \
+                        c_points_asarrays(c_points)
+                n_coords += n_points
+                ids[n_batch] = v_id
+                types[n_batch] = gtype
+                cats[n_batch] = c_cat.value
+                n_batch += 1
+                offsets[n_batch] = n_coords
+                v_id += 1
+                if n_batch == chunk:
+                    yield self._feature_batch(ids, types, cats, offsets,
+                                              coords, n_batch, copy)
+                    n_batch, n_coords = 0, 0
+            if n_batch:
+                yield self._feature_batch(ids, types, cats, offsets, coords,
+                                          n_batch, copy)
+        finally:
+            libvect.Vect_destroy_line_struct(c_points)
+            libvect.Vect_destroy_cats_struct(c_cats)
+
+    @staticmethod
+    def _feature_batch(ids, types, cats, offsets, coords, n_batch, copy):
+        """Return a FeatureBatch with the first ``n_batch`` features stored
+        in the buffers used by ``viter_batches``"""
+        n_coords = offsets[n_batch]
+        x, y, z = coords[:, :n_coords]
+        offsets = offsets[:n_batch + 1]
+        bbox = np.full((n_batch, 6), np.nan)
+        full = offsets[1:] > offsets[:-1]
+        if full.any():
+            starts = offsets[:-1][full]
+            for col, (values, reduce) in enumerate(((y, np.maximum),
+                                                    (y, np.minimum),
+                                                    (x, np.maximum),
+                                                    (x, np.minimum),
+                                                    (z, np.maximum),
+                                                    (z, np.minimum))):
+                bbox[full, col] = reduce.reduceat(values, starts)
+        batch = FeatureBatch(ids[:n_batch], types[:n_batch], cats[:n_batch],
+                             offsets, x, y, z, bbox)
+        if copy:
+            return FeatureBatch(*[array.copy() for array in batch])
+        return batch
+
     @must_be_open
     def rewind(self):
         """Rewind vector map to cause reads to start at beginning. ::
@@ -568,6 +1036,240 @@ class VectorTopo(Vector):
             raise GrassError("I can not find the Bbox.")
         return bbox
 
+    @must_be_open
+    def select_by_bboxes(self, bboxes, vtype='lines', ftype=None):
+        """Return the ids of the features that overlap each bounding box,
+        using the spatial index. The result is stored in two arrays: the
+        ids of the features selected by the bounding box ``i`` are
+        ``ids[offsets[i]:offsets[i + 1]]``.
+
+        :param bboxes: the bounding boxes, with the columns: north, south,
+                       east, west and optionally top and bottom; without
+                       top and bottom all the z values are selected
+        :type bboxes: array with shape (n, 4) or (n, 6)
+        :param vtype: the type of features: *lines*, *areas* or *isles*
+        :type vtype: str
+        :param ftype: the types of the lines to select, e.g. ``['point']``,
+                      if None all the lines are selected; used only with
+                      *lines*
+        :type ftype: list of str
+
+        ::
+
+            >>> cens = VectorTopo('census')
+            >>> cens.open(mode='r')
+            >>> bbox = cens.bbox()
+            >>> offsets, ids = cens.select_by_bboxes([[bbox.north,
+            ...                                        bbox.south,
+            ...                                        bbox.east,
+            ...                                        bbox.west]] * 2,
+            ...                                      vtype='areas')
+            >>> offsets[-1] == 2 * cens.number_of('areas')
+            True
+            >>> (ids[:offsets[1]] == ids[offsets[1]:]).all()
+            True
+            >>> cens.close()
+
+        ..
+        """
+        bboxes = np.asarray(bboxes, dtype=np.float64)
+        if bboxes.ndim != 2 or bboxes.shape[1] not in (4, 6):
+            raise ValueError("Bounding boxes must be an array with shape "
+                             "(n, 4) or (n, 6), not %r" % (bboxes.shape, ))
+        if vtype == 'lines':
+            mask = _ftype_mask(ftype)
+            select = lambda c_box, c_list: libvect.Vect_select_lines_by_box(
+                self.c_mapinfo, c_box, mask, c_list)
+        elif vtype == 'areas':
+            select = lambda c_box, c_list: libvect.Vect_select_areas_by_box(
+                self.c_mapinfo, c_box, c_list)
+        elif vtype == 'isles':
+            select = lambda c_box, c_list: libvect.Vect_select_isles_by_box(
+                self.c_mapinfo, c_box, c_list)
+        else:
+            raise ValueError("vtype not supported, use one of: "
+                             "'areas', 'isles', 'lines'")
+        if bboxes.shape[1] == 4:
+            zmax = np.finfo(np.float64).max
+            zrange = np.empty((len(bboxes), 2))
+            zrange[:, 0], zrange[:, 1] = zmax, -zmax
+            bboxes = np.hstack((bboxes, zrange))
+
+        c_box = ctypes.pointer(libvect.bound_box())
+        c_list = libvect.Vect_new_boxlist(0)
+        offsets = np.empty(len(bboxes) + 1, dtype=np.int64)
+        offsets[0] = 0
+        ids = np.empty(max(16, len(bboxes)), dtype=np.int32)
+        n_ids = 0
+        try:
+            for i, (north, south, east, west, top, bottom) in \
+                    enumerate(bboxes):
+                box = c_box.contents
+                box.N, box.S, box.E, box.W = north, south, east, west
+                box.T, box.B = top, bottom
+                select(c_box, c_list)
+                n_found = c_list.contents.n_values
+                if n_found:
+                    if n_ids + n_found > len(ids):
+                        larger = np.empty(max(2 * len(ids), n_ids + n_found),
+                                          dtype=np.int32)
+                        larger[:n_ids] = ids[:n_ids]
+                        ids = larger
+                    found = (ctypes.c_int * n_found).from_address(
+                        ctypes.addressof(c_list.contents.id.contents))
+                    ids[n_ids:n_ids + n_found] = np.ctypeslib.as_array(found)
+                    n_ids += n_found
+                offsets[i + 1] = n_ids
+        finally:
+            libvect.Vect_destroy_boxlist(c_list)
+        return offsets, ids[:n_ids].copy()
+
+    @must_be_open
+    def find_areas(self, points):
+        """Return the ids of the areas that contain each point, 0 for the
+        points outside all the areas, like ``Vect_find_area``.
+
+        The candidate areas of all the points are selected with
+        ``select_by_bboxes``, then the points are tested with the outer
+        ring and the isles of each candidate area, all the points of an
+        area at once. The points on a boundary can be assigned to any of
+        the areas that share the boundary.
+
+        :param points: the coordinates of the points
+        :type points: array with shape (n, 2) or (n, 3)
+
+        ::
+
+            >>> cens = VectorTopo('census')
+            >>> cens.open(mode='r')
+            >>> areas = [area for area in cens.viter('areas')][:3]
+            >>> points = [area.get_centroid().coords()[:2] for area in areas]
+            >>> cens.find_areas(points).tolist() == [area.id
+            ...                                      for area in areas]
+            True
+            >>> cens.find_areas([(0, 0)])
+            array([0], dtype=int32)
+            >>> cens.close()
+
+        ..
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2 or points.shape[1] not in (2, 3):
+            raise ValueError("Points must be an array with shape (n, 2) "
+                             "or (n, 3), not %r" % (points.shape, ))
+        result = np.zeros(len(points), dtype=np.int32)
+        if len(points) == 0:
+            return result
+        x, y = points[:, 0], points[:, 1]
+        offsets, ids = self.select_by_bboxes(np.column_stack((y, y, x, x)),
+                                             vtype='areas')
+        if len(ids) == 0:
+            return result
+        # group the candidate points by area
+        pnt_idx = np.repeat(np.arange(len(points)), np.diff(offsets))
+        order = np.argsort(ids, kind='mergesort')
+        ids, pnt_idx = ids[order], pnt_idx[order]
+        area_ids, starts = np.unique(ids, return_index=True)
+        ends = np.append(starts[1:], len(ids))
+
+        c_points = libvect.Vect_new_line_struct()
+        try:
+            for area_id, start, end in zip(area_ids, starts, ends):
+                candidates = pnt_idx[start:end]
+                candidates = candidates[result[candidates] == 0]
+                if len(candidates) == 0:
+                    continue
+                libvect.Vect_get_area_points(self.c_mapinfo, int(area_id),
+                                             c_points)
+                ring = np.column_stack(c_points_asarrays(c_points)[:2])
+                inside = array_point_in_ring(points[candidates], ring)
+                candidates = candidates[inside]
+                n_isles = libvect.Vect_get_area_num_isles(self.c_mapinfo,
+                                                          int(area_id))
+                for i in range(n_isles):
+                    if len(candidates) == 0:
+                        break
+                    isle = libvect.Vect_get_area_isle(self.c_mapinfo,
+                                                      int(area_id), i)
+                    libvect.Vect_get_isle_points(self.c_mapinfo, isle,
+                                                 c_points)
+                    ring = np.column_stack(c_points_asarrays(c_points)[:2])
+                    candidates = candidates[~array_point_in_ring(
+                        points[candidates], ring)]
+                result[candidates] = area_id
+        finally:
+            libvect.Vect_destroy_line_struct(c_points)
+        return result
+
+    @must_be_open
+    def prefetch_attrs(self, columns=None, vtype='areas', bbox=None):
+        """Read the columns of the attribute table for all the features, or
+        for the features inside a bounding box, with a single query and
+        store them in a columnar cache. The cache is used by the ``attrs``
+        of the features and returns the columns as NumPy arrays aligned
+        with the feature ids.
+
+        :param columns: the names of the columns to read, if None all the
+                        columns are read
+        :type columns: list of str
+        :param vtype: the type of features: *areas* or *lines*
+        :type vtype: str
+        :param bbox: the bounding box used to select the features, if None
+                     all the features are selected
+        :type bbox: Bbox object
+
+        ::
+
+            >>> cens = VectorTopo('census')
+            >>> cens.open(mode='r')
+            >>> cache = cens.prefetch_attrs(['TOTAL_POP'])
+            >>> len(cache.ids) == cens.number_of('areas')
+            True
+            >>> area = cens.viter('areas').next()
+            >>> area.attrs['TOTAL_POP'] == cache['TOTAL_POP'][0]
+            True
+            >>> cens.clear_attrs_cache()
+            >>> cens.close()
+
+        ..
+        """
+        if self.table is None:
+            raise GrassError("Table for vector {name} does not exist, "
+                             "attributes can not be loaded".format(name=self.name))
+        if vtype == 'areas':
+            if bbox is None:
+                ids = range(1, self.number_of('areas') + 1)
+            else:
+                found = BoxList()
+                libvect.Vect_select_areas_by_box(self.c_mapinfo, bbox.c_bbox,
+                                                 found.c_boxlist)
+                ids = found.ids
+            get_cat = libvect.Vect_get_area_cat
+        elif vtype == 'lines':
+            if bbox is None:
+                ids = range(1, len(self) + 1)
+            else:
+                found = BoxList()
+                libvect.Vect_select_lines_by_box(self.c_mapinfo, bbox.c_bbox,
+                                                 libvect.GV_POINTS |
+                                                 libvect.GV_LINES |
+                                                 libvect.GV_FACE |
+                                                 libvect.GV_KERNEL,
+                                                 found.c_boxlist)
+                ids = found.ids
+            get_cat = libvect.Vect_get_line_cat
+        else:
+            raise ValueError("vtype not supported, use one of: "
+                             "'areas', 'lines'")
+        cats = [get_cat(self.c_mapinfo, v_id, self.layer) for v_id in ids]
+        self.table.cache = AttrsCache(self.table, columns, cats=cats, ids=ids)
+        return self.table.cache
+
+    def clear_attrs_cache(self):
+        """Remove the attributes cache created by ``prefetch_attrs``"""
+        if self.table is not None:
+            self.table.cache = None
+
     def close(self, build=True, release=True):
         """Close the VectorTopo map, if release is True, the memory
         occupied by spatial index is released"""
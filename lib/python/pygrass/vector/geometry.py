@@ -16,7 +16,7 @@ import grass.lib.vector as libvect
 
 from grass.pygrass.errors import GrassError
 
-from grass.pygrass.vector.basic import Ilist, Bbox, Cats
+from grass.pygrass.vector.basic import Ilist, Bbox, BoxList, Cats
 from grass.pygrass.vector import sql
 
 
@@ -132,6 +132,237 @@ def get_xyz(pnt):
     return x, y, z
 
 
+def c_points_asarrays(c_points):
+    """Return the x, y and z coordinates of a line_pnts structure as three
+    NumPy arrays that share the memory of the structure, without copying
+    the coordinates.
+
+    The arrays are valid only while the structure exists and it is not
+    modified: adding points can move the coordinates to a new memory block.
+
+    >>> line = Line([(0, 0), (1, 1), (2, 0)])
+    >>> x, y, z = c_points_asarrays(line.c_points)
+    >>> x
+    array([ 0.,  1.,  2.])
+    >>> y[1] = 5.
+    >>> line[1]
+    Point(1.000000, 5.000000)
+
+    """
+    n_points = c_points.contents.n_points
+    if n_points == 0:
+        return np.zeros(0), np.zeros(0), np.zeros(0)
+    array_type = ctypes.c_double * n_points
+    return tuple(np.ctypeslib.as_array(array_type.from_address(
+                 ctypes.addressof(getattr(c_points.contents, coor).contents)))
+                 for coor in 'xyz')
+
+
+def set_points(c_points, coords):
+    """Copy an array of coordinates into a line_pnts structure with a
+    single call.
+
+    :param c_points: the line_pnts structure to fill
+    :type c_points: a ctypes pointer to line_pnts
+    :param coords: the x, y (and z) coordinates of the vertices
+    :type coords: array with shape (n, 2) or (n, 3)
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    if coords.ndim != 2 or coords.shape[1] not in (2, 3):
+        raise ValueError("Coordinates must be an array with shape (n, 2) "
+                         "or (n, 3), not %r" % (coords.shape, ))
+    c_double_p = ctypes.POINTER(ctypes.c_double)
+    x = np.ascontiguousarray(coords[:, 0])
+    y = np.ascontiguousarray(coords[:, 1])
+    z = np.ascontiguousarray(coords[:, 2]) if coords.shape[1] == 3 else None
+    libvect.Vect_reset_line(c_points)
+    if libvect.Vect_copy_xyz_to_pnts(c_points, x.ctypes.data_as(c_double_p),
+                                     y.ctypes.data_as(c_double_p),
+                                     z.ctypes.data_as(c_double_p)
+                                     if z is not None else None,
+                                     len(coords)) != 0:
+        raise GrassError("Not able to copy the coordinates.")
+
+
+def _as_coords(coords):
+    """Return the coordinates as a float array with shape (n, 2) or (n, 3)"""
+    coords = np.asarray(coords, dtype=np.float64)
+    if coords.ndim != 2 or coords.shape[1] not in (2, 3):
+        raise ValueError("Coordinates must be an array with shape (n, 2) "
+                         "or (n, 3), not %r" % (coords.shape, ))
+    return coords
+
+
+def array_length(coords):
+    """Return the length of a line given as an array of coordinates, the
+    3D length if the z coordinates are given, like ``Line.length``. ::
+
+        >>> array_length([(0, 0), (1, 1), (0, 1)])
+        2.414213562373095
+
+    """
+    coords = _as_coords(coords)
+    if len(coords) < 2:
+        return 0.
+    return float(np.sqrt((np.diff(coords, axis=0) ** 2).sum(axis=1)).sum())
+
+
+def array_bbox(coords, bbox=None):
+    """Return the bounding box of an array of coordinates, like
+    ``Line.bbox``. ::
+
+        >>> array_bbox([(0, 0), (0, 1), (2, 1), (2, 0)])
+        Bbox(1.0, 0.0, 2.0, 0.0)
+
+    """
+    coords = _as_coords(coords)
+    bbox = bbox if bbox else Bbox()
+    if len(coords) == 0:
+        return bbox
+    cmin, cmax = coords.min(axis=0), coords.max(axis=0)
+    bbox.north, bbox.south = cmax[1], cmin[1]
+    bbox.east, bbox.west = cmax[0], cmin[0]
+    if coords.shape[1] == 3:
+        bbox.top, bbox.bottom = cmax[2], cmin[2]
+    return bbox
+
+
+def array_distance(coords, points, with_z=False, chunk=2 ** 20):
+    """Return the distances between a line, given as an array of
+    coordinates, and many points, like ``Line.distance``.
+
+    :param coords: the coordinates of the vertices of the line
+    :type coords: array with shape (n, 2) or (n, 3)
+    :param points: the coordinates of the points
+    :type points: array with shape (m, 2) or (m, 3)
+    :param with_z: if True the distance is computed in 3D
+    :type with_z: bool
+    :param chunk: maximum number of point-segment pairs computed at once
+    :type chunk: int
+
+    Return a namedtuple of arrays with:
+
+        * point: the closest points on the line,
+        * dist: the distances between the points and the line,
+        * spdist: distances to the closest points from segment beginning
+        * sldist: distances to the closest points from line beginning
+          along line
+
+    ::
+
+        >>> line = [(0, 0), (2, 0), (3, 0)]
+        >>> dist = array_distance(line, [(2.3, 0.5), (-1, 0), (1, 1)])
+        >>> dist.point
+        array([[ 2.3,  0. ],
+               [ 0. ,  0. ],
+               [ 1. ,  0. ]])
+        >>> dist.dist
+        array([ 0.5,  1. ,  1. ])
+        >>> dist.sldist
+        array([ 2.3,  0. ,  1. ])
+
+    """
+    coords = _as_coords(coords)
+    points = _as_coords(points)
+    ndim = 3 if with_z and coords.shape[1] == 3 and points.shape[1] == 3 else 2
+    npnts = len(points)
+    if len(coords) == 0:
+        raise ValueError("The line has no vertices.")
+    if len(coords) == 1:
+        closest = np.repeat(coords, npnts, axis=0)
+        dist = np.sqrt(((points[:, :ndim] - closest[:, :ndim]) ** 2).sum(axis=1))
+        zeros = np.zeros(npnts)
+        return LineDist(closest, dist, zeros, zeros.copy())
+
+    starts = coords[:-1]
+    deltas = np.diff(coords, axis=0)
+    sq_lengths = (deltas[:, :ndim] ** 2).sum(axis=1)
+    sq_lengths[sq_lengths == 0] = 1.  # zero length segments
+    # length of the line at the beginning of each segment
+    seg_lengths = np.sqrt((deltas ** 2).sum(axis=1))
+    cum_lengths = np.concatenate(([0.], np.cumsum(seg_lengths)[:-1]))
+
+    closest = np.empty((npnts, coords.shape[1]))
+    dist = np.empty(npnts)
+    segment = np.empty(npnts, dtype=np.int64)
+    step = max(1, chunk // len(starts))
+    for i in range(0, npnts, step):
+        pnts = points[i:i + step, :ndim]
+        # position of the projection of each point on each segment
+        pos = ((pnts[:, np.newaxis, :] - starts[np.newaxis, :, :ndim]) *
+               deltas[np.newaxis, :, :ndim]).sum(axis=2) / sq_lengths
+        np.clip(pos, 0., 1., out=pos)
+        proj = starts[:, :ndim] + pos[:, :, np.newaxis] * deltas[:, :ndim]
+        sqdist = ((pnts[:, np.newaxis, :] - proj) ** 2).sum(axis=2)
+        seg = sqdist.argmin(axis=1)
+        rows = np.arange(len(pnts))
+        segment[i:i + step] = seg
+        dist[i:i + step] = np.sqrt(sqdist[rows, seg])
+        closest[i:i + step] = starts[seg] + pos[rows, seg][:, np.newaxis] * deltas[seg]
+    spdist = np.sqrt(((closest - starts[segment]) ** 2).sum(axis=1))
+    return LineDist(closest, dist, spdist, cum_lengths[segment] + spdist)
+
+
+def array_prune_thresh(coords, threshold):
+    """Return the coordinates without the points in threshold, using the
+    ``Vect_line_prune_thresh`` C function, like ``Line.prune_thresh``.
+
+    Only the x and y coordinates are returned, since the C function does
+    not prune the z coordinates. ::
+
+        >>> array_prune_thresh([(0, 0), (1.0, 1.0), (1.2, 0.9), (2, 2)], 0.5)
+        array([[ 0.,  0.],
+               [ 2.,  2.]])
+
+    """
+    coords = _as_coords(coords)
+    c_points = ctypes.pointer(libvect.line_pnts())
+    set_points(c_points, coords)
+    libvect.Vect_line_prune_thresh(c_points, ctypes.c_double(threshold))
+    x, y, z = c_points_asarrays(c_points)
+    # the C function prunes only the x and y coordinates
+    return np.column_stack((x, y))
+
+
+def array_point_in_ring(points, ring, chunk=2 ** 20):
+    """Return a boolean array with True for the points inside a closed
+    ring, using the crossing number of a horizontal ray for all the points
+    and all the segments at once. The result for the points on the ring
+    is arbitrary. ::
+
+        >>> square = [(0, 0), (0, 2), (2, 2), (2, 0), (0, 0)]
+        >>> array_point_in_ring([(1, 1), (3, 1), (1, -1)], square)
+        array([ True, False, False], dtype=bool)
+
+    :param points: the coordinates of the points
+    :type points: array with shape (n, 2) or (n, 3)
+    :param ring: the coordinates of the vertices of the ring
+    :type ring: array with shape (m, 2) or (m, 3)
+    :param chunk: maximum number of point-segment pairs computed at once
+    :type chunk: int
+    """
+    points = _as_coords(points)
+    ring = _as_coords(ring)
+    inside = np.zeros(len(points), dtype=bool)
+    if len(ring) < 3:
+        return inside
+    if (ring[0, :2] != ring[-1, :2]).any():
+        ring = np.vstack((ring, ring[:1]))
+    x1, y1 = ring[:-1, 0], ring[:-1, 1]
+    x2, y2 = ring[1:, 0], ring[1:, 1]
+    step = max(1, chunk // len(x1))
+    for i in range(0, len(points), step):
+        px = points[i:i + step, 0, np.newaxis]
+        py = points[i:i + step, 1, np.newaxis]
+        crosses = (y1 > py) != (y2 > py)
+        # the horizontal segments never cross the ray
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xcross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        crosses &= px < xcross
+        inside[i:i + step] = crosses.sum(axis=1) % 2 == 1
+    return inside
+
+
 class Attrs(object):
     def __init__(self, cat, table, writable=False):
         self._cat = None
@@ -164,6 +395,13 @@ class Attrs(object):
         u'568'
 
         """
+        cache = getattr(self.table, 'cache', None)
+        if cache is not None and self.cat and key in cache:
+            # use the attributes prefetched with VectorTopo.prefetch_attrs
+            try:
+                return cache.get(self.cat, key)
+            except KeyError:
+                pass
         #SELECT {cols} FROM {tname} WHERE {condition};
         try:
             cur = self.table.execute(sql.SELECT_WHERE.format(cols=key,
@@ -198,6 +436,9 @@ class Attrs(object):
                                                        values=values,
                                                        condition=self.cond))
             #self.table.conn.commit()
+            cache = getattr(self.table, 'cache', None)
+            if cache is not None and self.cat and key in cache:
+                cache.set(self.cat, key, value)
         else:
             str_err = "You can only read the attributes if the map is in another mapset"
             raise GrassError(str_err)
@@ -532,6 +773,14 @@ class Line(Geo):
               Point(2.000000, 0.000000),
               Point(1.000000, -1.000000)])
 
+    or with an array of coordinates, copied with a single call ::
+
+        >>> line = Line(np.array([(0, 0), (1, 1), (2, 0)]))
+        >>> line                               #doctest: +NORMALIZE_WHITESPACE
+        Line([Point(0.000000, 0.000000),
+              Point(1.000000, 1.000000),
+              Point(2.000000, 0.000000)])
+
     ..
     """
     # geometry type
@@ -539,7 +788,11 @@ class Line(Geo):
 
     def __init__(self, points=None, **kargs):
         super(Line, self).__init__(**kargs)
-        if points is not None:
+        if isinstance(points, np.ndarray):
+            set_points(self.c_points, points)
+            if points.shape[1] == 3:
+                self.is2D = False
+        elif points is not None:
             for pnt in points:
                 self.append(pnt)
 
@@ -596,7 +849,11 @@ class Line(Geo):
 
     def __iter__(self):
         """Return a Point generator of the Line"""
-        return (self.__getitem__(i) for i in range(self.__len__()))
+        x, y, z = self.asarrays()
+        if self.is2D:
+            return (Point(px, py) for px, py in zip(x.tolist(), y.tolist()))
+        return (Point(px, py, pz)
+                for px, py, pz in zip(x.tolist(), y.tolist(), z.tolist()))
 
     def __len__(self):
         """Return the number of points of the line."""
@@ -876,16 +1133,14 @@ class Line(Geo):
 
             >>> line = Line([(0, 0), (1.0, 1.0), (1.2, 0.9), (2, 2)])
             >>> line.prune_thresh(0.5)
-            >>> line                     #doctest: +SKIP +NORMALIZE_WHITESPACE
+            >>> line                           #doctest: +NORMALIZE_WHITESPACE
             Line([Point(0.000000, 0.000000),
-                  Point(1.000000, 1.000000),
                   Point(2.000000, 2.000000)])
 
-        .. warning ::
-
-            prune_thresh is not working yet.
+        The z coordinates are not pruned by the C function.
         """
-        libvect.Vect_line_prune(self.c_points, ctypes.c_double(threshold))
+        libvect.Vect_line_prune_thresh(self.c_points,
+                                       ctypes.c_double(threshold))
 
     def remove(self, pnt):
         """Delete point at given index and move all points above down, using
@@ -959,7 +1214,7 @@ class Line(Geo):
 
         ..
         """
-        return [pnt.coords() for pnt in self.__iter__()]
+        return [tuple(coords) for coords in self.toarray().tolist()]
 
     def toarray(self):
         """Return an array of coordinates. ::
@@ -973,7 +1228,26 @@ class Line(Geo):
 
         ..
         """
-        return np.array(self.tolist())
+        x, y, z = self.asarrays()
+        if self.is2D:
+            return np.column_stack((x, y))
+        return np.column_stack((x, y, z))
+
+    def asarrays(self):
+        """Return the x, y and z coordinates as arrays that share the memory
+        of the line, see ``c_points_asarrays``. ::
+
+            >>> line = Line([(0, 0), (1, 1), (2, 0), (1, -1)])
+            >>> x, y, z = line.asarrays()
+            >>> y
+            array([ 0.,  1.,  0., -1.])
+            >>> x += 10
+            >>> line[0]
+            Point(10.000000, 0.000000)
+
+        ..
+        """
+        return c_points_asarrays(self.c_points)
 
     def get_wkt(self):
         """Return a Well Known Text string of the line. ::
@@ -1380,14 +1654,20 @@ class Isles(object):
                 for isle_id in self._isles_id]
 
     def select_by_bbox(self, bbox):
-        """Vect_select_isles_by_box
-
-        .. warning::
-
-            Not implemented yet.
+        """Return the isles of the area that overlap a bounding box, using
+        the spatial index with ``Vect_select_isles_by_box``.
 
+        :param bbox: the bounding box used to select the isles
+        :type bbox: Bbox object
         """
-        pass
+        if self._isles_id is None:
+            self._isles_id = self.get_isles_id()
+        found = BoxList()
+        libvect.Vect_select_isles_by_box(self.c_mapinfo, bbox.c_bbox,
+                                         found.c_boxlist)
+        isles = set(self._isles_id)
+        return [Isle(v_id=isle_id, c_mapinfo=self.c_mapinfo)
+                for isle_id in found.ids if isle_id in isles]
 
 
 class Area(Geo):
@@ -1588,6 +1868,16 @@ class Area(Geo):
         border = self.get_points()
         return libvect.Vect_line_geodesic_length(border.c_points)
 
+    def toarrays(self):
+        """Return the coordinates of the outer ring and a list with the
+        coordinates of the isles, as arrays
+
+        :return: a tuple with an array and a list of arrays
+        """
+        ring = self.get_points().toarray()
+        isles = [isle.points().toarray() for isle in self.get_isles()]
+        return ring, isles
+
     def read(self, line=None, centroid=None, isles=None):
         self.boundary = self.get_points(line)
         self.centroid = self.get_centroid(centroid)
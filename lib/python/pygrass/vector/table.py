@@ -979,6 +979,8 @@ class Table(object):
                                self.conn,
                                self.key)
         self.filters = Filters(self.name)
+        #: columnar cache of the attributes, see AttrsCache
+        self.cache = None
 
     def __repr__(self):
         """
@@ -1154,3 +1156,206 @@ class Table(object):
                 print("The table: %s already exist." % self.name)
         cur.close()
         self.columns.update_odict()
+
+
+#: Maximum number of categories selected with a single IN condition,
+#: with more categories the whole table is read and filtered
+MAX_IN_CATS = 10000
+
+
+def _column_kind(ctype):
+    """Return the kind of NumPy array used to store a column type:
+    'i' for integers, 'f' for floating points and 'O' for the other types
+
+    >>> [_column_kind(ctype) for ctype in ('INTEGER', 'int4', 'float8',
+    ...                                    'DOUBLE PRECISION', 'TEXT')]
+    ['i', 'i', 'f', 'f', 'O']
+    """
+    ctype = ctype.lower()
+    if ctype.startswith('int') or ctype in ('smallint', 'bigint', 'serial'):
+        return 'i'
+    for name in ('double', 'float', 'real', 'numeric', 'decimal'):
+        if name in ctype:
+            return 'f'
+    return 'O'
+
+
+def _to_column(values, ctype):
+    """Return a tuple with the NumPy array of the values and the array with
+    the null mask"""
+    null = np.array([val is None for val in values], dtype=bool)
+    kind = _column_kind(ctype)
+    try:
+        if kind == 'i':
+            return (np.array([0 if val is None else val for val in values],
+                             dtype=np.int64), null)
+        elif kind == 'f':
+            return (np.array([np.nan if val is None else val
+                              for val in values], dtype=np.float64), null)
+    except (TypeError, ValueError):
+        # the values stored in the column do not match the column type
+        pass
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return arr, null
+
+
+class AttrsCache(object):
+    """Columnar cache of an attribute table.
+
+    The requested columns are read with a single query and each column is
+    stored in a NumPy array sorted by key. If the categories of a set of
+    features are given, the columns are returned aligned with them, the
+    missing and null values are returned as NaN for the numeric columns
+    and as None for the others.
+
+    >>> import sqlite3
+    >>> path = '$GISDBASE/$LOCATION_NAME/PERMANENT/sqlite/sqlite.db'
+    >>> tab_sqlite = Table(name='census',
+    ...                    connection=sqlite3.connect(get_path(path)))
+    >>> cache = AttrsCache(tab_sqlite, ['TOTAL_POP'], cats=[3, 1, -1])
+    >>> len(cache)
+    3
+    >>> bool(np.isnan(cache['TOTAL_POP'][2]))
+    True
+    >>> cache.get(1, 'TOTAL_POP') == cache['TOTAL_POP'][1]
+    True
+
+    """
+    def __init__(self, table, columns=None, cats=None, ids=None):
+        self.table = table
+        key = table.key
+        types = dict(table.columns.items())
+        if columns is None:
+            columns = [col for col in table.columns.names() if col != key]
+        for col in columns:
+            if col not in types:
+                raise ValueError("Column: %s not in table: %s" %
+                                 (col, table.name))
+        self.ids = None if ids is None else np.asarray(ids)
+
+        sqlc = sql.SELECT.format(cols=', '.join([key] + list(columns)),
+                                 tname=table.name)
+        ucats = None
+        if cats is not None:
+            cats = np.asarray(cats, dtype=np.int64)
+            ucats = np.unique(cats[cats >= 0])
+            if len(ucats) == 0:
+                sqlc = None
+            elif len(ucats) <= MAX_IN_CATS:
+                cond = '%s IN (%s)' % (key, ', '.join([str(cat) for cat
+                                                       in ucats.tolist()]))
+                sqlc = sql.SELECT_WHERE.format(cols=', '.join([key] +
+                                                              list(columns)),
+                                               tname=table.name,
+                                               condition=cond)
+                ucats = None
+        rows = []
+        if sqlc is not None:
+            cur = table.conn.cursor()
+            cur.execute(sqlc)
+            rows = cur.fetchall()
+            cur.close()
+
+        values = list(zip(*rows)) if rows else [()] * (len(columns) + 1)
+        keys = np.array(values[0], dtype=np.int64)
+        order = np.argsort(keys, kind='mergesort')
+        if ucats is not None:
+            # keep only the rows of the requested categories
+            order = order[np.in1d(keys[order], ucats)]
+        self.keys = keys[order]
+        self.columns = OrderedDict()
+        for col, vals in zip(columns, values[1:]):
+            arr, null = _to_column(vals, types[col])
+            self.columns[col] = (arr[order], null[order])
+        self.cats = self.keys if cats is None else cats
+
+    def __repr__(self):
+        return "AttrsCache(%r, %r)" % (self.table.name, self.columns.keys())
+
+    def __contains__(self, column):
+        return column in self.columns
+
+    def __len__(self):
+        return len(self.cats)
+
+    def __getitem__(self, column):
+        """Return the values of a column aligned with the cached features"""
+        return self.take(self.cats, column)
+
+    def _index(self, cats):
+        """Return the index of the categories in the sorted keys and a
+        boolean array with the categories that are found"""
+        cats = np.asarray(cats, dtype=np.int64)
+        if len(self.keys) == 0:
+            return (np.zeros(cats.shape, dtype=np.intp),
+                    np.zeros(cats.shape, dtype=bool))
+        idx = np.searchsorted(self.keys, cats)
+        idx[idx == len(self.keys)] = 0
+        return idx, self.keys[idx] == cats
+
+    def take(self, cats, column):
+        """Return the values of a column for an array of categories
+
+        :param cats: the categories
+        :type cats: array of int
+        :param column: the name of the column
+        :type column: str
+        """
+        arr, null = self.columns[column]
+        idx, found = self._index(cats)
+        missing = ~found
+        if len(arr):
+            missing |= null[idx]
+            values = arr[idx]
+        else:
+            values = np.zeros(idx.shape, dtype=arr.dtype)
+        if values.dtype.kind == 'i':
+            if missing.any():
+                values = values.astype(np.float64)
+                values[missing] = np.nan
+        elif values.dtype.kind == 'f':
+            values[missing] = np.nan
+        else:
+            values[missing] = None
+        return values
+
+    def get(self, cat, column):
+        """Return the value of a column for a category, as returned by the
+        database, raise a KeyError if the category is not cached
+
+        :param cat: the category
+        :type cat: int
+        :param column: the name of the column
+        :type column: str
+        """
+        idx = np.searchsorted(self.keys, cat)
+        if idx >= len(self.keys) or self.keys[idx] != cat:
+            raise KeyError(cat)
+        arr, null = self.columns[column]
+        if null[idx]:
+            return None
+        value = arr[idx]
+        return value.item() if arr.dtype.kind in 'if' else value
+
+    def set(self, cat, column, value):
+        """Set the cached value of a column for a category
+
+        :param cat: the category
+        :type cat: int
+        :param column: the name of the column
+        :type column: str
+        :param value: the new value
+        """
+        idx = np.searchsorted(self.keys, cat)
+        if idx >= len(self.keys) or self.keys[idx] != cat:
+            return
+        arr, null = self.columns[column]
+        if value is not None:
+            try:
+                arr[idx] = value
+            except (TypeError, ValueError):
+                arr = arr.astype(object)
+                arr[idx] = value
+        null[idx] = value is None
+        self.columns[column] = (arr, null)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Test the BulkWriter of the vector maps in w and rw mode
+"""
+from grass.gunittest import TestCase, test
+
+from grass.script.core import run_command
+
+import grass.lib.vector as libvect
+
+from grass.pygrass.vector import VectorTopo
+from grass.pygrass.vector.geometry import Point, Line, Area
+
+
+def square(x, y, size=10):
+    """Return an area with a square boundary and its centroid"""
+    boundary = Line([(x, y), (x, y + size), (x + size, y + size),
+                     (x + size, y), (x, y)])
+    return Area(boundary=boundary, centroid=Point(x + size / 2.,
+                                                  y + size / 2.))
+
+
+class BulkWriterTestCase(TestCase):
+
+    tmpname = "tmp_bulk_writer"
+
+    def setUp(self):
+        """Write points, lines and an area in w mode"""
+        self.vect = VectorTopo(self.tmpname)
+        self.vect.open('w', overwrite=True)
+        self.point = Point(50, 50)
+        with self.vect.bulk_writer() as writer:
+            writer.write_points([(1, 1), (2, 2), (3, 3)])
+            writer.write_lines([[(0, 20), (10, 30), (20, 20)]])
+            writer.write(square(0, 0))
+            writer.write(self.point)
+        self.vect.close()
+
+    def tearDown(self):
+        if self.vect.is_open():
+            self.vect.close()
+        run_command("g.remove", flags='f', type='vector', name=self.tmpname)
+
+    def test_write(self):
+        """Test the features written in w mode"""
+        # on level 1 the offset of the feature is set, not the id
+        self.assertGreater(self.point.offset, 0)
+        self.assertFalse(self.point.id)
+
+        self.vect.open('r')
+        self.assertEqual(self.vect.num_primitive_of('point'), 4)
+        self.assertEqual(self.vect.num_primitive_of('line'), 1)
+        self.assertEqual(self.vect.num_primitive_of('boundary'), 1)
+        self.assertEqual(self.vect.num_primitive_of('centroid'), 1)
+        self.assertEqual(self.vect.number_of('areas'), 1)
+        self.assertEqual(self.vect.read(7).x, 50)
+
+    def test_write_rw(self):
+        """Test the ids, the topology and the features written in rw mode"""
+        self.vect.open('rw')
+        c_mapinfo = self.vect.c_mapinfo
+        built = c_mapinfo.contents.plus.built
+        num_lines = libvect.Vect_get_num_lines(c_mapinfo)
+        point = Point(60, 60)
+        area = square(20, 0)
+        with self.vect.bulk_writer() as writer:
+            writer.write(point)
+            writer.write(area)
+            writer.write_points([(4, 4)])
+            # the topology is built when the writer is closed
+            self.assertEqual(c_mapinfo.contents.plus.built,
+                             libvect.GV_BUILD_NONE)
+            self.assertFalse(point.id)
+            self.assertFalse(area.id)
+
+        self.assertEqual(c_mapinfo.contents.plus.built, built)
+        self.assertEqual(c_mapinfo.contents.level, 2)
+        self.assertEqual(libvect.Vect_get_num_lines(c_mapinfo),
+                         num_lines + 4)
+        self.assertEqual(point.id, num_lines + 1)
+        self.assertEqual(self.vect.read(point.id).x, 60)
+        self.assertEqual(self.vect.number_of('areas'), 2)
+        self.assertGreater(area.id, 0)
+        self.assertEqual(libvect.Vect_get_area_centroid(c_mapinfo, area.id),
+                         num_lines + 3)
+        self.vect.close()
+
+        self.vect.open('r')
+        self.assertEqual(self.vect.num_primitive_of('point'), 6)
+        self.assertEqual(self.vect.num_primitive_of('boundary'), 2)
+        self.assertEqual(self.vect.num_primitive_of('centroid'), 2)
+        self.assertEqual(self.vect.number_of('areas'), 2)
+
+
+if __name__ == '__main__':
+    test()
@@ -14,6 +14,8 @@ import grass.lib.vector as libvect
 
 from grass.pygrass.vector import VectorTopo
 from grass.pygrass.vector.geometry import Point, Line, Node
+from grass.pygrass.vector.geometry import (array_bbox, array_distance,
+                                           array_length, array_point_in_ring)
 
 
 class PointTestCase(TestCase):
@@ -133,6 +135,56 @@ class LineTestCase(TestCase):
         self.assertEqual(1, bbox.east)
         self.assertEqual(0, bbox.west)
 
+    def test_array(self):
+        """Test the initialization from an array and the array views"""
+        coords = np.array([(0, 0), (1, 1), (2, 0), (1, -1)], dtype=float)
+        line = Line(coords)
+        self.assertEqual(len(line), 4)
+        self.assertTrue(line.is2D)
+        self.assertTrue(np.all(line.toarray() == coords))
+        x, y, z = line.asarrays()
+        self.assertTrue(np.all(z == 0))
+        y[0] = 5
+        self.assertTupleEqual(line[0].coords(), (0, 5))
+        line3d = Line(np.array([(0, 0, 1), (1, 1, 2)], dtype=float))
+        self.assertFalse(line3d.is2D)
+        self.assertListEqual(line3d.tolist(), [(0, 0, 1), (1, 1, 2)])
+
+    def test_array_length_bbox(self):
+        """Test the length and the bounding box of an array of coordinates"""
+        coords = [(0, 10), (0, 11), (1, 11), (1, 10)]
+        line = Line(coords)
+        self.assertAlmostEqual(array_length(coords), line.length())
+        bbox = array_bbox(coords)
+        for side in ('north', 'south', 'east', 'west'):
+            self.assertEqual(getattr(bbox, side), getattr(line.bbox(), side))
+
+    def test_array_distance(self):
+        """Test the distance of points from an array of coordinates"""
+        coords = [(0, 10), (0, 11), (1, 11), (1, 10)]
+        line = Line(coords)
+        points = [(0.5, 12), (2, 10.5), (-1, 9)]
+        dist = array_distance(coords, points)
+        for i, pnt in enumerate(points):
+            ldist = line.distance(Point(*pnt))
+            self.assertAlmostEqual(dist.dist[i], ldist.dist)
+            self.assertAlmostEqual(dist.sldist[i], ldist.sldist)
+            self.assertTupleEqual(tuple(dist.point[i]), ldist.point.coords())
+
+    def test_array_point_in_ring(self):
+        """Test the points inside a ring"""
+        # the ring is not closed and has a concave vertex
+        ring = [(0, 0), (0, 4), (4, 4), (4, 0), (2, 2)]
+        inside = array_point_in_ring([(1, 3), (2, 1), (3, 3), (5, 1)], ring)
+        self.assertListEqual(inside.tolist(), [True, False, True, False])
+        # the ring is closed and the points are tested in chunks
+        ring.append(ring[0])
+        inside = array_point_in_ring([(1, 3), (2, 1), (3, 3), (5, 1)], ring,
+                                     chunk=3)
+        self.assertListEqual(inside.tolist(), [True, False, True, False])
+        self.assertListEqual(
+            array_point_in_ring(np.empty((0, 2)), ring).tolist(), [])
+
     def test_nodes(self):
         """Test inodes method"""
         def nodes2tuple(nodes):
@@ -147,6 +199,60 @@ class LineTestCase(TestCase):
 
 
 
+class AreaSelectionTestCase(TestCase):
+
+    tmpname = "tmp_geometry_grid"
+
+    @classmethod
+    def setUpClass(cls):
+        """Create a grid of 2x2 areas of 1x1 map units"""
+        cls.use_temp_region()
+        cls.runModule('g.region', n=2, s=0, e=2, w=0, res=1)
+        cls.runModule('v.mkgrid', map=cls.tmpname, grid=[2, 2],
+                      overwrite=True)
+        cls.vect = VectorTopo(cls.tmpname)
+        cls.vect.open('r')
+        cls.centroids = dict((area.id, area.get_centroid().coords())
+                             for area in cls.vect.viter('areas'))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.vect.close()
+        cls.runModule('g.remove', flags='f', type='vector', name=cls.tmpname)
+        cls.del_temp_region()
+
+    def test_select_by_bboxes(self):
+        """Test the areas and the lines selected by each bounding box"""
+        self.assertEqual(len(self.centroids), 4)
+        bboxes = [[2, 0, 2, 0], [0.8, 0.2, 0.8, 0.2], [5, 4, 5, 4]]
+        offsets, ids = self.vect.select_by_bboxes(bboxes, vtype='areas')
+        self.assertListEqual(offsets.tolist(), [0, 4, 5, 5])
+        self.assertListEqual(sorted(ids[:4].tolist()),
+                             sorted(self.centroids))
+        x, y = self.centroids[ids[4]][:2]
+        self.assertTrue(0 < x < 1 and 0 < y < 1)
+        offsets, ids = self.vect.select_by_bboxes(bboxes[:1],
+                                                  ftype=['centroid'])
+        self.assertListEqual(offsets.tolist(), [0, 4])
+        for line in ids:
+            self.assertEqual(self.vect.read(int(line)).gtype,
+                             libvect.GV_CENTROID)
+        self.assertRaises(ValueError, self.vect.select_by_bboxes, [[1, 0]])
+        self.assertRaises(ValueError, self.vect.select_by_bboxes, bboxes,
+                          vtype='nodes')
+
+    def test_find_areas(self):
+        """Test the areas containing each point"""
+        ids = sorted(self.centroids)
+        points = [self.centroids[area_id][:2] for area_id in ids]
+        self.assertListEqual(self.vect.find_areas(points).tolist(), ids)
+        self.assertListEqual(self.vect.find_areas([(3, 3), (-1, 1)]).tolist(),
+                             [0, 0])
+        self.assertListEqual(self.vect.find_areas(np.empty((0, 2))).tolist(),
+                             [])
+        self.assertRaises(ValueError, self.vect.find_areas, [1, 2])
+
+
 class NodeTestCase(TestCase):
     @classmethod
     def setUpClass(cls):
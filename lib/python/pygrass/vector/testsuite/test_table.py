@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Test the columnar cache of the attribute tables
+"""
+import sqlite3
+import numpy as np
+
+from grass.gunittest import TestCase, test
+
+from grass.pygrass.vector.table import Table, AttrsCache
+
+
+class AttrsCacheTestCase(TestCase):
+
+    def setUp(self):
+        """Create an in memory table"""
+        self.conn = sqlite3.connect(':memory:')
+        self.conn.execute("CREATE TABLE test (cat INTEGER PRIMARY KEY, "
+                          "num INTEGER, val DOUBLE PRECISION, name TEXT)")
+        self.conn.executemany("INSERT INTO test VALUES (?, ?, ?, ?)",
+                              [(1, 10, 0.5, 'one'),
+                               (2, None, 1.5, 'two'),
+                               (3, 30, None, None),
+                               (5, 50, 2.5, 'five')])
+        self.conn.commit()
+        self.table = Table('test', self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_all(self):
+        """Test the cache of the whole table"""
+        cache = AttrsCache(self.table)
+        self.assertEqual(len(cache), 4)
+        self.assertListEqual(list(cache.columns.keys()),
+                             ['num', 'val', 'name'])
+        self.assertTrue(np.isnan(cache['num'][1]))
+        self.assertEqual(cache['num'][3], 50)
+        self.assertListEqual(list(cache['name']),
+                             ['one', 'two', None, 'five'])
+
+    def test_cats(self):
+        """Test the alignment with the categories of the features"""
+        cache = AttrsCache(self.table, ['num', 'val'], cats=[5, 4, 1, -1, 5],
+                           ids=[1, 2, 3, 4, 5])
+        self.assertListEqual(list(cache.ids), [1, 2, 3, 4, 5])
+        num = cache['num']
+        self.assertListEqual(list(num[[0, 2, 4]]), [50., 10., 50.])
+        self.assertTrue(np.isnan(num[[1, 3]]).all())
+        self.assertNotIn('name', cache)
+
+    def test_get_set(self):
+        """Test the access to single values"""
+        cache = AttrsCache(self.table, ['val', 'name'], cats=[1, 3])
+        self.assertEqual(cache.get(1, 'val'), 0.5)
+        self.assertIsNone(cache.get(3, 'val'))
+        self.assertRaises(KeyError, cache.get, 2, 'val')
+        cache.set(3, 'val', 3.5)
+        cache.set(1, 'name', None)
+        self.assertEqual(cache.get(3, 'val'), 3.5)
+        self.assertIsNone(cache.get(1, 'name'))
+
+    def test_invalid_column(self):
+        """Test a column that is not in the table"""
+        self.assertRaises(ValueError, AttrsCache, self.table, ['pizza'])
+
+
+if __name__ == '__main__':
+    test()
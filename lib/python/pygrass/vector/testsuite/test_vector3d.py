@@ -52,9 +52,29 @@ class VectorTopo3DTestCase(TestCase):
             for i, coords in enumerate((self.x, self.y, self.z)):
                 np.testing.assert_almost_equal(arr.T[i], coords)
 
+    def reading_batches(self):
+        """Read the generated random points by batches"""
+        with VectorTopo(self.tmpname, mode="r") as vect:
+            batches = list(vect.viter_batches(chunk=3, copy=True))
+        self.assertEqual(len(batches), 4)
+        self.assertListEqual([len(batch.ids) for batch in batches],
+                             [3, 3, 3, 1])
+        ids = np.concatenate([batch.ids for batch in batches])
+        np.testing.assert_equal(ids, np.arange(1, self.npoints + 1))
+        for i, coor in enumerate('xyz'):
+            values = np.concatenate([getattr(batch, coor)
+                                     for batch in batches])
+            np.testing.assert_almost_equal(values,
+                                           (self.x, self.y, self.z)[i])
+        bbox = np.concatenate([batch.bbox for batch in batches])
+        np.testing.assert_almost_equal(bbox[:, 0], self.y)
+        np.testing.assert_almost_equal(bbox[:, 3], self.x)
+        np.testing.assert_almost_equal(bbox[:, 4], self.z)
+
     def test_writing_reading_points(self):
         self.writing_points()
         self.reading_points()
+        self.reading_batches()
 
     @classmethod
     def tearDownClass(cls):
@@ -117,6 +117,7 @@ for details.
 """
 
 import os
+import ctypes
 import numpy
 
 from utils import try_remove
@@ -126,6 +127,100 @@ from grass.exceptions import CalledModuleError
 
 ###############################################################################
 
+# Null value of CELL maps used by the raster library
+CELL_NULL = -2147483648
+
+
+def _raster_libraries():
+    """Return the ctypes gis and raster libraries, or (None, None) if they
+    are not available and the modules have to be used instead"""
+    try:
+        import grass.lib.gis as libgis
+        import grass.lib.raster as libraster
+    except (ImportError, OSError):
+        return None, None
+    libgis.G_gisinit('')
+    return libgis, libraster
+
+
+def _set_window(libgis, libraster, reg):
+    """Set the window of the raster library to the region returned by
+    :func:`grass.script.core.region`, this way the array shape and the rows
+    read or written by the library always match"""
+    window = libgis.Cell_head()
+    libraster.Rast_get_window(ctypes.byref(window))
+    window.north = reg['n']
+    window.south = reg['s']
+    window.east = reg['e']
+    window.west = reg['w']
+    window.rows = reg['rows']
+    window.cols = reg['cols']
+    libgis.G_adjust_Cell_head(ctypes.byref(window), 1, 1)
+    libraster.Rast_set_window(ctypes.byref(window))
+
+
+def _map_type(libraster, dtype):
+    """Return the raster type and the numpy type used to read or write
+    an array with the given dtype"""
+    if dtype.kind == 'f':
+        if dtype.itemsize == 4:
+            return libraster.FCELL_TYPE, numpy.float32
+        return libraster.DCELL_TYPE, numpy.float64
+    elif dtype.kind in 'biu':
+        return libraster.CELL_TYPE, numpy.int32
+    raise ValueError(_('Invalid kind <%s>') % dtype.kind)
+
+
+def _check_null(dtype, null):
+    """Check that the null value can be stored in an array of the given
+    type: NaN can not be stored in an integer array"""
+    if null is None or numpy.dtype(dtype).kind == 'f':
+        return
+    try:
+        null = float(null)
+    except (TypeError, ValueError):
+        return
+    if numpy.isnan(null):
+        raise ValueError(_("NaN can not be used as null value of an "
+                           "integer array"))
+
+
+def _replace_nulls(row, null):
+    """Replace in place the null values of a row read by the raster
+    library with the given value (0 by default, like r.out.bin)"""
+    null = 0 if null is None else null
+    if row.dtype.kind == 'f':
+        if not numpy.isnan(null):
+            row[numpy.isnan(row)] = null
+    else:
+        row[row == CELL_NULL] = null
+
+
+def _read_rows(libraster, fd, out, rows, cols=slice(None), null=None):
+    """Read the given rows of an open raster map into the rows of `out`
+
+    When `out` has the same type of the raster rows and all the columns
+    are requested, `Rast_get_row` writes directly into the memory of `out`,
+    otherwise a single row buffer is reused and cast into `out`.
+    """
+    map_type, ntype = _map_type(libraster, out.dtype)
+    # work on a plain view, views of array would remove the backing file
+    out = out.view(numpy.ndarray)
+    direct = (cols == slice(None) and out.dtype == ntype and
+              out.flags['C_CONTIGUOUS'])
+    if not direct:
+        buf = numpy.empty(libraster.Rast_window_cols(), dtype=ntype)
+        p_buf = buf.ctypes.data_as(ctypes.c_void_p)
+    for i, row in enumerate(rows):
+        if direct:
+            libraster.Rast_get_row(fd, out[i].ctypes.data_as(ctypes.c_void_p),
+                                   row, map_type)
+            _replace_nulls(out[i], null)
+        else:
+            libraster.Rast_get_row(fd, p_buf, row, map_type)
+            _replace_nulls(buf, null)
+            out[i] = buf[cols]
+
 class array(numpy.memmap):
     def __new__(cls, dtype=numpy.double):
         """Define new numpy array
@@ -160,6 +255,32 @@ class array(numpy.memmap):
         :param str mapname: name of raster map to be read
         :param null: null value
 
+        :return: 0 on success
+        :return: non-zero code on failure
+        """
+        _check_null(self.dtype, null)
+        libgis, libraster = _raster_libraries()
+        if libraster is None:
+            return self._read_bin(mapname, null)
+
+        if not libgis.G_find_raster2(mapname, ''):
+            grass.error(_("Raster map <%s> not found") % mapname)
+            return 1
+        _set_window(libgis, libraster, grass.region())
+        fd = libraster.Rast_open_old(mapname, '')
+        try:
+            _read_rows(libraster, fd, self, range(self.shape[0]), null=null)
+        finally:
+            libraster.Rast_close(fd)
+        self.flush()
+        return 0
+
+    def _read_bin(self, mapname, null=None):
+        """Read raster map into array using r.out.bin
+
+        :param str mapname: name of raster map to be read
+        :param null: null value
+
         :return: 0 on success
         :return: non-zero code on failure
         """
@@ -199,6 +320,62 @@ class array(numpy.memmap):
         :param null: null value
         :param bool overwrite: True for overwritting existing raster maps
 
+        :return: 0 on success
+        :return: non-zero code on failure
+        """
+        libgis, libraster = _raster_libraries()
+        if libraster is None:
+            return self._write_bin(mapname, title, null, overwrite)
+
+        kind = self.dtype.kind
+        size = self.dtype.itemsize
+        if kind == 'f' and size not in [4, 8]:
+            raise ValueError(_('Invalid FP size <%d>') % size)
+        elif kind in 'biu' and size not in [1, 2, 4]:
+            raise ValueError(_('Invalid integer size <%d>') % size)
+        map_type, ntype = _map_type(libraster, self.dtype)
+
+        if overwrite is None:
+            overwrite = grass.overwrite()
+        if not overwrite and libgis.G_find_raster2(mapname,
+                                                   libgis.G_mapset()):
+            grass.error(_("Raster map <%s> already exists") % mapname)
+            return 1
+
+        _set_window(libgis, libraster, grass.region())
+        fd = libraster.Rast_open_new(mapname, map_type)
+        data = self.view(numpy.ndarray)
+        buf = numpy.empty(self.shape[1], dtype=ntype)
+        direct = (null is None and self.dtype == ntype and
+                  self.flags['C_CONTIGUOUS'])
+        for row in range(self.shape[0]):
+            if direct:
+                p_row = data[row].ctypes.data_as(ctypes.c_void_p)
+            else:
+                buf[:] = data[row]
+                if null is not None:
+                    buf[data[row] == null] = (numpy.nan if kind == 'f'
+                                              else CELL_NULL)
+                p_row = buf.ctypes.data_as(ctypes.c_void_p)
+            libraster.Rast_put_row(fd, p_row, map_type)
+        libraster.Rast_close(fd)
+
+        if title:
+            libraster.Rast_put_cell_title(mapname, title)
+        hist = libraster.History()
+        libraster.Rast_short_history(mapname, 'raster', ctypes.byref(hist))
+        libraster.Rast_command_history(ctypes.byref(hist))
+        libraster.Rast_write_history(mapname, ctypes.byref(hist))
+        return 0
+
+    def _write_bin(self, mapname, title=None, null=None, overwrite=None):
+        """Write array into raster map using r.in.bin
+
+        :param str mapname: name for raster map
+        :param str title: title for raster map
+        :param null: null value
+        :param bool overwrite: True for overwritting existing raster maps
+
         :return: 0 on success
         :return: non-zero code on failure
         """
@@ -246,6 +423,94 @@ class array(numpy.memmap):
 ###############################################################################
 
 
+class lazyarray(object):
+    """Read only access to a raster map that reads only the rows and the
+    columns actually indexed, instead of copying the whole map in memory.
+
+    >>> elev = garray.lazyarray('elevation')
+    >>> elev.shape
+    (1350, 1500)
+    >>> block = elev[100:110, 200:220]
+    >>> block.shape
+    (10, 20)
+    >>> elev.close()
+
+    The map is kept open until :meth:`close` is called, the object can be
+    used also with the *with statement*.
+    """
+    def __init__(self, mapname, dtype=numpy.double, null=None):
+        """Open a raster map for lazy reading
+
+        :param str mapname: name of raster map to be read
+        :param dtype: data type of the returned arrays
+                      (default: numpy.double)
+        :param null: null value
+        """
+        _check_null(dtype, null)
+        self.libgis, self.libraster = _raster_libraries()
+        if self.libraster is None:
+            raise ImportError(_("The raster library is not available"))
+        if not self.libgis.G_find_raster2(mapname, ''):
+            raise ValueError(_("Raster map <%s> not found") % mapname)
+        reg = grass.region()
+        _set_window(self.libgis, self.libraster, reg)
+        self.mapname = mapname
+        self.dtype = numpy.dtype(dtype)
+        self.null = null
+        self.shape = (reg['rows'], reg['cols'])
+        self.fd = self.libraster.Rast_open_old(mapname, '')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def __len__(self):
+        return self.shape[0]
+
+    def close(self):
+        """Close the raster map"""
+        if getattr(self, 'fd', None) is not None:
+            self.libraster.Rast_close(self.fd)
+            self.fd = None
+
+    def _index(self, key, size):
+        """Return a slice and True if the dimension has to be removed"""
+        if isinstance(key, slice):
+            return key, False
+        key = int(key)
+        if key < 0:
+            key += size
+        if key < 0 or key >= size:
+            raise IndexError(_("Index out of range: %d") % key)
+        return slice(key, key + 1), True
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        if len(key) != 2:
+            raise IndexError(_("Too many indices for a raster map"))
+        if self.fd is None:
+            raise ValueError(_("Raster map <%s> is closed") % self.mapname)
+        rowkey, squeeze_row = self._index(key[0], self.shape[0])
+        colkey, squeeze_col = self._index(key[1], self.shape[1])
+        rows = range(*rowkey.indices(self.shape[0]))
+        ncols = len(range(*colkey.indices(self.shape[1])))
+        out = numpy.empty((len(rows), ncols), dtype=self.dtype)
+        _read_rows(self.libraster, self.fd, out, rows, colkey, self.null)
+        if squeeze_col:
+            out = out[:, 0]
+        if squeeze_row:
+            out = out[0]
+        return out
+
+###############################################################################
+
+
 class array3d(numpy.memmap):
     def __new__(cls, dtype=numpy.double):
         """Define new 3d numpy array
@@ -26,6 +26,7 @@ import atexit
 import subprocess
 import shutil
 import codecs
+import time
 import types as python_types
 
 from utils import KeyValue, parse_key_val, basename, encode
@@ -886,6 +887,460 @@ def compare_key_value_text_files(filename_a, filename_b, sep=":",
                 return False
     return True
 
+# in-process access to the GRASS database
+#
+# gisenv(), region(), locn_is_latlong(), find_file() and list_strings()
+# read the GISRC, WIND, SEARCH_PATH files and the mapset directories
+# directly instead of running a module; when something is not handled here
+# (or the files are not valid) the module is run, so the result and the
+# errors are the same.
+
+_file_cache = {}
+
+# element directories of the g.list types, from lib/manage/element_list
+_list_elements = {'raster': 'cell',
+                  'raster_3d': 'grid3',
+                  'vector': 'vector',
+                  'label': 'paint/labels',
+                  'region': 'windows',
+                  'group': 'group'}
+
+# elements checked first by G_find_file() when searching the mapsets
+_cell_elements = ('cell', 'cats', 'colr', 'hist', 'cell_misc', 'fcell',
+                  'g3dcell')
+_dig_elements = ('dig_att', 'dig_plus', 'dig_cats', 'dig_misc', 'reg')
+
+
+class _Unsupported(Exception):
+    """The in-process implementation can not reproduce the module"""
+    pass
+
+
+def _read_file_cached(path, parse):
+    """Return the parsed content of a small file, the content is parsed
+    again only when the file changes.
+
+    The modification time, size and inode are used to detect changes,
+    the content is compared too when the file was modified in the last
+    seconds, to not miss changes within the mtime resolution.
+
+    :param str path: file path
+    :param parse: function used to parse the content of the file
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime, stat.st_size, stat.st_ino)
+    cached = _file_cache.get(path)
+    if cached and cached[0] == key and time.time() - stat.st_mtime > 2:
+        return cached[2]
+    with open(path) as fd:
+        data = fd.read()
+    if cached and cached[1] == data:
+        result = cached[2]
+    else:
+        result = parse(data)
+    _file_cache[path] = (key, data, result)
+    return result
+
+
+def _parse_gisrc(data):
+    """Parse the variables of a GISRC file like G__read_env()"""
+    env = KeyValue()
+    for line in data.splitlines():
+        if len(line) > 198:
+            # G__read_env() reads long lines in pieces
+            raise _Unsupported(line)
+        if ':' not in line:
+            continue
+        name, value = line.split(':', 1)
+        name, value = name.strip(), value.strip()
+        if name and value:
+            env[name] = value
+    return env
+
+
+def _gisenv():
+    """Return the variables of the GISRC file, read in-process"""
+    gisrc = os.environ.get('GISRC')
+    if not gisrc:
+        raise _Unsupported('GISRC')
+    return _read_file_cached(gisrc, _parse_gisrc)
+
+
+def _mapset_path(env, mapset, *parts):
+    """Return the path of a file in a mapset, like G_file_name()"""
+    return '/'.join((env['GISDBASE'], env['LOCATION_NAME'], mapset) +
+                    tuple(part for part in parts if part))
+
+
+def _parse_search_path(data):
+    return data.split()
+
+
+def _search_path(env):
+    """Return the mapsets of the search path, like G_get_mapset_name()"""
+    mapset = env['MAPSET']
+    result = [mapset]
+    try:
+        names = _read_file_cached(_mapset_path(env, mapset, 'SEARCH_PATH'),
+                                  _parse_search_path)
+    except (IOError, OSError):
+        names = ['PERMANENT']
+    for name in names:
+        if name != mapset and os.path.isdir(_mapset_path(env, name)):
+            result.append(name)
+    return result
+
+
+def _legal_name(name):
+    """Check a file name like G_legal_filename()"""
+    if not name or name.startswith('.'):
+        return False
+    for char in name:
+        if char in '/"\'@,=*' or char <= ' ' or char > '~':
+            return False
+    return True
+
+
+def _parse_cell_head(lines):
+    """Parse a region like G__read_Cell_head_array() and
+    G_adjust_Cell_head(), only projected and XY regions are supported"""
+    items = []
+    for line in lines:
+        if not line.strip() or line.strip().startswith('#'):
+            continue
+        if ':' not in line or line.startswith(':'):
+            raise _Unsupported(line)
+        label, value = line.split(':', 1)
+        items.append((label.strip(), value.strip()))
+
+    head = dict(proj=None, zone=None, north=None, south=None, east=None,
+                west=None, top=1., bottom=0., ewres=0., nsres=0.,
+                ewres3=1., nsres3=1., tbres=1., rows=0, cols=0, rows3=0,
+                cols3=0, depths=1)
+    found = set()
+
+    def set_value(key, value, convert):
+        if key in found:
+            raise _Unsupported(key)
+        try:
+            head[key] = convert(value)
+        except ValueError:
+            raise _Unsupported(value)
+        found.add(key)
+
+    for label, value in items:
+        if label.startswith('proj'):
+            set_value('proj', value, int)
+        elif label.startswith('zone'):
+            set_value('zone', value, int)
+    if head['proj'] is None or head['zone'] is None or head['proj'] == 3:
+        # lat/long coordinates are parsed and formatted differently
+        raise _Unsupported('proj')
+
+    for label, value in items:
+        if label.startswith('proj') or label.startswith('zone'):
+            continue
+        for prefix, key, convert in (('nort', 'north', float),
+                                     ('sout', 'south', float),
+                                     ('east', 'east', float),
+                                     ('west', 'west', float),
+                                     ('top', 'top', float),
+                                     ('bottom', 'bottom', float),
+                                     ('e-w resol3', 'ewres3', float),
+                                     ('n-s resol3', 'nsres3', float),
+                                     ('t-b ', 'tbres', float),
+                                     ('rows3', 'rows3', int),
+                                     ('cols3', 'cols3', int),
+                                     ('depths', 'depths', int),
+                                     ('form', 'format', int),
+                                     ('comp', 'compressed', int)):
+            if label.startswith(prefix):
+                set_value(key, value, convert)
+                break
+        else:
+            if label.startswith('e-w ') and len(label) == 9:
+                set_value('ewres', value, float)
+            elif label.startswith('n-s ') and len(label) == 9:
+                set_value('nsres', value, float)
+            elif label == 'rows':
+                set_value('rows', value, int)
+            elif label == 'cols':
+                set_value('cols', value, int)
+            else:
+                raise _Unsupported(label)
+    for key in ('ewres', 'nsres', 'ewres3', 'nsres3', 'tbres', 'rows',
+                'cols', 'rows3', 'cols3', 'depths'):
+        if key in found and head[key] <= 0:
+            raise _Unsupported(key)
+    for key in ('north', 'south', 'east', 'west'):
+        if key not in found:
+            raise _Unsupported(key)
+    if ('ewres' not in found and 'cols' not in found) or \
+            ('nsres' not in found and 'rows' not in found):
+        raise _Unsupported('resolution')
+    if found & set(('ewres3', 'nsres3', 'cols3', 'rows3')):
+        if not set(('ewres3', 'nsres3', 'cols3', 'rows3')) <= found:
+            raise _Unsupported('3D')
+    else:
+        head['ewres3'], head['nsres3'] = head['ewres'], head['nsres']
+        head['cols3'], head['rows3'] = head['cols'], head['rows']
+
+    _adjust_cell_head(head, 'rows' in found, 'cols' in found)
+    return head
+
+
+def _adjust_cell_head(head, row_flag, col_flag, three_d=False):
+    """Adjust a region like G_adjust_Cell_head() and G_adjust_Cell_head3()
+    (the latter if three_d is True)"""
+    pairs = [('nsres', 'rows', row_flag), ('ewres', 'cols', col_flag)]
+    if three_d:
+        pairs += [('nsres3', 'rows3', row_flag), ('ewres3', 'cols3', col_flag),
+                  ('tbres', 'depths', False)]
+    for res, num, flag in pairs:
+        if (not flag and head[res] <= 0) or (flag and head[num] <= 0):
+            raise _Unsupported(res)
+    if head['north'] <= head['south'] or head['east'] <= head['west']:
+        raise _Unsupported('extent')
+    if three_d and head['top'] <= head['bottom']:
+        raise _Unsupported('extent')
+    extent = {'nsres': head['north'] - head['south'],
+              'ewres': head['east'] - head['west'],
+              'nsres3': head['north'] - head['south'],
+              'ewres3': head['east'] - head['west'],
+              'tbres': head['top'] - head['bottom']}
+    for res, num, flag in pairs:
+        if not flag:
+            # truncated like the C assignment to int
+            head[num] = int((extent[res] + head[res] / 2.) / head[res])
+            if head[num] == 0:
+                head[num] = 1
+        if head[num] < 0:
+            raise _Unsupported(num)
+    for res, num, flag in pairs:
+        head[res] = extent[res] / head[num]
+
+
+def _region_lines():
+    """Return the lines of the current region, like G_get_window()"""
+    regvar = os.environ.get('GRASS_REGION')
+    if regvar:
+        return regvar.split(';')
+    env = _gisenv()
+    wind = os.environ.get('WIND_OVERRIDE')
+    if wind:
+        path = _mapset_path(env, env['MAPSET'], 'windows', wind)
+    else:
+        path = _mapset_path(env, env['MAPSET'], 'WIND')
+    return _read_file_cached(path, lambda data: data.splitlines())
+
+
+def _locn_is_latlong():
+    """Return True for a lat/long region, read in-process"""
+    for line in _region_lines():
+        if ':' in line and line.split(':', 1)[0].strip().startswith('proj'):
+            try:
+                return int(line.split(':', 1)[1].strip()) == 3
+            except ValueError:
+                break
+    raise _Unsupported('proj')
+
+
+def _region(region3d):
+    """Return the current region like "g.region -gu", read in-process"""
+    head = _parse_cell_head(_region_lines())
+    # g.region adjusts the 3D values too
+    _adjust_cell_head(head, False, False, three_d=True)
+
+    def fmt(value):
+        return float('%.8f' % value)
+    reg = KeyValue()
+    reg['n'], reg['s'] = fmt(head['north']), fmt(head['south'])
+    reg['w'], reg['e'] = fmt(head['west']), fmt(head['east'])
+    reg['nsres'], reg['ewres'] = fmt(head['nsres']), fmt(head['ewres'])
+    reg['rows'], reg['cols'] = head['rows'], head['cols']
+    reg['cells'] = head['rows'] * head['cols']
+    if region3d:
+        reg['t'] = float('%g' % head['top'])
+        reg['b'] = float('%g' % head['bottom'])
+        reg['nsres3'], reg['ewres3'] = (fmt(head['nsres3']),
+                                        fmt(head['ewres3']))
+        reg['tbres'] = float('%.15g' % head['tbres'])
+        reg['rows3'], reg['cols3'] = head['rows3'], head['cols3']
+        reg['depths'] = head['depths']
+        reg['cells3'] = head['rows3'] * head['cols3'] * head['depths']
+    return reg
+
+
+def _find_file(name, element, mapset):
+    """Find a file like "g.findfile -n", in-process"""
+    env = _gisenv()
+    if not name or name.count('@') > 1:
+        raise _Unsupported(name)
+    if '@' in name:
+        pname, pmapset = name.split('@')
+        if not pname or not pmapset or (mapset and pmapset != mapset):
+            # g.findfile fails
+            raise _Unsupported(name)
+    else:
+        pname = name
+        pmapset = env['MAPSET'] if mapset == '.' else mapset
+    if element == 'vector' and pmapset and pmapset.lower() == 'ogr':
+        raise _Unsupported(pmapset)
+    elif not _legal_name(pname) or (pmapset and not _legal_name(pmapset)):
+        # G_legal_filename() prints a warning
+        raise _Unsupported(name)
+    elif not pmapset:
+        if element in _cell_elements:
+            pelement = 'cellhd'
+        elif element in _dig_elements:
+            pelement = 'dig'
+        else:
+            pelement = element
+        found = [ms for ms in _search_path(env)
+                 if os.path.exists(_mapset_path(env, ms, pelement, pname))]
+        pmapset = None
+        if found and \
+                os.path.exists(_mapset_path(env, found[0], element, pname)):
+            pmapset = found[0]
+            if len(found) > 1 and element == pelement:
+                for other in found[1:]:
+                    warning(_("'%s/%s' was found in more mapsets (also found "
+                              "in <%s>)") % (element, pname, other))
+                warning(_("Using <%s@%s>") % (pname, pmapset))
+    elif not os.path.exists(_mapset_path(env, pmapset, element, pname)):
+        pmapset = None
+
+    result = KeyValue()
+    if pmapset:
+        result['name'] = pname
+        result['mapset'] = pmapset
+        result['fullname'] = '%s@%s' % (pname, pmapset)
+        result['file'] = _mapset_path(env, pmapset, element, pname)
+    else:
+        for key in ('name', 'mapset', 'fullname', 'file'):
+            result[key] = ''
+    return result
+
+
+def _glob_to_regex(pattern):
+    """Convert a g.list wildcard pattern to a regular expression, like
+    wc2regex() of lib/gis/ls_filter.c"""
+    regex = ['^']
+    in_brace = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 1
+            if i == len(pattern) or pattern[i].isalnum():
+                # escaped letters are classes in POSIX regular expressions
+                raise _Unsupported(pattern)
+            regex.append(re.escape(pattern[i]))
+        elif char in '.|()+':
+            regex.append('\\' + char)
+        elif char == '*':
+            regex.append('.*')
+        elif char == '?':
+            regex.append('.')
+        elif char == '{':
+            in_brace += 1
+            regex.append('(')
+        elif char == '}':
+            if not in_brace:
+                raise _Unsupported(pattern)
+            in_brace -= 1
+            regex.append(')')
+        elif char == ',':
+            regex.append('|' if in_brace else ',')
+        elif char == '[':
+            start = i + 1
+            cset = '['
+            if pattern[start:start + 1] == '!':
+                cset += '^'
+                start += 1
+            if pattern[start:start + 1] == ']':
+                cset += ']'
+                start += 1
+            end = pattern.find(']', start)
+            if end < 0:
+                raise _Unsupported(pattern)
+            if '[' in pattern[start:end] or '\\' in pattern[start:end]:
+                # POSIX classes and escapes are different in Python
+                raise _Unsupported(pattern)
+            regex.append(cset + pattern[start:end] + ']')
+            i = end
+        elif char in '^$':
+            regex.append(char)
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    if in_brace:
+        raise _Unsupported(pattern)
+    regex.append('$')
+    return re.compile(''.join(regex))
+
+
+def _list_strings(type, pattern, mapset, exclude, flag):
+    """List maps like "g.list -m", in-process"""
+    if flag:
+        # POSIX regular expressions are different in Python
+        raise _Unsupported(flag)
+    env = _gisenv()
+    if isinstance(type, python_types.StringTypes):
+        types = type.split(',')
+    else:
+        types = list(type)
+    if 'all' in types:
+        types = list(_list_elements.keys())
+    if not types or not set(types) <= set(_list_elements.keys()):
+        raise _Unsupported(type)
+    if mapset:
+        mapsets = []
+        if isinstance(mapset, python_types.StringTypes):
+            names = mapset.split(',')
+        else:
+            names = mapset
+        for name in names:
+            if name == '*':
+                location = '/'.join((env['GISDBASE'], env['LOCATION_NAME']))
+                add = [ms for ms in os.listdir(location)
+                       if os.path.exists('/'.join((location, ms, 'WIND')))]
+            elif name == '.':
+                add = [env['MAPSET']]
+            elif os.path.isdir(_mapset_path(env, name)):
+                add = [name]
+            else:
+                # g.list fails
+                raise _Unsupported(name)
+            mapsets.extend(ms for ms in add if ms not in mapsets)
+    else:
+        mapsets = _search_path(env)
+
+    def glob(pat):
+        if ',' in pat:
+            pat = '{%s}' % pat
+        return _glob_to_regex(pat)
+    include = glob(pattern) if pattern else None
+    omit = glob(exclude) if exclude else None
+
+    found = []
+    for ltype in types:
+        for ms in mapsets:
+            path = _mapset_path(env, ms, _list_elements[ltype])
+            if not os.path.isdir(path):
+                continue
+            for name in os.listdir(path):
+                if name.startswith('.'):
+                    continue
+                if include and not include.search(name):
+                    continue
+                if omit and omit.search(name):
+                    continue
+                found.append((ltype, name, ms))
+    found.sort()
+    return ['%s@%s' % (name, ms) for ltype, name, ms in found]
+
+
 # interface to g.gisenv
 
 
@@ -897,8 +1352,15 @@ def gisenv():
     >>> print env['GISDBASE']  # doctest: +SKIP
     /opt/grass-data
 
+    The variables are read from the GISRC file, g.gisenv is run only
+    when the file can not be read.
+
     :return: list of GRASS variables
     """
+    try:
+        return KeyValue(_gisenv())
+    except (_Unsupported, IOError, OSError):
+        pass
     s = read_command("g.gisenv", flags='n')
     return parse_key_val(s)
 
@@ -911,6 +1373,10 @@ def locn_is_latlong():
 
     :return: True for a lat/long region, False otherwise
     """
+    try:
+        return _locn_is_latlong()
+    except (_Unsupported, IOError, OSError, KeyError):
+        pass
     s = read_command("g.region", flags='pu')
     kv = parse_key_val(s, ':')
     if kv['projection'].split(' ')[0] == '3':
@@ -934,8 +1400,17 @@ def region(region3d=False, complete=False):
     >>> (curent_region['nsres'], curent_region['ewres'])  # doctest: +ELLIPSIS
     (..., ...)
 
+    The region is read from the WIND file (or GRASS_REGION and
+    WIND_OVERRIDE), g.region is run only for the complete output, for
+    lat/long locations or when the region can not be read.
+
     :return: dictionary of region values
     """
+    if not complete:
+        try:
+            return _region(region3d)
+        except (_Unsupported, IOError, OSError, KeyError):
+            pass
     flgs = 'gu'
     if region3d:
         flgs += '3'
@@ -1071,6 +1546,10 @@ def find_file(name, element='cell', mapset=None):
     if element == 'raster' or element == 'rast':
         verbose(_('Element type should be "cell" and not "%s"') % element)
         element = 'cell'
+    try:
+        return _find_file(name, element, mapset)
+    except (_Unsupported, IOError, OSError, KeyError):
+        pass
     # g.findfile returns non-zero when file was not found
     # se we ignore return code and just focus on stdout
     process = start_command('g.findfile', flags='n',
@@ -1099,7 +1578,12 @@ def list_strings(type, pattern=None, mapset=None, exclude=None, flag=''):
     """
     if type == 'cell':
         verbose(_('Element type should be "raster" and not "%s"') % type)
-    
+
+    try:
+        return _list_strings(type, pattern, mapset, exclude, flag)
+    except (_Unsupported, IOError, OSError, KeyError):
+        pass
+
     result = list()
     for line in read_command("g.list",
                              quiet=True,
@@ -20,12 +20,14 @@ for details.
 
 import types
 import string
+import hashlib
+from collections import OrderedDict
 try:
     import xml.etree.ElementTree as etree
 except ImportError:
     import elementtree.ElementTree as etree # Python <= 2.4
 
-from utils import decode
+from utils import decode, try_remove, parse_key_val
 from core import *
 
 
@@ -451,6 +453,131 @@ def convert_xml_to_utf8(xml_text):
     return xml_text_utf8
 
 
+# In-process LRU cache of the interface descriptions, key -> XML
+_INTERFACE_CACHE = OrderedDict()
+_INTERFACE_CACHE_SIZE = 256
+
+
+def _interface_cache_dir():
+    """Return the directory of the persistent interface description cache,
+    in the GRASS user settings directory (see lib/init/grass.py)"""
+    if sys.platform == 'win32':
+        config_dir = os.path.join(os.getenv('APPDATA', ''), 'GRASS7')
+    else:
+        config_dir = os.path.join(os.getenv('HOME', ''), '.grass7')
+    return os.path.join(config_dir, 'interface_cache')
+
+
+def _interface_session():
+    """Return the parts of the session the interface descriptions depend
+    on: some modules (e.g. db.connect, v.in.db, db.login) take the default
+    values of their options from the current mapset, its database
+    connection (VAR file) and the database logins
+
+    The variables are read from the GISRC file, which is cheaper than
+    running g.gisenv for each description."""
+    gisrc = os.getenv('GISRC')
+    if not gisrc:
+        return []
+    try:
+        with open(gisrc) as rc:
+            env = parse_key_val(rc.read(), sep=':')
+        session = [env['GISDBASE'], env['LOCATION_NAME'], env['MAPSET']]
+    except (IOError, KeyError):
+        return []
+    try:
+        with open(os.path.join(session[0], session[1], session[2],
+                               'VAR')) as var:
+            session.append(var.read())
+    except IOError:
+        session.append('')
+    try:
+        session.append(repr(os.path.getmtime(
+            os.path.join(os.path.dirname(_interface_cache_dir()),
+                         'dblogin'))))
+    except OSError:
+        session.append('')
+    return session
+
+
+def _interface_cache_key(cmd):
+    """Return the key of the interface description of a command: it
+    depends on the module path and modification time, on the GRASS version,
+    on the language of the messages and on the current session (see
+    _interface_session()).
+
+    Return None if the module can not be found in the path, in this case
+    the description is not cached.
+    """
+    path = shutil_which(get_real_command(cmd))
+    if not path:
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    lang = (os.getenv('LC_ALL') or os.getenv('LC_MESSAGES') or
+            os.getenv('LANG') or '')
+    key = '|'.join([cmd, os.path.abspath(path), repr(mtime),
+                    os.getenv('GRASS_VERSION', ''), os.getenv('GISBASE', ''),
+                    lang] + _interface_session())
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _read_interface_cache(key):
+    """Return the cached XML description, or None"""
+    if key in _INTERFACE_CACHE:
+        desc = _INTERFACE_CACHE.pop(key)
+        _INTERFACE_CACHE[key] = desc
+        return desc
+    try:
+        with open(os.path.join(_interface_cache_dir(), key + '.xml'),
+                  'rb') as xml:
+            desc = xml.read()
+    except IOError:
+        return None
+    _add_interface_cache(key, desc)
+    return desc
+
+
+def _add_interface_cache(key, desc):
+    """Store the XML description in the in-process cache"""
+    _INTERFACE_CACHE[key] = desc
+    while len(_INTERFACE_CACHE) > _INTERFACE_CACHE_SIZE:
+        _INTERFACE_CACHE.popitem(last=False)
+
+
+def _write_interface_cache(key, desc):
+    """Store the XML description in the in-process and persistent cache,
+    the file is written in a temporary file and then renamed, so concurrent
+    processes never read a partial description"""
+    _add_interface_cache(key, desc)
+    cache_dir = _interface_cache_dir()
+    tmp = None
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        tmp = os.path.join(cache_dir, '%s.%d.tmp' % (key, os.getpid()))
+        with open(tmp, 'wb') as xml:
+            xml.write(desc)
+        os.rename(tmp, os.path.join(cache_dir, key + '.xml'))
+    except (IOError, OSError):
+        # the cache is only an optimization, ignore read-only directories
+        # and the existing file on MS Windows
+        if tmp:
+            try_remove(tmp)
+
+
+def clear_interface_cache():
+    """Remove all the cached interface descriptions, from memory and
+    from the persistent cache"""
+    _INTERFACE_CACHE.clear()
+    cache_dir = _interface_cache_dir()
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            try_remove(os.path.join(cache_dir, name))
+
+
 def get_interface_description(cmd):
     """Returns the XML description for the GRASS cmd (force text encoding to
     "utf-8").
@@ -458,6 +585,28 @@ def get_interface_description(cmd):
     The DTD must be located in $GISBASE/gui/xml/grass-interface.dtd,
     otherwise the parser will not succeed.
 
+    The description is cached in memory and in the user settings directory,
+    the module is run with ``--interface-description`` only when the module
+    executable, the GRASS version or the language change.
+
+    :param cmd: command (name of GRASS module)
+    """
+    key = _interface_cache_key(cmd)
+    if key is not None:
+        desc = _read_interface_cache(key)
+        if desc is not None:
+            return desc
+
+    desc = _get_interface_description(cmd)
+    if key is not None:
+        _write_interface_cache(key, desc)
+    return desc
+
+
+def _get_interface_description(cmd):
+    """Run the GRASS cmd to get the XML description, see
+    :func:`get_interface_description`
+
     :param cmd: command (name of GRASS module)
     """
     try:
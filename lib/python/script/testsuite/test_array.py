@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Test the null values of the CELL, FCELL and DCELL raster maps read and
+written with the NumPy arrays
+"""
+import numpy
+
+from grass.gunittest import TestCase, test
+
+from grass.script import array as garray
+
+
+class ArrayNullTestCase(TestCase):
+
+    # the first row is null, the other cells are row + col
+    maps = {'CELL': ('tmp_array_cell', 'int', numpy.int32),
+            'FCELL': ('tmp_array_fcell', 'float', numpy.float32),
+            'DCELL': ('tmp_array_dcell', 'double', numpy.float64)}
+    rows = 4
+    cols = 6
+
+    @classmethod
+    def setUpClass(cls):
+        cls.use_temp_region()
+        cls.runModule('g.region', n=40, s=0, w=0, e=60, res=10)
+        for name, func, dtype in cls.maps.values():
+            cls.runModule('r.mapcalc', overwrite=True,
+                          expression="%s = if(row() == 1, null(), "
+                                     "%s(row() + col()))" % (name, func))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.runModule('g.remove', flags='f', type='raster',
+                      name=[name for name, func, dtype in cls.maps.values()] +
+                      ['%s_out' % name for name, func, dtype in
+                       cls.maps.values()])
+        cls.del_temp_region()
+
+    def expected(self, null):
+        values = numpy.add.outer(numpy.arange(1, self.rows + 1),
+                                 numpy.arange(1, self.cols + 1)).astype(float)
+        values[0] = null
+        return values
+
+    def round_trip(self, mtype, null):
+        """Read the map, check the values and write it back"""
+        name, func, dtype = self.maps[mtype]
+        data = garray.array(dtype=dtype)
+        self.assertEqual(data.read(name, null=null), 0)
+        numpy.testing.assert_array_equal(data, self.expected(null))
+        self.assertEqual(data.write('%s_out' % name, null=null,
+                                    overwrite=True), 0)
+        self.assertRasterFitsUnivar('%s_out' % name,
+                                    reference=dict(null_cells=self.cols,
+                                                   n=(self.rows - 1) *
+                                                   self.cols,
+                                                   min=3, max=10))
+        self.assertRastersNoDifference(actual='%s_out' % name,
+                                       reference=name, precision=0)
+
+    def test_cell(self):
+        """The nulls of CELL maps are replaced by the null value"""
+        self.round_trip('CELL', -1)
+
+    def test_fcell(self):
+        """The nulls of FCELL maps are read and written as NaN"""
+        self.round_trip('FCELL', numpy.nan)
+
+    def test_dcell(self):
+        """The nulls of DCELL maps are replaced by the null value"""
+        self.round_trip('DCELL', -1)
+        self.round_trip('DCELL', numpy.nan)
+
+    def test_default_null(self):
+        """Without null value the nulls are read as 0"""
+        for mtype in ('CELL', 'DCELL'):
+            name, func, dtype = self.maps[mtype]
+            data = garray.array(dtype=dtype)
+            self.assertEqual(data.read(name), 0)
+            numpy.testing.assert_array_equal(data, self.expected(0))
+
+    def test_cell_nan(self):
+        """NaN can not be the null value of an integer array"""
+        name, func, dtype = self.maps['CELL']
+        data = garray.array(dtype=numpy.int32)
+        self.assertRaises(ValueError, data.read, name, null=numpy.nan)
+        self.assertRaises(ValueError, garray.lazyarray, name,
+                          dtype=numpy.int32, null=numpy.nan)
+
+    def test_lazyarray(self):
+        """The lazy array replaces the nulls of the rows read"""
+        name, func, dtype = self.maps['CELL']
+        with garray.lazyarray(name, dtype=numpy.int32, null=-1) as data:
+            numpy.testing.assert_array_equal(data[0:2, 1:3],
+                                              self.expected(-1)[0:2, 1:3])
+
+
+if __name__ == '__main__':
+    test()
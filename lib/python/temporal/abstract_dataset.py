@@ -411,6 +411,21 @@ class AbstractDataset(SpatialTopologyDatasetConnector,
             dbif.close()
         return statement
 
+    def get_insert_statement_list(self):
+        """Return the INSERT statements of this dataset as a list of
+           (sql, args) tuples with DBMI specific place holders, that can be
+           used to insert many datasets with executemany
+
+           :return: The list of (sql, args) tuples
+        """
+        statements = [self.base.get_insert_statement(),
+                      self.temporal_extent.get_insert_statement(),
+                      self.spatial_extent.get_insert_statement(),
+                      self.metadata.get_insert_statement()]
+        if self.is_stds() is False:
+            statements.append(self.stds_register.get_insert_statement())
+        return statements
+
     def update(self, dbif=None, execute=True, ident=None):
         """Update the dataset entry in the database from the internal structure
            excluding None variables
@@ -109,6 +109,12 @@ class AbstractMapDataset(AbstractDataset):
         """Load the content of this object from the grass
            file system based database"""
 
+    @abstractmethod
+    def load_from_info(self, kvp):
+        """Load the content of this object from the map info read with
+           the C-library interface, used to load many maps with a single
+           batch call of the C-library interface"""
+
     def _convert_timestamp(self):
         """Convert the valid time into a grass datetime library
            compatible timestamp string
@@ -19,7 +19,7 @@ for details.
 
 from space_time_datasets import *
 import grass.script as gscript
-from grass.exceptions import CalledModuleError
+from grass.exceptions import CalledModuleError, GrassError
 
 ###############################################################################
 
@@ -311,6 +311,13 @@ def aggregate_by_topology(granularity_list, granularity, map_list, topo_list,
                 mod(raster=[aggregation_list[0],  output_name])
                 process_queue.put(mod)
 
+    try:
+        process_queue.wait()
+    except GrassError:
+        if connected:
+            dbif.close()
+        msgr.fatal(_("Error while aggregation computation"))
+
     if connected:
         dbif.close()
 
@@ -43,6 +43,9 @@ class RPCDefs(object):
     G_LOCATION = 12
     G_GISDBASE = 13
     G_FATAL_ERROR = 14
+    READ_MAP_INFO_MANY = 15
+    MAP_EXISTS_MANY = 16
+    WRITE_TIMESTAMP_MANY = 17
 
     TYPE_RASTER = 0
     TYPE_RASTER3D = 1
@@ -267,9 +270,42 @@ def _write_timestamp(lock, conn, data):
     """
     maptype = data[1]
     name = data[2]
-    mapset = data[3]
     layer = data[4]
     timestring = data[5]
+    conn.send(_write_map_timestamp(maptype, name, layer, timestring))
+
+###############################################################################
+
+
+def _write_timestamp_many(lock, conn, data):
+    """Write the file based GRASS timestamps of a list of maps and send
+       the list of the return values of G_write_*_timestamp using the
+       provided pipe.
+
+       :param lock: A multiprocessing.Lock instance
+       :param conn: A multiprocessing.Pipe instance used to send the result
+       :param data: The list of data entries [function_id, maptype,
+                    [(name, mapset, timestring), ...], layer]
+    """
+    maptype = data[1]
+    maps = data[2]
+    layer = data[3]
+    conn.send([_write_map_timestamp(maptype, name, layer, timestring)
+               for name, mapset, timestring in maps])
+
+###############################################################################
+
+
+def _write_map_timestamp(maptype, name, layer, timestring):
+    """Write the file based GRASS timestamp of a single map
+
+       :param maptype: The type of the map
+       :param name: The name of the map
+       :param layer: The layer of the vector map
+       :param timestring: A GRASS datetime C-library compatible string
+       :returns: The return value of G_write_*_timestamp or -2 in case
+                 the timestring can not be converted
+    """
     check = -3
     ts = libgis.TimeStamp()
     check = libgis.G_scan_timestamp(byref(ts), timestring)
@@ -285,7 +321,7 @@ def _write_timestamp(lock, conn, data):
     elif maptype == RPCDefs.TYPE_RASTER3D:
         check = libgis.G_write_raster3d_timestamp(name, byref(ts))
 
-    conn.send(check)
+    return check
 
 ###############################################################################
 
@@ -337,6 +373,38 @@ def _map_exists(lock, conn, data):
     maptype = data[1]
     name = data[2]
     mapset = data[3]
+    conn.send(_find_map(maptype, name, mapset))
+
+###############################################################################
+
+
+def _map_exists_many(lock, conn, data):
+    """Check if the maps of a list exist in the spatial database
+
+       The value to be send via pipe is a list of True or False values,
+       one for each map.
+
+       :param lock: A multiprocessing.Lock instance
+       :param conn: A multiprocessing.Pipe instance used to send the result
+       :param data: The list of data entries [function_id, maptype,
+                    [(name, mapset), ...]]
+
+    """
+    maptype = data[1]
+    maps = data[2]
+    conn.send([_find_map(maptype, name, mapset) for name, mapset in maps])
+
+###############################################################################
+
+
+def _find_map(maptype, name, mapset):
+    """Check if a single map exists in the spatial database
+
+       :param maptype: The type of the map
+       :param name: The name of the map
+       :param mapset: The mapset of the map
+       :returns: True if the map exists, False if not
+    """
     check = False
     if maptype == RPCDefs.TYPE_RASTER:
         mapset = libgis.G_find_raster(name, mapset)
@@ -348,7 +416,7 @@ def _map_exists(lock, conn, data):
     if mapset:
         check = True
 
-    conn.send(check)
+    return check
 
 ###############################################################################
 
@@ -364,6 +432,39 @@ def _read_map_info(lock, conn, data):
     maptype = data[1]
     name = data[2]
     mapset = data[3]
+    conn.send(_read_info(maptype, name, mapset))
+
+###############################################################################
+
+
+def _read_map_info_many(lock, conn, data):
+    """Read map specific metadata of a list of maps from the spatial
+       database using C-library functions
+
+       The value to be send via pipe is a list with the key value pairs of
+       each map.
+
+       :param lock: A multiprocessing.Lock instance
+       :param conn: A multiprocessing.Pipe instance used to send the result
+       :param data: The list of data entries [function_id, maptype,
+                    [(name, mapset), ...]]
+    """
+    maptype = data[1]
+    maps = data[2]
+    conn.send([_read_info(maptype, name, mapset) for name, mapset in maps])
+
+###############################################################################
+
+
+def _read_info(maptype, name, mapset):
+    """Read the map specific metadata of a single map
+
+       :param maptype: The type of the map
+       :param name: The name of the map
+       :param mapset: The mapset of the map
+       :returns: The key value pairs of the map specific metadata
+    """
+    kvp = None
     if maptype == RPCDefs.TYPE_RASTER:
         kvp = _read_raster_info(name, mapset)
     elif maptype == RPCDefs.TYPE_VECTOR:
@@ -371,7 +472,7 @@ def _read_map_info(lock, conn, data):
     elif maptype == RPCDefs.TYPE_RASTER3D:
         kvp = _read_raster3d_info(name, mapset)
 
-    conn.send(kvp)
+    return kvp
 
 ###############################################################################
 
@@ -742,7 +843,7 @@ def c_library_server(lock, conn):
        :param conn: A multiprocessing.Pipe
     """
     # Crerate the function array
-    functions = [0]*15
+    functions = [0]*18
     functions[RPCDefs.STOP] = _stop
     functions[RPCDefs.HAS_TIMESTAMP] = _has_timestamp
     functions[RPCDefs.WRITE_TIMESTAMP] = _write_timestamp
@@ -757,6 +858,9 @@ def c_library_server(lock, conn):
     functions[RPCDefs.G_LOCATION] = _get_location
     functions[RPCDefs.G_GISDBASE] = _get_gisdbase
     functions[RPCDefs.G_FATAL_ERROR] = _fatal_error
+    functions[RPCDefs.READ_MAP_INFO_MANY] = _read_map_info_many
+    functions[RPCDefs.MAP_EXISTS_MANY] = _map_exists_many
+    functions[RPCDefs.WRITE_TIMESTAMP_MANY] = _write_timestamp_many
 
     libgis.G_gisinit("c_library_server")
     libgis.G_debug(1, "Start C-interface server")
@@ -783,6 +887,12 @@ class CLibrariesInterface(object):
        In this case the CLibrariesInterface object will simply start a
        new subprocess and restarts the pipeline.
 
+       Several server subprocesses can be started, the batch functions
+       that process a list of maps with a single message, like
+       read_map_info_many() or map_exists_many(), split the list across
+       the servers so that the metadata of many maps is read in parallel.
+       All the other functions are executed by the first server.
+
 
        Usage:
 
@@ -838,6 +948,18 @@ class CLibrariesInterface(object):
            >>> ciface.has_raster_timestamp("test", tgis.get_current_mapset())
            True
 
+           # Batch functions using several servers
+           >>> pciface = tgis.CLibrariesInterface(nprocs=2)
+           >>> maps = [("test", tgis.get_current_mapset()), ("nomap", None)]
+           >>> pciface.map_exists_many(maps, "raster")
+           [True, False]
+           >>> pciface.read_raster_info_many(maps[:1])
+           [{'rows': 12, 'north': 80.0, 'min': 1, 'datatype': 'CELL', 'max': 1, 'ewres': 10.0, 'cols': 8, 'west': 0.0, 'east': 120.0, 'nsres': 10.0, 'south': 0.0}]
+           >>> pciface.write_timestamp_many([("test", tgis.get_current_mapset(),
+           ...                                "13 Jan 1999 14:30:05")], "raster")
+           [1]
+           >>> pciface.stop()
+
 
            # 3D raster map
            >>> check = ciface.raster3d_map_exists("test", tgis.get_current_mapset())
@@ -899,30 +1021,154 @@ class CLibrariesInterface(object):
            >>> gscript.del_temp_region()
 
     """
-    def __init__(self):
+    # The map types of the temporal framework used by the batch functions
+    map_types = {"raster": RPCDefs.TYPE_RASTER,
+                 "raster3d": RPCDefs.TYPE_RASTER3D,
+                 "vector": RPCDefs.TYPE_VECTOR}
+
+    def __init__(self, nprocs=1):
+        """Constructor
+
+           :param nprocs: The number of server subprocesses to start
+        """
+        self.nprocs = max(1, int(nprocs))
         self.client_conn = None
         self.server_conn = None
         self.queue = None
         self.server = None
+        self.servers = []
         self.start_server()
 
     def start_server(self):
-        self.client_conn, self.server_conn = Pipe(True)
-        self.lock = Lock()
-        self.server = Process(target=c_library_server, args=(self.lock,
-                                                             self.server_conn))
-        self.server.daemon = True
-        self.server.start()
+        self.servers = [self._start_server_process()
+                        for i in range(self.nprocs)]
+        self.server, self.client_conn, self.server_conn, self.lock = \
+            self.servers[0]
+
+    def _start_server_process(self):
+        """Start a server subprocess
+
+           :returns: A tuple (process, client_conn, server_conn, lock)
+        """
+        client_conn, server_conn = Pipe(True)
+        lock = Lock()
+        server = Process(target=c_library_server, args=(lock, server_conn))
+        server.daemon = True
+        server.start()
+        return server, client_conn, server_conn, lock
 
     def _check_restart_server(self):
-        """Restart the server if it was terminated
+        """Restart the servers that were terminated
         """
-        if self.server.is_alive() is True:
-            return
-        self.client_conn.close()
-        self.server_conn.close()
-        self.start_server()
-        logging.warning("Needed to restart the libgis server")
+        for i, (server, client_conn, server_conn, lock) in \
+                enumerate(self.servers):
+            if server.is_alive() is True:
+                continue
+            client_conn.close()
+            server_conn.close()
+            self.servers[i] = self._start_server_process()
+            logging.warning("Needed to restart the libgis server")
+        self.server, self.client_conn, self.server_conn, self.lock = \
+            self.servers[0]
+
+    def _send_many(self, function, maptype, maps, *args):
+        """Split a list of maps in contiguous chunks, send a single
+           message for each chunk to the servers and collect the results
+           in the order of the maps
+
+           :param function: The function identifier
+           :param maptype: The type of the maps: raster, raster3d or vector
+           :param maps: A list of tuples, the first entries are the name
+                        and the mapset of a map
+           :returns: The list of the results, one for each map
+        """
+        if maptype not in self.map_types:
+            raise ValueError("Unsupported map type: %s" % maptype)
+        self._check_restart_server()
+        maps = list(maps)
+        if not maps:
+            return []
+        nservers = min(len(self.servers), len(maps))
+        size = (len(maps) + nservers - 1) // nservers
+        conns = []
+        for i in range(nservers):
+            chunk = maps[i * size:(i + 1) * size]
+            if not chunk:
+                break
+            conn = self.servers[i][1]
+            conn.send([function, self.map_types[maptype], chunk] + list(args))
+            conns.append(conn)
+        result = []
+        for conn in conns:
+            result.extend(conn.recv())
+        return result
+
+    def map_exists_many(self, maps, maptype):
+        """Check if the maps of a list exist in the spatial database
+
+           :param maps: A list of (name, mapset) tuples
+           :param maptype: The type of the maps: raster, raster3d or vector
+           :returns: A list of True or False values, one for each map
+        """
+        return self._send_many(RPCDefs.MAP_EXISTS_MANY, maptype, maps)
+
+    def read_map_info_many(self, maps, maptype):
+        """Read the map info of a list of maps from the file system
+
+           :param maps: A list of (name, mapset) tuples
+           :param maptype: The type of the maps: raster, raster3d or vector
+           :returns: A list with the key value pairs of the map specific
+                     metadata, one for each map
+        """
+        return self._send_many(RPCDefs.READ_MAP_INFO_MANY, maptype, maps)
+
+    def read_raster_info_many(self, maps):
+        """Read the raster map info of a list of raster maps
+
+           :param maps: A list of (name, mapset) tuples
+           :returns: A list with the key value pairs of the map specific
+                     metadata, one for each map
+        """
+        return self.read_map_info_many(maps, "raster")
+
+    def read_raster3d_info_many(self, maps):
+        """Read the 3D raster map info of a list of 3D raster maps
+
+           :param maps: A list of (name, mapset) tuples
+           :returns: A list with the key value pairs of the map specific
+                     metadata, one for each map
+        """
+        return self.read_map_info_many(maps, "raster3d")
+
+    def read_vector_info_many(self, maps):
+        """Read the vector map info of a list of vector maps
+
+           :param maps: A list of (name, mapset) tuples
+           :returns: A list with the key value pairs of the map specific
+                     metadata, one for each map
+        """
+        return self.read_map_info_many(maps, "vector")
+
+    def write_timestamp_many(self, maps, maptype, layer=None):
+        """Write the file based timestamps of a list of maps
+
+           Please have a look at the documentation of
+           G_write_raster_timestamp, G_write_vector_timestamp and
+           G_write_raster3d_timestamp for the return values description.
+
+           Note:
+               Only timestamps of maps from the current mapset can written.
+
+           :param maps: A list of (name, mapset, timestring) tuples, the
+                        timestring must be GRASS datetime C-library
+                        compatible
+           :param maptype: The type of the maps: raster, raster3d or vector
+           :param layer: The layer of the vector maps
+           :returns: A list with the return values of G_write_*_timestamp,
+                     one for each map
+        """
+        return self._send_many(RPCDefs.WRITE_TIMESTAMP_MANY, maptype, maps,
+                               layer)
 
     def raster_map_exists(self, name, mapset):
         """Check if a raster map exists in the spatial database
@@ -1283,12 +1529,13 @@ class CLibrariesInterface(object):
 
            This method should be called at exit using the package atexit
         """
-        if self.server is not None and self.server.is_alive():
-            self.client_conn.send([0, ])
-            self.server.join(5)
-            self.server.terminate()
-        if self.client_conn is not None:
-            self.client_conn.close()
+        for server, client_conn, server_conn, lock in self.servers:
+            if server is not None and server.is_alive():
+                client_conn.send([0, ])
+                server.join(5)
+                server.terminate()
+            if client_conn is not None:
+                client_conn.close()
 
 if __name__ == "__main__":
     import doctest
@@ -260,13 +260,15 @@ def get_tgis_message_interface():
 c_library_interface = None
 
 
-def _init_tgis_c_library_interface():
+def _init_tgis_c_library_interface(nprocs=1):
     """Set the global C-library interface variable that
        provides a fast and exit safe interface to the C-library libgis,
        libraster, libraster3d and libvector functions
+
+       :param nprocs: The number of C-library server subprocesses
     """
     global c_library_interface
-    c_library_interface = CLibrariesInterface()
+    c_library_interface = CLibrariesInterface(nprocs=nprocs)
 
 
 def get_tgis_c_library_interface():
@@ -480,6 +482,8 @@ def init(raise_fatal_error=False):
 
         - GRASS_TGIS_PROFILE (True, False, 1, 0)
         - GRASS_TGIS_RAISE_ON_ERROR (True, False, 1, 0)
+        - GRASS_TGIS_C_LIBRARY_NPROCS (number of C-library server
+          subprocesses used by the batch functions, default 1)
 
         ..warning::
 
@@ -531,8 +535,13 @@ def init(raise_fatal_error=False):
 
     # Start the GRASS message interface server
     _init_tgis_message_interface(raise_on_error)
-    # Start the C-library interface server
-    _init_tgis_c_library_interface()
+    # Start the C-library interface servers
+    nprocs = os.getenv("GRASS_TGIS_C_LIBRARY_NPROCS")
+    try:
+        nprocs = int(nprocs) if nprocs else 1
+    except ValueError:
+        nprocs = 1
+    _init_tgis_c_library_interface(nprocs)
     msgr = get_tgis_message_interface()
     msgr.debug(1, "Initiate the temporal database")
 
@@ -996,6 +1005,27 @@ class SQLDatabaseInterfaceConnection(object):
 
         return self.connections[mapset].execute_transaction(statement)
 
+    def execute_many_transaction(self, statements, mapset=None):
+        """Execute a list of parametrized SQL statements, each one with a
+           list of arguments, in a single transaction
+
+           :param statements: A list of (sql, args_list) tuples, the SQL
+                              statement is executed once for each entry of
+                              the argument list
+           :param mapset: The mapset of the abstract dataset or temporal
+                          database location, if None the current mapset
+                          will be used
+        """
+        if mapset is None:
+            mapset = self.current_mapset
+
+        if mapset not in self.tgis_mapsets.keys():
+            self.msgr.fatal(_("Unable to execute transaction. There is no "
+                              "temporal database connection defined for "
+                              "mapset <%(mapset)s>" % {"mapset": mapset}))
+
+        return self.connections[mapset].execute_many_transaction(statements)
+
 ###############################################################################
 
 
@@ -1279,6 +1309,44 @@ class DBConnection(object):
         if connected:
             self.close()
 
+    def execute_many_transaction(self, statements):
+        """Execute a list of parametrized SQL statements, each one with a
+           list of arguments, in a single transaction using executemany
+
+           :param statements: A list of (sql, args_list) tuples, the SQL
+                              statement is executed once for each entry of
+                              the argument list
+        """
+        connected = False
+        if not self.connected:
+            self.connect()
+            connected = True
+
+        sql = None
+        # The sqlite3 connection is in autocommit mode
+        if self.dbmi.__name__ == "sqlite3":
+            self.cursor.execute("BEGIN TRANSACTION")
+        try:
+            for sql, args_list in statements:
+                self.cursor.executemany(sql, args_list)
+            if self.dbmi.__name__ == "sqlite3":
+                self.cursor.execute("COMMIT")
+            else:
+                self.connection.commit()
+        except:
+            if self.dbmi.__name__ == "sqlite3":
+                self.cursor.execute("ROLLBACK")
+            else:
+                self.connection.rollback()
+            if connected:
+                self.close()
+            self.msgr.error(_("Unable to execute transaction:\n %(sql)s" %
+                            {"sql": sql}))
+            raise
+
+        if connected:
+            self.close()
+
 ###############################################################################
 
 
@@ -12,9 +12,8 @@ for details.
 from grass.script.utils import get_num_suffix
 from space_time_datasets import *
 from open_stds import *
-from multiprocessing import Process
 import grass.script as gscript
-from grass.exceptions import CalledModuleError
+from grass.exceptions import GrassError
 
 ############################################################################
 
@@ -47,6 +46,8 @@ def extract_dataset(input, output, type, where, expression, base, nprocs=1,
               is point,line,boundary,centroid,area and face
     """
 
+    import grass.pygrass.modules as pymod
+
     # Check the parameters
     msgr = get_tgis_message_interface()
 
@@ -76,8 +77,18 @@ def extract_dataset(input, output, type, where, expression, base, nprocs=1,
         # Run the mapcalc expression
         if expression:
             count = 0
-            proc_count = 0
-            proc_list = []
+            process_queue = pymod.ParallelModuleQueue(int(nprocs))
+            if type == "raster":
+                mapcalc = pymod.Module("r.mapcalc", quiet=True, run_=False,
+                                       overwrite=gscript.overwrite())
+            elif type == "raster3d":
+                mapcalc = pymod.Module("r3.mapcalc", quiet=True, run_=False,
+                                       overwrite=gscript.overwrite())
+            elif type == "vector":
+                v_extract = pymod.Module("v.extract", type=vtype.split(","),
+                                         where=expression, quiet=True,
+                                         run_=False,
+                                         overwrite=gscript.overwrite())
 
             for row in rows:
                 count += 1
@@ -116,54 +127,38 @@ def extract_dataset(input, output, type, where, expression, base, nprocs=1,
                                     (new_map.get_map_id()))
                         continue
 
-                # Add process to the process list
+                # Add the module to the process queue
                 if type == "raster":
                     msgr.verbose(_("Applying r.mapcalc expression: \"%s\"")
                                  % expr)
-                    proc_list.append(Process(target=run_mapcalc2d,
-                                             args=(expr,)))
+                    process_queue.put(mapcalc.copy()(expression=expr))
                 elif type == "raster3d":
                     msgr.verbose(_("Applying r3.mapcalc expression: \"%s\"")
                                  % expr)
-                    proc_list.append(Process(target=run_mapcalc3d,
-                                             args=(expr,)))
+                    process_queue.put(mapcalc.copy()(expression=expr))
                 elif type == "vector":
                     msgr.verbose(_("Applying v.extract where statement: \"%s\"")
                                  % expression)
                     if row["layer"]:
-                        proc_list.append(Process(target=run_vector_extraction,
-                                                 args=(row["name"] + "@" +
-                                                       row["mapset"], map_name,
-                                                       row["layer"], vtype,
-                                                       expression)))
+                        mod = v_extract.copy()(input=row["name"] + "@" +
+                                               row["mapset"], output=map_name,
+                                               layer=row["layer"])
                     else:
-                        proc_list.append(Process(target=run_vector_extraction,
-                                                 args=(row["name"] + "@" +
-                                                       row["mapset"], map_name,
-                                                       layer, vtype,
-                                                       expression)))
-
-                proc_list[proc_count].start()
-                proc_count += 1
-
-                # Join processes if the maximum number of processes are
-                # reached or the end of the loop is reached
-                if proc_count == nprocs or count == num_rows:
-                    proc_count = 0
-                    exitcodes = 0
-                    for proc in proc_list:
-                        proc.join()
-                        exitcodes += proc.exitcode
-                    if exitcodes != 0:
-                        dbif.close()
-                        msgr.fatal(_("Error in computation process"))
-
-                    # Empty process list
-                    proc_list = []
+                        mod = v_extract.copy()(input=row["name"] + "@" +
+                                               row["mapset"], output=map_name,
+                                               layer=layer)
+                    process_queue.put(mod)
 
                 # Store the new maps
                 new_maps[row["id"]] = new_map
 
+            # Wait for the processes that are still running
+            try:
+                process_queue.wait()
+            except GrassError:
+                dbif.close()
+                msgr.fatal(_("Error in computation process"))
+
         msgr.percent(0, num_rows, 1)
 
         temporal_type, semantic_type, title, description = sp.get_initial_values()
@@ -244,33 +239,3 @@ def extract_dataset(input, output, type, where, expression, base, nprocs=1,
                                     name=names, quiet=True)
 
     dbif.close()
-
-###############################################################################
-
-
-def run_mapcalc2d(expr):
-    """Helper function to run r.mapcalc in parallel"""
-    try:
-        gscript.run_command("r.mapcalc", expression=expr,
-                            overwrite=gscript.overwrite(), quiet=True)
-    except CalledModuleError:
-        exit(1)
-
-
-def run_mapcalc3d(expr):
-    """Helper function to run r3.mapcalc in parallel"""
-    try:
-        gscript.run_command("r3.mapcalc", expression=expr,
-                            overwrite=gscript.overwrite(), quiet=True)
-    except CalledModuleError:
-        exit(1)
-
-
-def run_vector_extraction(input, output, layer, type, where):
-    """Helper function to run r.mapcalc in parallel"""
-    try:
-        gscript.run_command("v.extract", input=input, output=output,
-                            layer=layer, type=type, where=where,
-                            overwrite=gscript.overwrite(), quiet=True)
-    except CalledModuleError:
-        exit(1)
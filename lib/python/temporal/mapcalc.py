@@ -11,9 +11,8 @@ for details.
 
 from space_time_datasets import *
 from open_stds import *
-from multiprocessing import Process
 import grass.script as gscript
-from grass.exceptions import CalledModuleError
+from grass.exceptions import GrassError
 
 ############################################################################
 
@@ -75,6 +74,7 @@ def dataset_mapcalculator(inputs, output, type, expression, base, method,
        :param register_null: Set this number True to register empty maps
        :param spatial: Check spatial overlap
     """
+    import grass.pygrass.modules as pymod
 
     # We need a database interface for fast computation
     dbif = SQLDatabaseInterfaceConnection()
@@ -189,8 +189,13 @@ def dataset_mapcalculator(inputs, output, type, expression, base, method,
         num = len(map_matrix[0])
 
         # Parallel processing
-        proc_list = []
-        proc_count = 0
+        process_queue = pymod.ParallelModuleQueue(int(nprocs))
+        if type == "raster":
+            mapcalc = pymod.Module("r.mapcalc", overwrite=gscript.overwrite(),
+                                   quiet=True, run_=False, finish_=False)
+        else:
+            mapcalc = pymod.Module("r3.mapcalc", overwrite=gscript.overwrite(),
+                                   quiet=True, run_=False, finish_=False)
 
         # For all samples
         for i in range(num):
@@ -256,26 +261,13 @@ def dataset_mapcalculator(inputs, output, type, expression, base, method,
             msgr.verbose(_("Apply mapcalc expression: \"%s\"") % expr)
 
             # Start the parallel r.mapcalc computation
-            if type == "raster":
-                proc_list.append(Process(target=_run_mapcalc2d, args=(expr,)))
-            else:
-                proc_list.append(Process(target=_run_mapcalc3d, args=(expr,)))
-            proc_list[proc_count].start()
-            proc_count += 1
-
-            if proc_count == nprocs or proc_count == num or count == num:
-                proc_count = 0
-                exitcodes = 0
-                for proc in proc_list:
-                    proc.join()
-                    exitcodes += proc.exitcode
+            process_queue.put(mapcalc.copy()(expression=expr))
 
-                if exitcodes != 0:
-                    dbif.close()
-                    msgr.fatal(_("Error while mapcalc computation"))
-
-                # Empty process list
-                proc_list = []
+        try:
+            process_queue.wait()
+        except GrassError:
+            dbif.close()
+            msgr.fatal(_("Error while mapcalc computation"))
 
         # Register the new maps in the output space time dataset
         msgr.message(_("Starting map registration in temporal database..."))
@@ -339,27 +331,6 @@ def dataset_mapcalculator(inputs, output, type, expression, base, method,
 
 ###############################################################################
 
-def _run_mapcalc2d(expr):
-    """Helper function to run r.mapcalc in parallel"""
-    try:
-        gscript.run_command("r.mapcalc", expression=expr,
-                            overwrite=gscript.overwrite(), quiet=True)
-    except CalledModuleError:
-        exit(1)
-
-###############################################################################
-
-
-def _run_mapcalc3d(expr):
-    """Helper function to run r3.mapcalc in parallel"""
-    try:
-        gscript.run_command("r3.mapcalc", expression=expr,
-                            overwrite=gscript.overwrite(), quiet=True)
-    except CalledModuleError:
-        exit(1)
-
-###############################################################################
-
 
 def _operator_parser(expr, first, current):
     """This method parses the expression string and substitutes
@@ -17,6 +17,7 @@ for details.
 :authors: Soeren Gebbert
 """
 
+import time
 from open_stds import *
 import grass.script as gscript
 
@@ -26,7 +27,7 @@ import grass.script as gscript
 def register_maps_in_space_time_dataset(
     type, name, maps=None, file=None, start=None,
     end=None, unit=None, increment=None, dbif=None,
-        interval=False, fs="|", update_cmd_list=True):
+        interval=False, fs="|", update_cmd_list=True, chunk_size=10000):
     """Use this method to register maps in space time datasets.
 
        Additionally a start time string and an increment string can be
@@ -59,6 +60,9 @@ def register_maps_in_space_time_dataset(
        :param fs: Field separator used in input file
        :param update_cmd_list: If is True, the command that was invoking this
                                process will be written to the process history
+       :param chunk_size: The number of maps that are gathered with a single
+                          call of the C-library interface and inserted
+                          in the temporal database with a single transaction
     """
     start_time_in_file = False
     end_time_in_file = False
@@ -159,152 +163,187 @@ def register_maps_in_space_time_dataset(
     statement = ""
     # Store the ids of datasets that must be updated
     datatsets_to_modify = {}
+    # The time in seconds spent in each registration phase
+    timings = [[_("Gathering map information"), 0.0],
+               [_("Inserting maps in the temporal database"), 0.0],
+               [_("Registering maps in the space time dataset"), 0.0],
+               [_("Updating space time datasets"), 0.0]]
+
+    ciface = get_tgis_c_library_interface()
+    # Read the ids of the maps of all mapsets of the map list that are
+    # already stored in the temporal database with one query per mapset
+    mapsets = set(row["id"].split("@")[-1] for row in maplist)
+    registered_ids = _get_map_ids_in_db(type, mapsets, dbif)
 
     msgr.message(_("Gathering map information..."))
 
-    for count in range(len(maplist)):
-        if count % 50 == 0:
-            msgr.percent(count, num_maps, 1)
-
-        # Get a new instance of the map type
-        map = dataset_factory(type, maplist[count]["id"])
-
-        if map.map_exists() is not True:
-            msgr.fatal(_("Unable to update %(t)s map <%(id)s>. "
-                         "The map does not exist.") % {'t': map.get_type(),
-                                                       'id': map.get_map_id()})
-
-        # Use the time data from file
-        if "start" in maplist[count]:
-            start = maplist[count]["start"]
-        if "end" in maplist[count]:
-            end = maplist[count]["end"]
-
-        is_in_db = False
+    # The maps are processed in chunks, the metadata of each chunk is read
+    # with a single batch call of the C-library interface and the new maps
+    # are inserted with a single transaction
+    for chunk_start in range(0, num_maps, chunk_size):
+        phase_start = time.time()
+        chunk = maplist[chunk_start:chunk_start + chunk_size]
+        maps = [dataset_factory(type, row["id"]) for row in chunk]
+        map_type = maps[0].get_type()
+        exists = ciface.map_exists_many([(map.get_name(), map.get_mapset())
+                                         for map in maps], map_type)
+        load_list = []
+
+        for index in range(len(chunk)):
+            count = chunk_start + index
+            if count % 50 == 0:
+                msgr.percent(count, num_maps, 1)
 
-        # Put the map into the database
-        if not map.is_in_db(dbif):
-            # Break in case no valid time is provided
-            if (start == "" or start is None) and not map.has_grass_timestamp():
-                dbif.close()
-                if map.get_layer():
-                    msgr.fatal(_("Unable to register %(t)s map <%(id)s> with "
-                                 "layer %(l)s. The map has timestamp and "
-                                 "the start time is not set.") % {
-                               't': map.get_type(), 'id': map.get_map_id(),
-                               'l': map.get_layer()})
-                else:
-                    msgr.fatal(_("Unable to register %(t)s map <%(id)s>. The"
-                                 " map has no timestamp and the start time "
-                                 "is not set.") % {'t': map.get_type(),
-                                                   'id': map.get_map_id()})
-            if start != "" and start is not None:
-                # We need to check if the time is absolute and the unit was specified
-                time_object = check_datetime_string(start)
-                if isinstance(time_object, datetime) and unit:
-                    msgr.fatal(_("%(u)s= can only be set for relative time") %
-                               {'u': "unit"})
-                if not isinstance(time_object, datetime) and not unit:
-                    msgr.fatal(_("%(u)s= must be set in case of relative time"
-                                 " stamps") % {'u': "unit"})
-
-                if unit:
-                    map.set_time_to_relative()
-                else:
-                    map.set_time_to_absolute()
+            map = maps[index]
 
-        else:
-            is_in_db = True
-            # Check the overwrite flag
-            if not gscript.overwrite():
-                if map.get_layer():
-                    msgr.warning(_("Map is already registered in temporal "
-                                   "database. Unable to update %(t)s map "
-                                   "<%(id)s> with layer %(l)s. Overwrite flag"
-                                   " is not set.") % {'t': map.get_type(),
-                                                      'id': map.get_map_id(),
-                                                      'l': str(map.get_layer())})
-                else:
-                    msgr.warning(_("Map is already registered in temporal "
-                                   "database. Unable to update %(t)s map "
-                                   "<%(id)s>. Overwrite flag is not set.") %
-                                 {'t': map.get_type(), 'id': map.get_map_id()})
-
-                # Simple registration is allowed
-                if name:
-                    map_object_list.append(map)
-                # Jump to next map
-                continue
+            if exists[index] is not True:
+                msgr.fatal(_("Unable to update %(t)s map <%(id)s>. "
+                             "The map does not exist.") % {'t': map.get_type(),
+                                                           'id': map.get_map_id()})
 
-            # Select information from temporal database
-            map.select(dbif)
+            # Use the time data from file
+            if "start" in chunk[index]:
+                start = chunk[index]["start"]
+            if "end" in chunk[index]:
+                end = chunk[index]["end"]
 
-            # Save the datasets that must be updated
-            datasets = map.get_registered_stds(dbif)
-            if datasets is not None:
-                for dataset in datasets:
-                    if dataset != "":
-                        datatsets_to_modify[dataset] = dataset
+            is_in_db = False
 
-                if name and map.get_temporal_type() != sp.get_temporal_type():
+            # Put the map into the database
+            if map.get_id() not in registered_ids:
+                # Break in case no valid time is provided
+                if (start == "" or start is None) and \
+                   not map.has_grass_timestamp():
                     dbif.close()
                     if map.get_layer():
-                        msgr.fatal(_("Unable to update %(t)s map <%(id)s> "
-                                     "with layer %(l)s. The temporal types "
-                                     "are different.") % {'t': map.get_type(),
-                                                          'id': map.get_map_id(),
-                                                          'l': map.get_layer()})
+                        msgr.fatal(_("Unable to register %(t)s map <%(id)s> "
+                                     "with layer %(l)s. The map has timestamp"
+                                     " and the start time is not set.") % {
+                                   't': map.get_type(), 'id': map.get_map_id(),
+                                   'l': map.get_layer()})
                     else:
-                        msgr.fatal(_("Unable to update %(t)s map <%(id)s>. "
-                                     "The temporal types are different.") %
+                        msgr.fatal(_("Unable to register %(t)s map <%(id)s>. "
+                                     "The map has no timestamp and the start "
+                                     "time is not set.") %
                                    {'t': map.get_type(),
                                     'id': map.get_map_id()})
+                if start != "" and start is not None:
+                    # We need to check if the time is absolute and the unit was specified
+                    time_object = check_datetime_string(start)
+                    if isinstance(time_object, datetime) and unit:
+                        msgr.fatal(_("%(u)s= can only be set for relative "
+                                     "time") % {'u': "unit"})
+                    if not isinstance(time_object, datetime) and not unit:
+                        msgr.fatal(_("%(u)s= must be set in case of relative"
+                                     " time stamps") % {'u': "unit"})
+
+                    if unit:
+                        map.set_time_to_relative()
+                    else:
+                        map.set_time_to_absolute()
 
-        # Load the data from the grass file database
-        map.load()
-
-        # Try to read an existing time stamp from the grass spatial database
-        # in case this map wasn't already registered in the temporal database
-        if not is_in_db:
-            map.read_timestamp_from_grass()
-
-        # Set the valid time
-        if start:
-            # In case the time is in the input file we ignore the increment
-            # counter
-            if start_time_in_file:
-                count = 1
-            assign_valid_time_to_map(ttype=map.get_temporal_type(),
-                                     map=map, start=start, end=end, unit=unit,
-                                     increment=increment, mult=count,
-                                     interval=interval)
-
-        if is_in_db:
-            #  Gather the SQL update statement
-            statement += map.update_all(dbif=dbif, execute=False)
-        else:
-            #  Gather the SQL insert statement
-            statement += map.insert(dbif=dbif, execute=False)
-
-        # Sqlite3 performance is better for huge datasets when committing in
-        # small chunks
-        if dbif.get_dbmi().__name__ == "sqlite3":
-            if count % 100 == 0:
-                if statement is not None and statement != "":
-                    dbif.execute_transaction(statement)
-                    statement = ""
+            else:
+                is_in_db = True
+                # Check the overwrite flag
+                if not gscript.overwrite():
+                    if map.get_layer():
+                        msgr.warning(_("Map is already registered in temporal"
+                                       " database. Unable to update %(t)s map"
+                                       " <%(id)s> with layer %(l)s. Overwrite"
+                                       " flag is not set.") % {
+                                     't': map.get_type(),
+                                     'id': map.get_map_id(),
+                                     'l': str(map.get_layer())})
+                    else:
+                        msgr.warning(_("Map is already registered in temporal"
+                                       " database. Unable to update %(t)s map"
+                                       " <%(id)s>. Overwrite flag is not "
+                                       "set.") % {'t': map.get_type(),
+                                                  'id': map.get_map_id()})
+
+                    # Simple registration is allowed
+                    if name:
+                        map_object_list.append(map)
+                    # Jump to next map
+                    continue
+
+                # Select information from temporal database
+                map.select(dbif)
+
+                # Save the datasets that must be updated
+                datasets = map.get_registered_stds(dbif)
+                if datasets is not None:
+                    for dataset in datasets:
+                        if dataset != "":
+                            datatsets_to_modify[dataset] = dataset
+
+                    if name and map.get_temporal_type() != sp.get_temporal_type():
+                        dbif.close()
+                        if map.get_layer():
+                            msgr.fatal(_("Unable to update %(t)s map <%(id)s>"
+                                         " with layer %(l)s. The temporal "
+                                         "types are different.") % {
+                                       't': map.get_type(),
+                                       'id': map.get_map_id(),
+                                       'l': map.get_layer()})
+                        else:
+                            msgr.fatal(_("Unable to update %(t)s map <%(id)s>."
+                                         " The temporal types are different.")
+                                       % {'t': map.get_type(),
+                                          'id': map.get_map_id()})
+
+            load_list.append((map, is_in_db, start, end, count))
 
-        # Store the maps in a list to register in a space time dataset
-        if name:
-            map_object_list.append(map)
+        # Load the data from the grass file database
+        kvps = ciface.read_map_info_many([(entry[0].get_name(),
+                                           entry[0].get_mapset())
+                                          for entry in load_list], map_type)
+
+        new_maps = []
+        for (map, is_in_db, start, end, count), kvp in zip(load_list, kvps):
+            map.load_from_info(kvp)
+
+            # Try to read an existing time stamp from the grass spatial
+            # database in case this map wasn't already registered in the
+            # temporal database
+            if not is_in_db:
+                map.read_timestamp_from_grass()
+
+            # Set the valid time
+            if start:
+                # In case the time is in the input file we ignore the
+                # increment counter
+                if start_time_in_file:
+                    count = 1
+                assign_valid_time_to_map(ttype=map.get_temporal_type(),
+                                         map=map, start=start, end=end,
+                                         unit=unit, increment=increment,
+                                         mult=count, interval=interval)
+
+            if is_in_db:
+                #  Gather the SQL update statement
+                statement += map.update_all(dbif=dbif, execute=False)
+                # Store the maps in a list to register in a space time
+                # dataset
+                if name:
+                    map_object_list.append(map)
+            else:
+                new_maps.append(map)
+        timings[0][1] += time.time() - phase_start
+
+        phase_start = time.time()
+        if statement is not None and statement != "":
+            dbif.execute_transaction(statement)
+            statement = ""
+        # Insert the new maps and register them in the space time dataset
+        if new_maps:
+            _insert_maps(new_maps, sp if name else None, dbif)
+        timings[1][1] += time.time() - phase_start
 
     msgr.percent(num_maps, num_maps, 1)
 
-    if statement is not None and statement != "":
-        msgr.message(_("Registering maps in the temporal database..."))
-        dbif.execute_transaction(statement)
-
     # Finally Register the maps in the space time dataset
+    phase_start = time.time()
     if name and map_object_list:
         count = 0
         num_maps = len(map_object_list)
@@ -314,9 +353,11 @@ def register_maps_in_space_time_dataset(
                 msgr.percent(count, num_maps, 1)
             sp.register_map(map=map, dbif=dbif)
             count += 1
+    timings[2][1] += time.time() - phase_start
 
     # Update the space time tables
-    if name and map_object_list:
+    phase_start = time.time()
+    if name and (map_object_list or sp.map_counter > 0):
         msgr.message(_("Updating space time dataset..."))
         sp.update_from_registered_maps(dbif)
         if update_cmd_list is True:
@@ -333,12 +374,177 @@ def register_maps_in_space_time_dataset(
                 ds = dataset_factory("stvds", dataset)
             ds.select(dbif)
             ds.update_from_registered_maps(dbif)
+    timings[3][1] += time.time() - phase_start
 
     if connected is True:
         dbif.close()
 
     msgr.percent(num_maps, num_maps, 1)
 
+    for phase, seconds in timings:
+        msgr.verbose(_("%(phase)s: %(sec).3f seconds") % {'phase': phase,
+                                                          'sec': seconds})
+
+
+###############################################################################
+
+def _get_map_ids_in_db(type, mapsets, dbif):
+    """Return the ids of the maps of a list of mapsets that are stored
+       in the temporal database
+
+       :param type: The type of the maps raster, raster_3d or vector
+       :param mapsets: The mapsets of the maps
+       :param dbif: The database interface to be used
+       :return: A set of map ids
+    """
+    table = dataset_factory(type, None).base.get_table_name()
+    ids = set()
+    # The maps of each mapset are stored in the temporal database
+    # of that mapset
+    for mapset in mapsets:
+        if mapset not in dbif.tgis_mapsets:
+            continue
+        if dbif.get_dbmi(mapset).paramstyle == "qmark":
+            sql = "SELECT id FROM " + table + " WHERE mapset = ?"
+        else:
+            sql = "SELECT id FROM " + table + " WHERE mapset = %s"
+        dbif.execute(sql, (mapset,), mapset=mapset)
+        rows = dbif.fetchall(mapset=mapset)
+        if rows:
+            ids.update(row[0] for row in rows)
+    return ids
+
+
+def _insert_maps(maps, sp, dbif):
+    """Insert a list of new maps in the temporal database and register
+       them in a space time dataset, using executemany in a single
+       transaction
+
+       :param maps: A list of AbstractMapDataset objects that are not
+                    stored in the temporal database
+       :param sp: The space time dataset in which the maps are registered
+                  or None
+       :param dbif: The database interface to be used
+    """
+    msgr = get_tgis_message_interface()
+
+    if get_enable_mapset_check() is True:
+        current_mapset = get_current_mapset()
+        for map in maps:
+            if map.get_mapset() != current_mapset:
+                dbif.close()
+                msgr.fatal(_("Unable to insert dataset <%(ds)s> of type "
+                             "%(type)s in the temporal database. The mapset "
+                             "of the dataset does not match the current "
+                             "mapset") % {"ds": map.get_id(),
+                                          "type": map.get_type()})
+
+    register_args = []
+    if sp is not None:
+        if get_enable_mapset_check() is True and \
+           sp.get_mapset() != get_current_mapset():
+            dbif.close()
+            msgr.fatal(_("Unable to register map in dataset <%(ds)s> of "
+                         "type %(type)s. The mapset of the dataset does "
+                         "not match the current mapset") %
+                       {"ds": sp.get_id(), "type": sp.get_type()})
+
+        # In case no map has been registered yet, set the
+        # relative time unit from the first map
+        if (sp.metadata.get_number_of_maps() is None or
+            sp.metadata.get_number_of_maps() == 0) and \
+           sp.map_counter == 0 and sp.is_time_relative():
+            sp.set_relative_time_unit(maps[0].get_relative_time_unit())
+            dbif.execute_transaction(
+                sp.relative_time.get_update_all_statement_mogrified(dbif))
+
+        stds_id = sp.base.get_id()
+        stds_ttype = sp.get_temporal_type()
+        stds_rel_time_unit = sp.get_relative_time_unit()
+
+        for map in maps:
+            if not map.check_for_correct_time():
+                dbif.close()
+                msgr.fatal(_("Map <%s> has invalid time") % (map.get_map_id()))
+            if map.get_temporal_type() != stds_ttype:
+                dbif.close()
+                msgr.fatal(_("Temporal type of space time dataset <%(id)s> "
+                             "and map <%(map)s> are different") %
+                           {'id': sp.get_id(), 'map': map.get_map_id()})
+            if sp.is_time_relative() and \
+               stds_rel_time_unit != map.get_relative_time_unit():
+                dbif.close()
+                msgr.fatal(_("Relative time units of space time dataset "
+                             "<%(id)s> and map <%(map)s> are different") %
+                           {'id': sp.get_id(), 'map': map.get_map_id()})
+            if get_enable_mapset_check() is True and \
+               sp.base.get_mapset() != map.base.get_mapset():
+                dbif.close()
+                msgr.fatal(_("Only maps from the same mapset can be "
+                             "registered"))
+            # The map is new, hence the space time dataset is the only
+            # entry of its register
+            map.stds_register.set_registered_stds(stds_id)
+            register_args.append((map.base.get_id(),))
+
+    # Group the arguments of the INSERT statements by SQL statement
+    statements = []
+    args_lists = {}
+    for map in maps:
+        for sql, args in map.get_insert_statement_list():
+            if sql not in args_lists:
+                args_lists[sql] = []
+                statements.append(sql)
+            args_lists[sql].append(args)
+    statements = [(sql, args_lists[sql]) for sql in statements]
+
+    if register_args:
+        if dbif.get_dbmi().paramstyle == "qmark":
+            sql = "INSERT INTO " + sp.get_map_register() + " (id) VALUES (?)"
+        else:
+            sql = "INSERT INTO " + sp.get_map_register() + " (id) VALUES (%s)"
+        statements.append((sql, register_args))
+
+    # Write the timestamps of the new maps, as AbstractMapDataset.insert()
+    if get_enable_timestamp_write():
+        _write_timestamps(maps)
+
+    dbif.execute_many_transaction(statements)
+
+    if sp is not None:
+        sp.map_counter += len(maps)
+
+
+def _write_timestamps(maps):
+    """Write the timestamps of a list of maps into the map metadata in
+       the grass file system based spatial database with a single batch
+       call of the C-library interface for each vector layer
+
+       :param maps: A list of AbstractMapDataset objects of the same type
+    """
+    msgr = get_tgis_message_interface()
+    ciface = get_tgis_c_library_interface()
+
+    layers = {}
+    for map in maps:
+        layers.setdefault(map.get_layer(), []).append(map)
+
+    for layer, layer_maps in layers.items():
+        checks = ciface.write_timestamp_many(
+            [(map.get_name(), map.get_mapset(), map._convert_timestamp())
+             for map in layer_maps], layer_maps[0].get_type(), layer)
+        for map, check in zip(layer_maps, checks):
+            if check == -1:
+                msgr.error(_("Unable to create timestamp file for %(t)s map "
+                             "<%(id)s>") % {'t': map.get_type(),
+                                            'id': map.get_map_id()})
+            elif check == -2:
+                msgr.error(_("Invalid datetime in timestamp for %(t)s map "
+                             "<%(id)s>") % {'t': map.get_type(),
+                                            'id': map.get_map_id()})
+            elif check == -3:
+                msgr.error(_("Internal error"))
+
 
 ###############################################################################
 
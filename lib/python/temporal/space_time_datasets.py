@@ -296,12 +296,22 @@ class RasterDataset(AbstractMapDataset):
         if self.map_exists() is not True:
             return False
 
-        # Fill base information
-        self.base.set_creator(str(getpass.getuser()))
-
         kvp = self.ciface.read_raster_info(self.get_name(),
                                            self.get_mapset())
 
+        return self.load_from_info(kvp)
+
+    def load_from_info(self, kvp):
+        """Load the info of a raster map read with
+           CLibrariesInterface.read_raster_info() into the internal structure
+
+           :param kvp: The key value pairs of the raster map metadata
+           :return: True if the metadata was filled successfully,
+                    False otherwise
+        """
+        # Fill base information
+        self.base.set_creator(str(getpass.getuser()))
+
         if kvp:
             # Fill spatial extent
             self.set_spatial_extent_from_values(north=kvp["north"],
@@ -627,13 +637,24 @@ class Raster3DDataset(AbstractMapDataset):
         if self.map_exists() is not True:
             return False
 
+        kvp = self.ciface.read_raster3d_info(self.get_name(),
+                                             self.get_mapset())
+
+        return self.load_from_info(kvp)
+
+    def load_from_info(self, kvp):
+        """Load the info of a 3D raster map read with
+           CLibrariesInterface.read_raster3d_info() into the internal
+           structure
+
+           :param kvp: The key value pairs of the 3D raster map metadata
+           :return: True if the metadata was filled successfully,
+                    False otherwise
+        """
         # Fill base information
         self.base.set_creator(str(getpass.getuser()))
 
         # Fill spatial extent
-        kvp = self.ciface.read_raster3d_info(self.get_name(),
-                                             self.get_mapset())
-
         if kvp:
             self.set_spatial_extent_from_values(north=kvp["north"],
                                                 south=kvp["south"],
@@ -917,14 +938,23 @@ class VectorDataset(AbstractMapDataset):
         if self.map_exists() is not True:
             return False
 
-        # Fill base information
-        self.base.set_creator(str(getpass.getuser()))
-
         # Get the data from an existing vector map
-
         kvp = self.ciface.read_vector_info(self.get_name(),
                                            self.get_mapset())
 
+        return self.load_from_info(kvp)
+
+    def load_from_info(self, kvp):
+        """Load the info of a vector map read with
+           CLibrariesInterface.read_vector_info() into the internal structure
+
+           :param kvp: The key value pairs of the vector map metadata
+           :return: True if the metadata was filled successfully,
+                    False otherwise
+        """
+        # Fill base information
+        self.base.set_creator(str(getpass.getuser()))
+
         if kvp:
             # Fill spatial extent
             self.set_spatial_extent_from_values(north=kvp["north"],
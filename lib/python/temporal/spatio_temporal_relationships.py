@@ -538,6 +538,27 @@ class SpatioTemporalTopologyBuilder(object):
             for map_ in mapsB:
                 map_.reset_topology()
 
+        # The temporal topology is computed with a sweep over the sorted
+        # time stamps, the R*-Tree is only needed for the spatial topology
+        if spatial is not None or \
+           not self._build_temporal_relations(mapsA, mapsB):
+            self._build_rtree_relations(mapsA, mapsB, spatial)
+
+        self._build_internal_iteratable(mapsA, spatial)
+        if not identical and mapsB is not None:
+            self._build_iteratable(mapsB, spatial)
+
+    def _build_rtree_relations(self, mapsA, mapsB, spatial=None):
+        """Set the temporal and spatial relations between the maps of
+           mapsA and mapsB using a R*-Tree to search the related maps
+
+           :param mapsA: A list of abstract_dataset objects
+           :param mapsB: A list of abstract_dataset objects
+           :param spatial: This indicates if the spatial topology is created
+                           as well: spatial can be None (no spatial topology),
+                           "2D" using west, east, south, north or "3D" using
+                           west, east, south, north, bottom, top
+        """
         tree = self. _build_rtree(mapsA, spatial)
 
         list_ = gis.G_new_ilist()
@@ -562,14 +583,158 @@ class SpatioTemporalTopologyBuilder(object):
                     relation = mapsB[j].spatial_relation(mapsA[i])
                     set_spatial_relationship(A, B, relation)
 
-        self._build_internal_iteratable(mapsA, spatial)
-        if not identical and mapsB is not None:
-            self._build_iteratable(mapsB, spatial)
-
         gis.G_free_ilist(list_)
 
         rtree.RTreeDestroyTree(tree)
 
+    def _temporal_extent_arrays(self, maps, np):
+        """Return the temporal extents of the maps as NumPy arrays
+
+           The absolute time is converted into microseconds since
+           0001-01-01 00:00:00 to compare the time stamps exactly.
+
+           :param maps: A list of abstract_dataset objects
+           :param np: The numpy module
+           :return: A tuple (absolute, unit, start, end, has_end, valid)
+                    or None if the list contains absolute and relative
+                    time stamps or relative time stamps with different
+                    or missing units
+        """
+        num = len(maps)
+        absolute = None
+        unit = None
+        start = [0] * num
+        end = [0] * num
+        has_end = np.zeros(num, dtype=bool)
+        valid = np.zeros(num, dtype=bool)
+
+        for i, map_ in enumerate(maps):
+            start_, end_ = map_.get_temporal_extent_as_tuple()
+            if start_ is None:
+                continue
+            if absolute is None:
+                absolute = map_.is_time_absolute()
+            elif absolute != map_.is_time_absolute():
+                return None
+            if not absolute:
+                # The relative time stamps are only comparable if
+                # they have the same unit
+                unit_ = map_.get_relative_time_unit()
+                if unit_ is None or (unit is not None and unit_ != unit):
+                    return None
+                unit = unit_
+            if absolute:
+                delta = start_ - self._timeref
+                start_ = (delta.days * 86400 + delta.seconds) * 1000000 + \
+                    delta.microseconds
+                if end_ is not None:
+                    delta = end_ - self._timeref
+                    end_ = (delta.days * 86400 + delta.seconds) * 1000000 + \
+                        delta.microseconds
+            valid[i] = True
+            start[i] = start_
+            if end_ is None:
+                end[i] = start_
+            else:
+                end[i] = end_
+                has_end[i] = True
+
+        dtype = np.int64 if absolute else np.float64
+        return (absolute, unit, np.array(start, dtype=dtype),
+                np.array(end, dtype=dtype), has_end, valid)
+
+    def _build_temporal_relations(self, mapsA, mapsB):
+        """Set the temporal relations between the maps of mapsA and mapsB
+           using NumPy
+
+           The maps of mapsA are sorted by start time, the related maps
+           of each map of mapsB are searched with a binary search over the
+           sorted start times and the relations of all pairs are classified
+           in vectorized form.
+
+           :param mapsA: A list of abstract_dataset objects
+           :param mapsB: A list of abstract_dataset objects
+           :return: False if NumPy is not available or the maps have
+                    different temporal types or relative time units,
+                    True otherwise
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            return False
+
+        extentA = self._temporal_extent_arrays(mapsA, np)
+        extentB = self._temporal_extent_arrays(mapsB, np)
+        if extentA is None or extentB is None:
+            return False
+        absA, unitA, startA, endA, has_endA, validA = extentA
+        absB, unitB, startB, endB, has_endB, validB = extentB
+        if not validA.any() or not validB.any():
+            return True
+        if absA != absB or unitA != unitB:
+            return False
+
+        # Sort the valid maps of mapsA by start time
+        orderA = np.nonzero(validA)[0]
+        orderA = orderA[np.argsort(startA[orderA], kind="mergesort")]
+        sorted_start = startA[orderA]
+        max_length = (endA[orderA] - sorted_start).max()
+
+        # The maps of mapsA that can be related with a map of mapsB are
+        # located between these indices of the sorted start times
+        low = np.searchsorted(sorted_start, startB - max_length, "left")
+        high = np.searchsorted(sorted_start, endB, "right")
+        counts = np.where(validB, np.maximum(high - low, 0), 0)
+
+        # Process the candidate pairs in chunks to limit the memory usage
+        cumsum = np.cumsum(counts)
+        first = 0
+        done = 0
+        while first < len(mapsB):
+            last = int(np.searchsorted(cumsum, done + 1000000, "right"))
+            last = max(last, first + 1)
+            self._set_temporal_relations(mapsA, mapsB, np, extentA, extentB,
+                                         orderA, low, counts, first, last)
+            done = cumsum[last - 1]
+            first = last
+
+        return True
+
+    def _set_temporal_relations(self, mapsA, mapsB, np, extentA, extentB,
+                                orderA, low, counts, first, last):
+        """Classify and set the temporal relations of the candidate pairs
+           of the maps mapsB[first:last]"""
+        absA, unitA, startA, endA, has_endA, validA = extentA
+        absB, unitB, startB, endB, has_endB, validB = extentB
+        counts = counts[first:last]
+        total = int(counts.sum())
+        if total == 0:
+            return
+
+        # Expand the candidate pairs
+        j = np.repeat(np.arange(first, last), counts)
+        offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts,
+                                              counts)
+        i = orderA[np.repeat(low[first:last], counts) + offset]
+
+        # Keep only the pairs with overlapping or meeting extents and
+        # order them like the R*-Tree search results
+        keep = endA[i] >= startB[j]
+        i = i[keep]
+        j = j[keep]
+        order = np.lexsort((i, j))
+        i = i[order]
+        j = j[order]
+
+        codes = temporal_relation_codes(startB[j], endB[j], has_endB[j],
+                                        startA[i], endA[i], has_endA[i], np)
+
+        relations = TEMPORAL_RELATIONS
+        for j_, i_, code in zip(j.tolist(), i.tolist(), codes.tolist()):
+            if code >= 0:
+                set_temoral_relationship(mapsA[i_], mapsB[j_],
+                                         relations[code])
+
     def __iter__(self):
         start_ = self._first
         while start_ is not None:
@@ -587,6 +752,82 @@ class SpatioTemporalTopologyBuilder(object):
 
 ###############################################################################
 
+#: The temporal relations that are set in the temporal topology, ordered
+#: by the precedence used in AbstractDataset.temporal_relation()
+TEMPORAL_RELATIONS = ("equal", "during", "contains", "overlaps", "overlapped",
+                      "starts", "finishes", "started", "finished", "follows",
+                      "precedes")
+
+
+def temporal_relation_codes(startA, endA, has_endA, startB, endB, has_endB,
+                            np):
+    """Classify the temporal relations of A to B in vectorized form
+
+       The relations are computed as AbstractDataset.temporal_relation(),
+       the time instances have no end time and the end arrays must contain
+       the start time for them.
+
+       :param startA: The start times of A
+       :param endA: The end times of A
+       :param has_endA: True where A has an end time
+       :param startB: The start times of B
+       :param endB: The end times of B
+       :param has_endB: True where B has an end time
+       :param np: The numpy module
+       :return: An array with the index of the relation in
+                TEMPORAL_RELATIONS, -1 for after, before and no relation
+
+       >>> import numpy as np
+       >>> codes = temporal_relation_codes(np.array([0, 1, 0, 5, 2]),
+       ...                                 np.array([5, 3, 2, 7, 2]),
+       ...                                 np.array([True, True, True, True,
+       ...                                           False]),
+       ...                                 np.array([0, 0, 2, 0, 0]),
+       ...                                 np.array([5, 5, 4, 5, 5]),
+       ...                                 np.array([True] * 5), np)
+       >>> [TEMPORAL_RELATIONS[c] for c in codes]
+       ['equal', 'during', 'precedes', 'follows', 'during']
+    """
+    both = has_endA & has_endB
+    equal_start = startA == startB
+    equal_end = endA == endB
+    after = np.where(has_endB, startA > endB, startA > startB)
+    before = np.where(has_endA, endA < startB, startA < startB)
+    conditions = [
+        # equal
+        (~has_endA & ~has_endB & equal_start) | (both & equal_start &
+                                                 equal_end),
+        # during
+        has_endB & np.where(has_endA,
+                            (startA > startB) & (endA < endB),
+                            (startA >= startB) & (startA < endB)),
+        # contains
+        has_endA & np.where(has_endB,
+                            (startA < startB) & (endA > endB),
+                            (startA <= startB) & (endA > startB)),
+        # overlaps
+        both & (startA < startB) & (endA < endB) & (endA > startB),
+        # overlapped
+        both & (startA > startB) & (endA > endB) & (startA < endB),
+        # after and before
+        after | before,
+        # starts
+        both & equal_start & (endA < endB),
+        # finishes
+        both & equal_end & (startA > startB),
+        # started
+        both & equal_start & (endA > endB),
+        # finished
+        both & equal_end & (startA < startB),
+        # follows
+        has_endB & (startA == endB),
+        # precedes
+        has_endA & (endA == startB)]
+    choices = [0, 1, 2, 3, 4, -1, 5, 6, 7, 8, 9, 10]
+    return np.select(conditions, choices, default=-1)
+
+###############################################################################
+
 
 def set_temoral_relationship(A, B, relation):
     if relation == "equal" or relation == "equals":
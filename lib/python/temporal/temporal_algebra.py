@@ -448,6 +448,7 @@ except:
 import os
 import copy
 import grass.pygrass.modules as pymod
+from grass.exceptions import GrassError
 from space_time_datasets import *
 from factory import *
 from open_stds import *
@@ -653,7 +654,7 @@ class TemporalAlgebraLexer(object):
 
     # Build the lexer
     def build(self,**kwargs):
-        self.lexer = lex.lex(module=self, optimize=False, debug=False, **kwargs)
+        self.lexer = build_ply_lexer(self, optimize=False, debug=False, **kwargs)
 
     # Just for testing
     def test(self,data):
@@ -791,19 +792,13 @@ class TemporalAlgebraParser(object):
             return False
             
         # detect all STDS
-        if l is None:
-            l = TemporalAlgebraLexer()
-        l.build()
-        l.lexer.input(expression)
-        
+        lexer_class = TemporalAlgebraLexer if l is None else l.__class__
+
         name_list = []
         tokens = []
         
         count = 0
-        while True:
-            tok = l.lexer.token()
-            if not tok: break
-
+        for tok in tokenize_expression(lexer_class, expression):
             # Ignore map layer
             tokens.append(tok.type)
             ignore = False
@@ -846,9 +841,10 @@ class TemporalAlgebraParser(object):
 
     def parse(self, expression, stdstype = 'strds', maptype = 'rast',  mapclass = RasterDataset, 
                       basename = None, overwrite=False):
+        tokens = tokenize_expression(TemporalAlgebraLexer, expression)
         self.lexer = TemporalAlgebraLexer()
         self.lexer.build()
-        self.parser = yacc.yacc(module=self, debug=self.debug)
+        self.parser = build_ply_parser(self, self.debug)
 
         self.overwrite = overwrite
         self.count = 0
@@ -857,7 +853,7 @@ class TemporalAlgebraParser(object):
         self.mapclass = mapclass
         self.basename = basename
         self.expression = expression
-        self.parser.parse(expression)
+        self.parser.parse(expression, lexer=TokenListLexer(tokens))
 
     def generate_map_name(self):
         """Generate an unique  map name and register it in the objects map list
@@ -1078,6 +1074,26 @@ class TemporalAlgebraParser(object):
                 print m.get_bash()
                 m.run()
 
+    def wait_for_queue(self, process_queue, new_maps):
+        """Wait for the modules of a process queue, if a module fails
+            remove the new maps already computed and stop with an error
+
+            :param process_queue: The ParallelModuleQueue to wait for
+            :param new_maps: List of the maps computed by the modules
+        """
+        try:
+            process_queue.wait()
+        except GrassError as e:
+            map_names = {}
+            for map_i in new_maps:
+                if map_i.map_exists():
+                    map_names.setdefault(map_i.get_type(), []).append(map_i.get_name())
+            for key in map_names.keys():
+                self._remove_maps(map_names[key],  key)
+            if self.dbif.connected:
+                self.dbif.close()
+            self.msgr.fatal(_("Error in computation process: %s") % e)
+
     def check_stds(self, input, clear = False,  stds_type = None,  check_type=True):
         """ Check if input space time dataset exist in database and return its map list.
 
@@ -2078,7 +2094,9 @@ class TemporalAlgebraParser(object):
                         count  += 1
 
                     # Wait for running processes
-                    process_queue.wait()
+                    self.wait_for_queue(process_queue,
+                                        [map_i for map_i in register_list
+                                         if hasattr(map_i, "is_new")])
                     
                     # Open connection to temporal database.
                     # Create result space time dataset based on the map stds type        
@@ -110,6 +110,170 @@ try:
 except:
     pass
 
+import copy
+import hashlib
+import os
+import pickle
+import sys
+from collections import OrderedDict
+
+###############################################################################
+
+# Lexers already built for each lexer class, new lexers are cloned from them
+_LEXER_CACHE = {}
+# Parsers already built for each parser class, new parsers are copied
+# from them and bound to the new parser object
+_PARSER_CACHE = {}
+# Tokens of the expressions already lexed: (lexer class, expression) -> tokens
+_TOKEN_CACHE = OrderedDict()
+_TOKEN_CACHE_SIZE = 256
+# Results of the operators already parsed: (operator, optype) -> result
+_OPERATOR_CACHE = OrderedDict()
+_OPERATOR_CACHE_SIZE = 256
+# Errors raised by PLY reading a truncated or corrupt pickled table
+_PICKLE_ERRORS = (EOFError, ValueError, TypeError, KeyError, IndexError,
+                  AttributeError, pickle.UnpicklingError)
+
+
+def _parser_tables_dir():
+    """Return the directory of the persistent LALR tables of the temporal
+       algebra parsers, in the GRASS user settings directory"""
+    if sys.platform == 'win32':
+        config_dir = os.path.join(os.getenv('APPDATA', ''), 'GRASS7')
+    else:
+        config_dir = os.path.join(os.getenv('HOME', ''), '.grass7')
+    return os.path.join(config_dir, 'temporal_parsetab')
+
+
+def _grammar_hash(parser):
+    """Return the hash of the grammar of a parser object: the tokens, the
+       precedence rules and the docstrings of the production functions"""
+    grammar = [repr(getattr(parser, 'tokens', None)),
+               repr(getattr(parser, 'precedence', None)),
+               repr(getattr(yacc, '__tabversion__', None))]
+    for name in sorted(dir(parser)):
+        if name.startswith('p_') and name != 'p_error':
+            grammar.append(name + repr(getattr(parser, name).__doc__))
+    return hashlib.md5('\n'.join(grammar).encode('utf-8')).hexdigest()
+
+
+def build_ply_lexer(lexer, **kwargs):
+    """Return a PLY lexer for a lexer object.
+
+       The lexer is built only once for each lexer class, then it is
+       cloned and bound to the new lexer objects.
+
+       :param lexer: The object with the lexer rules
+       :param kwargs: The arguments of ply.lex.lex
+    """
+    key = (lexer.__class__, tuple(sorted(kwargs.items())))
+    if key not in _LEXER_CACHE:
+        _LEXER_CACHE[key] = lex.lex(module=lexer, **kwargs)
+        return _LEXER_CACHE[key]
+    return _LEXER_CACHE[key].clone(lexer)
+
+
+def build_ply_parser(parser, debug=False):
+    """Return a PLY parser for a parser object.
+
+       The LALR tables are generated only once and stored in the GRASS
+       user settings directory, with a file name that depends on the hash
+       of the grammar. In the same process the parser is built only once
+       for each parser class, then it is copied and bound to the new
+       parser objects.
+
+       :param parser: The object with the grammar rules
+       :param debug: If True write the debug file of the grammar
+    """
+    key = (parser.__class__, bool(debug))
+    if key in _PARSER_CACHE:
+        try:
+            cached = _PARSER_CACHE[key]
+            new = copy.copy(cached)
+            new.productions = [copy.copy(prod) for prod in cached.productions]
+            for prod in new.productions:
+                if prod.func:
+                    prod.callable = getattr(parser, prod.func)
+            new.errorfunc = getattr(parser, 'p_error', None)
+            return new
+        except AttributeError:
+            # not supported by this PLY version, build a new parser
+            pass
+
+    tabname = "%s_%s" % (parser.__class__.__name__, _grammar_hash(parser))
+    outputdir = _parser_tables_dir()
+    picklefile = os.path.join(outputdir, tabname + '.pickle')
+    kwargs = dict(module=parser, debug=debug, tabmodule=tabname,
+                  outputdir=outputdir, write_tables=False,
+                  debugfile=tabname + '.out')
+    new = None
+    try:
+        if not os.path.isdir(outputdir):
+            os.makedirs(outputdir)
+        if os.path.exists(picklefile):
+            try:
+                new = yacc.yacc(picklefile=picklefile, **kwargs)
+            except _PICKLE_ERRORS:
+                # the table is corrupt, remove it and generate it again
+                os.remove(picklefile)
+        if new is None:
+            # write the table into a temporary file that is renamed, so
+            # other processes never read an incomplete table
+            tmpfile = "%s.%d" % (picklefile, os.getpid())
+            new = yacc.yacc(picklefile=tmpfile, **kwargs)
+            if os.path.exists(tmpfile):
+                if sys.platform == 'win32' and os.path.exists(picklefile):
+                    os.remove(picklefile)
+                os.rename(tmpfile, picklefile)
+    except (IOError, OSError):
+        if new is None:
+            new = yacc.yacc(module=parser, debug=debug, write_tables=False)
+    _PARSER_CACHE[key] = new
+    return new
+
+
+def tokenize_expression(lexer_class, expression):
+    """Return the list of tokens of an expression, the tokens of the last
+       expressions are cached so repeated expressions are not lexed again
+
+       :param lexer_class: The lexer class used to lex the expression
+       :param expression: The expression
+    """
+    key = (lexer_class, expression)
+    if key in _TOKEN_CACHE:
+        return _TOKEN_CACHE[key]
+    lexer = lexer_class()
+    lexer.build()
+    lexer.lexer.input(expression)
+    tokens = []
+    while True:
+        tok = lexer.lexer.token()
+        if not tok:
+            break
+        tokens.append(tok)
+    _TOKEN_CACHE[key] = tokens
+    if len(_TOKEN_CACHE) > _TOKEN_CACHE_SIZE:
+        _TOKEN_CACHE.popitem(last=False)
+    return tokens
+
+
+class TokenListLexer(object):
+    """A lexer that returns the tokens of an expression already lexed, see
+       tokenize_expression"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0
+
+    def input(self, data):
+        self.index = 0
+
+    def token(self):
+        if self.index >= len(self.tokens):
+            return None
+        self.index += 1
+        return self.tokens[self.index - 1]
+
 class TemporalOperatorLexer(object):
     """Lexical analyzer for the GRASS GIS temporal operator"""
 
@@ -224,7 +388,7 @@ class TemporalOperatorLexer(object):
 
     # Build the lexer
     def build(self,**kwargs):
-        self.lexer = lex.lex(module=self, **kwargs)
+        self.lexer = build_ply_lexer(self, **kwargs)
 
     # Just for testing
     def test(self,data):
@@ -244,7 +408,7 @@ class TemporalOperatorParser(object):
     def __init__(self):
         self.lexer = TemporalOperatorLexer()
         self.lexer.build()
-        self.parser = yacc.yacc(module=self)
+        self.parser = build_ply_parser(self)
         self.relations = None
         self.temporal  = None
         self.function  = None
@@ -252,7 +416,16 @@ class TemporalOperatorParser(object):
 
     def parse(self, expression,  optype = 'relation'):
         self.optype = optype        
-        self.parser.parse(expression)
+        key = (expression, optype)
+        if key in _OPERATOR_CACHE:
+            (self.relations, self.temporal, self.function,
+             self.aggregate) = copy.deepcopy(_OPERATOR_CACHE[key])
+            return
+        self.parser.parse(expression, lexer=self.lexer.lexer)
+        _OPERATOR_CACHE[key] = copy.deepcopy((self.relations, self.temporal,
+                                              self.function, self.aggregate))
+        if len(_OPERATOR_CACHE) > _OPERATOR_CACHE_SIZE:
+            _OPERATOR_CACHE.popitem(last=False)
         # The parameter optype can be of type: select {:, during, r}, boolean{&&, contains, |}, 
         #                                                            raster{*, equal, |}, vector {|, starts, &},
         #                                                            hash{#, during, l} or relation {during}.
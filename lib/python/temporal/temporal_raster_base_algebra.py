@@ -125,6 +125,11 @@ class TemporalRasterAlgebraLexer(TemporalAlgebraLexer):
 
 ##############################################################################
 
+#: Maximum number of output maps computed by a single r.mapcalc run
+MAPCALC_MAX_OUTPUTS = 32
+
+##############################################################################
+
 class TemporalRasterBaseAlgebraParser(TemporalAlgebraParser):
     """The temporal algebra class"""
 
@@ -525,6 +530,50 @@ class TemporalRasterBaseAlgebraParser(TemporalAlgebraParser):
                                                                             cmd_type = "condition")
             return(resultlist)
 
+    def build_mapcalc_modules(self, expressions):
+        """Build the r.mapcalc modules that compute the maps of the time
+           steps.
+
+           The expressions of the time steps are already fused in a single
+           expression for each output map, so no intermediate map is
+           written. The expressions are grouped in r.mapcalc runs with
+           multiple outputs, one or more runs for each process, so the
+           input maps shared by the time steps are read only once by each
+           run.
+
+           :param expressions: A list of (output map name, expression) tuples
+           :return: A list of r.mapcalc modules ready to be run
+
+           .. code-block:: python
+
+               >>> import grass.temporal as tgis
+               >>> tgis.init()
+               >>> p = tgis.TemporalRasterAlgebraParser(debug=False, nprocs=2)
+               >>> p.overwrite = False
+               >>> mods = p.build_mapcalc_modules([("r_0", "(a + b)"),
+               ...                                 ("r_1", "(c + d)"),
+               ...                                 ("r_2", "e")])
+               >>> [m.inputs["expression"].value for m in mods]
+               ['r_0=(a + b);r_1=(c + d)', 'r_2=e']
+
+        """
+        if not expressions:
+            return []
+        nprocs = max(int(self.nprocs), 1)
+        size = (len(expressions) + nprocs - 1) // nprocs
+        size = max(1, min(size, MAPCALC_MAX_OUTPUTS))
+        modules = []
+        for start in range(0, len(expressions), size):
+            m = copy.deepcopy(self.m_mapcalc)
+            m_expression = ";".join([name + "=" + expr for name, expr in
+                                     expressions[start:start + size]])
+            m.inputs["expression"].value = str(m_expression)
+            m.flags["overwrite"].value = self.overwrite
+            if self.debug:
+                print m.get_bash()
+            modules.append(m)
+        return modules
+
     ###########################################################################
 
     def p_statement_assign(self, t):
@@ -551,23 +600,17 @@ class TemporalRasterBaseAlgebraParser(TemporalAlgebraParser):
                         self.msgr.fatal("Error maps with basename %s exist. Use --o flag to overwrite existing file" \
                                             %(map_name))
                 map_test_list = []
+                expressions = []
                 for map_i in t[3]:
                     newident = self.basename + "_" + str(count)
                     if "cmd_list" in dir(map_i):
-                        # Build r.mapcalc module and execute expression.
-                        # Change map name to given basename.
-                        # Create deepcopy of r.mapcalc module.
-
+                        # The expression of the time step, change map name
+                        # to given basename.
                         map_test = map_i.get_new_instance(newident + "@" + self.mapset)
                         map_test.set_temporal_extent(map_i.get_temporal_extent())
                         map_test.set_spatial_extent(map_i.get_spatial_extent())
                         map_test_list.append(map_test)
-
-                        m = copy.deepcopy(self.m_mapcalc)
-                        m_expression = newident + "=" + map_i.cmd_list
-                        m.inputs["expression"].value = str(m_expression)
-                        m.flags["overwrite"].value = self.overwrite
-                        process_queue.put(m)
+                        expressions.append((newident, map_i.cmd_list))
                     
                     elif map_i.map_exists():
                         # Copy map if it exists
@@ -575,19 +618,16 @@ class TemporalRasterBaseAlgebraParser(TemporalAlgebraParser):
                         map_test.set_temporal_extent(map_i.get_temporal_extent())
                         map_test.set_spatial_extent(map_i.get_spatial_extent())
                         map_test_list.append(map_test)
-                        
-                        m = copy.deepcopy(self.m_mapcalc)
-                        m_expression = newident + "=" + map_i.get_map_id()
-                        m.inputs["expression"].value = str(m_expression)
-                        m.flags["overwrite"].value = self.overwrite
-                        print m.get_bash()
-                        process_queue.put(m)
+                        expressions.append((newident, map_i.get_map_id()))
                         
                     else:
                         self.msgr.error(_("Error computing map <%s>"%(map_i.get_id()) ))
                     count  += 1
 
-                process_queue.wait()
+                # Compute the time steps with multi output r.mapcalc runs
+                for m in self.build_mapcalc_modules(expressions):
+                    process_queue.put(m)
+                self.wait_for_queue(process_queue, map_test_list)
 
                 for map_i in map_test_list:
                     register_list.append(map_i)
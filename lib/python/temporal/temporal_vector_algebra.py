@@ -122,20 +122,15 @@ class TemporalVectorAlgebraParser(TemporalAlgebraParser):
 
     def parse(self, expression, basename = None, overwrite = False):
         # Check for space time dataset type definitions from temporal algebra
-        l = TemporalVectorAlgebraLexer()
-        l.build()
-        l.lexer.input(expression)
-
-        while True:
-            tok = l.lexer.token()
-            if not tok: break
-            
+        tokens = tokenize_expression(TemporalVectorAlgebraLexer, expression)
+
+        for tok in tokens:
             if tok.type == "STVDS" or tok.type == "STRDS" or tok.type == "STR3DS":
                 raise SyntaxError("Syntax error near '%s'" %(tok.type))
 
         self.lexer = TemporalVectorAlgebraLexer()
         self.lexer.build()
-        self.parser = yacc.yacc(module=self, debug=self.debug)
+        self.parser = build_ply_parser(self, self.debug)
 
         self.overwrite = overwrite
         self.count = 0
@@ -144,7 +139,7 @@ class TemporalVectorAlgebraParser(TemporalAlgebraParser):
         self.mapclass = VectorDataset
         self.basename = basename
         self.expression = expression
-        self.parser.parse(expression)
+        self.parser.parse(expression, lexer=TokenListLexer(tokens))
 
     ######################### Temporal functions ##############################
 
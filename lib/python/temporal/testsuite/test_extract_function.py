@@ -0,0 +1,76 @@
+"""Unit test to extract vector maps from a space time vector dataset
+   using tgis.extract_dataset()
+
+(C) 2015 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+"""
+
+import grass.temporal as tgis
+import grass.gunittest
+import os
+
+
+class TestExtractFunctions(grass.gunittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        # Use always the current mapset as temporal database
+        cls.runModule("g.gisenv", set="TGIS_USE_CURRENT_MAPSET=1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule('g.region', n=80.0, s=0.0, e=120.0, w=0.0,
+                      t=1.0, b=0.0, res=10.0)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+
+    def setUp(self):
+        """Create the test maps and the space time vector dataset
+        """
+        for i in range(1, 4):
+            self.runModule("v.random", overwrite=True, quiet=True,
+                           output="extract_map_%d" % i, npoints=20,
+                           seed=i, column="height", zmin=0, zmax=100)
+        self.runModule("t.create", type="stvds", temporaltype="absolute",
+                       output="extract_test_in", title="Test stvds",
+                       description="Test stvds", overwrite=True)
+        self.runModule("t.register", type="vector", input="extract_test_in",
+                       maps="extract_map_1,extract_map_2,extract_map_3",
+                       start="2001-01-01", increment="1 month",
+                       overwrite=True)
+
+    def tearDown(self):
+        """Remove the datasets and the maps
+        """
+        self.runModule("t.remove", flags="rf", type="stvds",
+                       inputs="extract_test_in,extract_test_out", quiet=True)
+
+    def test_vector_extraction(self):
+        """Test the extraction of features from the maps of a space time
+           vector dataset with the default feature types
+        """
+        tgis.extract_dataset(input="extract_test_in",
+                             output="extract_test_out", type="vector",
+                             where="start_time > '2001-01-15'",
+                             expression="height > 50", base="extract_out",
+                             nprocs=2)
+
+        stvds = tgis.open_old_stds("extract_test_out", type="stvds")
+        maps = stvds.get_registered_maps_as_objects()
+        self.assertEqual(len(maps), 2)
+        for map in maps:
+            map.load()
+            self.assertTrue(map.get_name().startswith("extract_out_"))
+            self.assertLessEqual(map.metadata.get_number_of_points(), 20)
+
+
+if __name__ == '__main__':
+    grass.gunittest.test()
@@ -113,6 +113,26 @@ class TestRegisterFunctions(grass.gunittest.TestCase):
         self.assertEqual(start, datetime.datetime(2001, 1, 1))
         self.assertEqual(end, datetime.datetime(2001, 1, 3))
 
+    def test_absolute_time_strds_timestamp(self):
+        """Test that the registration of new maps with absolute time
+           writes the timestamps into the map metadata
+        """
+        tgis.register_maps_in_space_time_dataset(type="raster", name=self.strds_abs.get_name(),
+                 maps="register_map_1,register_map_2",
+                 start="2001-01-01", increment="1 day", interval=True)
+
+        map = tgis.RasterDataset("register_map_1@" + tgis.get_current_mapset())
+        self.assertTrue(map.read_timestamp_from_grass())
+        start, end = map.get_absolute_time()
+        self.assertEqual(start, datetime.datetime(2001, 1, 1))
+        self.assertEqual(end, datetime.datetime(2001, 1, 2))
+
+        map = tgis.RasterDataset("register_map_2@" + tgis.get_current_mapset())
+        self.assertTrue(map.read_timestamp_from_grass())
+        start, end = map.get_absolute_time()
+        self.assertEqual(start, datetime.datetime(2001, 1, 2))
+        self.assertEqual(end, datetime.datetime(2001, 1, 3))
+
     def test_absolute_time_1(self):
         """Test the registration of maps with absolute time
         """
@@ -0,0 +1,101 @@
+"""Unit test of the caches of the temporal operator parser
+
+(C) 2015 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+"""
+
+import os
+import glob
+import shutil
+import tempfile
+
+import grass.gunittest
+import grass.temporal.temporal_operator as temporal_operator
+from grass.temporal.temporal_operator import TemporalOperatorParser
+
+
+class TestTemporalOperatorCache(grass.gunittest.TestCase):
+
+    def setUp(self):
+        """Store the parser tables in a temporary directory"""
+        self.tables_dir = tempfile.mkdtemp()
+        self.parser_tables_dir = temporal_operator._parser_tables_dir
+        temporal_operator._parser_tables_dir = lambda: self.tables_dir
+        temporal_operator._PARSER_CACHE.clear()
+        temporal_operator._OPERATOR_CACHE.clear()
+
+    def tearDown(self):
+        temporal_operator._parser_tables_dir = self.parser_tables_dir
+        temporal_operator._PARSER_CACHE.clear()
+        temporal_operator._OPERATOR_CACHE.clear()
+        shutil.rmtree(self.tables_dir)
+
+    def parse(self, expression, optype):
+        p = TemporalOperatorParser()
+        p.parse(expression, optype=optype)
+        return p
+
+    def pickle_files(self):
+        return glob.glob(os.path.join(self.tables_dir, '*'))
+
+    def test_operator_cache_hit(self):
+        """The operators already parsed are read from the cache"""
+        p = self.parse("{~, equal,left}", 'overlay')
+        self.assertEqual((p.relations, p.temporal, p.function),
+                         (['equal'], 'l', '~'))
+        self.assertIn(("{~, equal,left}", 'overlay'),
+                      temporal_operator._OPERATOR_CACHE)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("The operator is parsed again")
+        p = TemporalOperatorParser()
+        p.parser.parse = fail
+        p.parse("{~, equal,left}", optype='overlay')
+        self.assertEqual((p.relations, p.temporal, p.function),
+                         (['equal'], 'l', '~'))
+        # the cached result is not shared with the parser
+        p.relations.append('during')
+        p = self.parse("{~, equal,left}", 'overlay')
+        self.assertEqual(p.relations, ['equal'])
+
+    def test_operator_cache_size(self):
+        """The operator cache is bounded, the oldest entries are dropped"""
+        size = temporal_operator._OPERATOR_CACHE_SIZE
+        temporal_operator._OPERATOR_CACHE_SIZE = 2
+        try:
+            for expression, optype in (("{&&, during}", 'boolean'),
+                                       ("{:, during, r}", 'select'),
+                                       ("{#, during, r}", 'hash')):
+                self.parse(expression, optype)
+        finally:
+            temporal_operator._OPERATOR_CACHE_SIZE = size
+        self.assertEqual(list(temporal_operator._OPERATOR_CACHE.keys()),
+                         [("{:, during, r}", 'select'),
+                          ("{#, during, r}", 'hash')])
+
+    def test_corrupt_pickle(self):
+        """A truncated or corrupt table is generated again"""
+        self.parse("{~, equal,left}", 'overlay')
+        files = self.pickle_files()
+        self.assertEqual(len(files), 1)
+        picklefile = files[0]
+        size = os.path.getsize(picklefile)
+
+        for content in (open(picklefile, 'rb').read()[:size // 2],
+                        b'garbage'):
+            with open(picklefile, 'wb') as f:
+                f.write(content)
+            temporal_operator._PARSER_CACHE.clear()
+            temporal_operator._OPERATOR_CACHE.clear()
+            p = self.parse("{^, over,right}", 'overlay')
+            self.assertEqual((p.relations, p.temporal, p.function),
+                             (['overlaps', 'overlapped'], 'r', '^'))
+            # the table is written again, without temporary files
+            self.assertEqual(self.pickle_files(), [picklefile])
+            self.assertEqual(os.path.getsize(picklefile), size)
+
+
+if __name__ == '__main__':
+    grass.gunittest.test()
@@ -9,7 +9,8 @@ for details.
 :authors: Soeren Gebbert
 """
 import copy
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 import grass.script.core as core
 from temporal_granularity import *
 from datetime_math import *
@@ -1474,6 +1475,80 @@ def test_temporal_topology_builder():
 ###############################################################################
 
 
+def test_temporal_topology_builder_benchmark(num_maps=100000):
+    """Benchmark the temporal topology builder with a daily time series"""
+
+    map_list = []
+    start = datetime(1800, 01, 01)
+    for i in xrange(num_maps):
+        _map = RasterDataset(ident="%i@bench" % i)
+        _map.set_absolute_time(start + timedelta(days=i),
+                               start + timedelta(days=i + 1))
+        map_list.append(_map)
+
+    tb = SpatioTemporalTopologyBuilder()
+    t = time.time()
+    tb.build(map_list)
+    print "Temporal topology of %i maps: %.3f seconds" % (num_maps,
+                                                          time.time() - t)
+
+    for i in xrange(1, num_maps - 1):
+        if map_list[i].get_follows()[0] != map_list[i - 1] or \
+           map_list[i].get_precedes()[0] != map_list[i + 1]:
+            core.fatal("Error building temporal topology")
+
+    # Compare with the R*-Tree search on a part of the time series
+    maps = map_list[:10000]
+    for _map in maps:
+        _map.reset_topology()
+    t = time.time()
+    tb._build_rtree_relations(maps, maps)
+    print "R*-Tree temporal topology of %i maps: %.3f seconds" % (
+        len(maps), time.time() - t)
+
+###############################################################################
+
+
+def test_temporal_topology_builder_mixed_units():
+    """Build the temporal topology of maps with different relative time
+       units, which must not be related"""
+
+    map_list = []
+    for i in xrange(5):
+        _map = RasterDataset(ident="%i@days" % i)
+        _map.set_relative_time(i, i + 1, "days")
+        map_list.append(_map)
+    for i in xrange(2):
+        _map = RasterDataset(ident="%i@months" % i)
+        _map.set_relative_time(i, i + 1, "months")
+        map_list.append(_map)
+
+    tb = SpatioTemporalTopologyBuilder()
+    tb.build(map_list)
+
+    # The maps with the same unit follow each other, the maps with
+    # different units are not related
+    expected = {}
+    for i in xrange(5):
+        rel = {}
+        if i > 0:
+            rel["FOLLOWS"] = ["%i@days" % (i - 1)]
+        if i < 4:
+            rel["PRECEDES"] = ["%i@days" % (i + 1)]
+        expected["%i@days" % i] = rel
+    expected["0@months"] = {"PRECEDES": ["1@months"]}
+    expected["1@months"] = {"FOLLOWS": ["0@months"]}
+
+    for _map in map_list:
+        rel = dict((key, sorted(m.get_id() for m in value)) for key, value
+                   in _map.get_temporal_relations().iteritems() if value)
+        if rel != expected[_map.get_id()]:
+            core.fatal("Error building temporal topology of <%s>: %s != %s" %
+                       (_map.get_id(), rel, expected[_map.get_id()]))
+
+###############################################################################
+
+
 def test_map_list_sorting():
 
     map_list = []
@@ -1661,6 +1736,8 @@ if __name__ == "__main__":
     test_spatial_extent_intersection()
     test_spatial_relations()
     test_temporal_topology_builder()
+    test_temporal_topology_builder_mixed_units()
+    test_temporal_topology_builder_benchmark()
     test_map_list_sorting()
     test_1d_rtree()
     test_2d_rtree()
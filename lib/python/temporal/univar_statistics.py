@@ -20,20 +20,279 @@ for details.
 
 from open_stds import *
 import grass.script as gscript
+from grass.exceptions import GrassError, OpenError
+
+###############################################################################
+
+#: Null value of CELL raster maps
+CELL_NULL = -2147483648
+#: Number of rows read with a single block by the statistics engine
+UNIVAR_BLOCK_ROWS = 256
+#: Number of values stored by the approximated quantile sketch
+UNIVAR_SKETCH_CAPACITY = 2 ** 22
+
+
+class QuantileSketch(object):
+    """Streaming quantile sketch with optionally bounded memory.
+
+       The values are stored exactly until their number exceeds the
+       capacity, then the values of a level are sorted and compacted,
+       keeping every second value with a doubled weight in the next level.
+       Without capacity all the values are stored and the quantiles are
+       exact. The values kept by the compaction are selected with a random
+       generator initialized with a fixed seed, the results are
+       reproducible. The quantiles are computed with the same positions
+       used by r.univar.
+
+       .. code-block:: python
+
+           >>> import numpy as np
+           >>> sketch = QuantileSketch()
+           >>> sketch.update(np.arange(10, 0, -1))
+           >>> sketch.quantile(0.25), sketch.median(), sketch.quantile(0.9)
+           (3.0, 5.5, 9.0)
+           >>> sketch = QuantileSketch(capacity=1000)
+           >>> sketch.update(np.arange(100000))
+           >>> abs(sketch.median() - 50000) < 1000
+           True
+
+    """
+    def __init__(self, capacity=None, seed=0):
+        self.capacity = capacity
+        self.seed = seed
+        self.random = None
+        self.levels = [[]]
+        self.sizes = [0]
+        self.n = 0
+
+    def update(self, values):
+        """Add an array of values to the sketch"""
+        import numpy as np
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.n += len(values)
+        self.levels[0].append(values)
+        self.sizes[0] += len(values)
+        if self.capacity is None:
+            return
+        level = 0
+        while self.sizes[level] > self.capacity:
+            self._compact(level)
+            level += 1
+
+    def _compact(self, level):
+        import numpy as np
+        if self.random is None:
+            self.random = np.random.RandomState(self.seed)
+        data = np.sort(np.concatenate(self.levels[level]))
+        # with an odd number of values the last one stays in the level
+        rest = data[len(data) - len(data) % 2:]
+        kept = data[self.random.randint(2):len(data) - len(rest):2]
+        self.levels[level] = [rest]
+        self.sizes[level] = len(rest)
+        if len(self.levels) == level + 1:
+            self.levels.append([])
+            self.sizes.append(0)
+        self.levels[level + 1].append(kept)
+        self.sizes[level + 1] += len(kept)
+
+    def _value_at(self, positions):
+        import numpy as np
+        values = np.concatenate([np.concatenate(arrs) if arrs else []
+                                 for arrs in self.levels])
+        weights = np.concatenate([np.repeat(2. ** level, size)
+                                  for level, size in enumerate(self.sizes)])
+        order = np.argsort(values, kind="mergesort")
+        cumw = np.cumsum(weights[order])
+        idx = np.searchsorted(cumw, positions, side="right")
+        return values[order][np.minimum(idx, len(values) - 1)]
+
+    def quantile(self, quant):
+        """Return a quantile, using the position int(n * quant - 0.5)"""
+        return float(self._value_at([max(int(self.n * quant - 0.5), 0)])[0])
+
+    def median(self):
+        """Return the median, the mean of the central values if the number
+           of values is even"""
+        if self.n % 2:
+            return float(self._value_at([self.n // 2])[0])
+        return float(self._value_at([self.n // 2 - 1, self.n // 2]).mean())
+
+###############################################################################
+
+
+class UnivarAccumulator(object):
+    """Accumulate the univariate statistics of the blocks of a raster map
+
+       The quantiles of the extended statistics are exact, unless
+       approximate is True: then they are computed with a bounded amount
+       of memory.
+    """
+    def __init__(self, extended=False, approximate=False):
+        self.n = 0
+        self.size = 0
+        self.sum = 0.
+        self.sum_abs = 0.
+        self.sumsq = 0.
+        self.min = None
+        self.max = None
+        self.sketch = None
+        if extended:
+            self.sketch = QuantileSketch(UNIVAR_SKETCH_CAPACITY
+                                         if approximate else None)
+
+    def update(self, values, size):
+        """Add the non-null values of a block with size cells"""
+        self.size += size
+        if not len(values):
+            return
+        self.n += len(values)
+        self.sum += float(values.sum())
+        self.sum_abs += float(abs(values).sum())
+        self.sumsq += float((values * values).sum())
+        vmin, vmax = float(values.min()), float(values.max())
+        self.min = vmin if self.min is None else min(self.min, vmin)
+        self.max = vmax if self.max is None else max(self.max, vmax)
+        if self.sketch is not None:
+            self.sketch.update(values)
+
+    def get_stats(self):
+        """Return a dictionary with the statistics formatted as r.univar -g
+           or None if there are no values"""
+        if self.n == 0:
+            return None
+        mean = self.sum / self.n
+        variance = (self.sumsq - self.sum * self.sum / self.n) / self.n
+        if variance < 1.0e-15:
+            variance = 0.0
+        stddev = variance ** 0.5
+        coeff_var = (stddev / mean) * 100. if mean else float("nan")
+        stats = {"n": "%d" % self.n,
+                 "null_cells": "%d" % (self.size - self.n),
+                 "cells": "%d" % self.size,
+                 "min": "%.15g" % self.min,
+                 "max": "%.15g" % self.max,
+                 "range": "%.15g" % (self.max - self.min),
+                 "mean": "%.15g" % mean,
+                 "mean_of_abs": "%.15g" % (self.sum_abs / self.n),
+                 "stddev": "%.15g" % stddev,
+                 "variance": "%.15g" % variance,
+                 "coeff_var": "%.15g" % coeff_var,
+                 "sum": "%.15g" % self.sum}
+        if self.sketch is not None:
+            stats["first_quartile"] = "%g" % self.sketch.quantile(0.25)
+            stats["median"] = "%g" % self.sketch.median()
+            stats["third_quartile"] = "%g" % self.sketch.quantile(0.75)
+            stats["percentile_90"] = "%g" % self.sketch.quantile(0.9)
+        return stats
+
+###############################################################################
+
+
+def compute_raster_univar(id, extended=False, zones=None,
+                          approximate=False):
+    """Compute the univariate statistics of a raster map in the current
+       region reading blocks of rows with pygrass, the same statistics of
+       r.univar -g are computed
+
+       :param id: The id of the raster map
+       :param extended: If True compute extended statistics
+       :param zones: The id of a CELL raster map used to compute the
+                     statistics of each zone
+       :param approximate: If True approximate the quantiles of the
+                           extended statistics with a bounded amount of
+                           memory
+       :return: A list of (zone, stats) tuples, zone is None if no zone
+                map is used and stats is a dictionary with the statistics
+    """
+    import numpy as np
+    from grass.pygrass.raster import RasterRow
+
+    name, mapset = id.split("@") if "@" in id else (id, "")
+    rast = RasterRow(name, mapset)
+    rast.open("r")
+    zrast = None
+    if zones:
+        zname, zmapset = zones.split("@") if "@" in zones else (zones, "")
+        zrast = RasterRow(zname, zmapset)
+        zrast.open("r")
+    accumulators = {}
+    try:
+        nrows = len(rast)
+        for row in range(0, nrows, UNIVAR_BLOCK_ROWS):
+            block = rast.read_block(row, 0, min(UNIVAR_BLOCK_ROWS,
+                                                nrows - row))
+            if rast.mtype == "CELL":
+                valid = block != CELL_NULL
+            else:
+                valid = ~np.isnan(block)
+            values = np.asarray(block, dtype=np.float64)
+            if zrast is None:
+                if None not in accumulators:
+                    accumulators[None] = UnivarAccumulator(extended,
+                                                           approximate)
+                accumulators[None].update(values[valid], block.size)
+                continue
+            zblock = np.asarray(zrast.read_block(row, 0, block.shape[0]))
+            zvalid = zblock != CELL_NULL
+            for zone in np.unique(zblock[zvalid]):
+                zone = int(zone)
+                if zone not in accumulators:
+                    accumulators[zone] = UnivarAccumulator(extended,
+                                                           approximate)
+                zmask = zblock == zone
+                accumulators[zone].update(values[zmask & valid],
+                                          int(zmask.sum()))
+    finally:
+        rast.close()
+        if zrast is not None:
+            zrast.close()
+    result = []
+    for zone in sorted(accumulators):
+        stats = accumulators[zone].get_stats()
+        if stats is not None:
+            result.append((zone, stats))
+    return result
+
+
+def _compute_raster_univar_worker(args):
+    """Compute the statistics of a raster map in a worker process
+
+       :return: A tuple with the statistics and the error message, None if
+                the statistics were computed
+    """
+    id, extended, zones, approximate = args
+    try:
+        return compute_raster_univar(id, extended, zones, approximate), None
+    except (OpenError, GrassError) as e:
+        # the maps which can not be opened are reported and skipped
+        return None, str(e)
 
 ###############################################################################
 
 
 def print_gridded_dataset_univar_statistics(type, input, where, extended,
-                                            no_header=False, fs="|"):
+                                            no_header=False, fs="|",
+                                            nprocs=1, zones=None,
+                                            approximate=False):
     """Print univariate statistics for a space time raster or raster3d dataset
 
+       The statistics of the raster maps are computed in process with
+       pygrass, using nprocs worker processes, the raster3d maps are
+       processed with r3.univar.
+
        :param type: Must be "strds" or "str3ds"
        :param input: The name of the space time dataset
        :param where: A temporal database where statement
        :param extended: If True compute extended statistics
        :param no_header: Supress the printing of column names
        :param fs: Field separator
+       :param nprocs: The number of processes used to compute the
+                      statistics of the raster maps
+       :param zones: The name of a CELL raster map used to compute the
+                     statistics of each zone, only for "strds"
+       :param approximate: If True approximate the quantiles of the
+                           extended statistics of the raster maps with a
+                           bounded amount of memory
     """
 
     # We need a database interface
@@ -51,9 +310,17 @@ def print_gridded_dataset_univar_statistics(type, input, where, extended,
                       'sp': sp.get_new_map_instance(None).get_type(),
                       'i': sp.get_id()})
 
+    if zones and type != "strds":
+        dbif.close()
+        gscript.fatal(_("Zones are supported only by space time raster "
+                        "datasets"))
+
     if no_header is False:
         string = ""
-        string += "id" + fs + "start" + fs + "end" + fs + "mean" + fs
+        string += "id" + fs + "start" + fs + "end" + fs
+        if zones:
+            string += "zone" + fs
+        string += "mean" + fs
         string += "min" + fs + "max" + fs
         string += "mean_of_abs" + fs + "stddev" + fs + "variance" + fs
         string += "coeff_var" + fs + "sum" + fs + "null_cells" + fs + "cells"
@@ -63,41 +330,68 @@ def print_gridded_dataset_univar_statistics(type, input, where, extended,
 
         print string
 
+    pool = None
+    if type == "strds":
+        args = [(row["id"], extended, zones, approximate) for row in rows]
+        if nprocs > 1:
+            import multiprocessing
+            pool = multiprocessing.Pool(min(nprocs, len(args)))
+            results = pool.imap(_compute_raster_univar_worker, args)
+        else:
+            results = (_compute_raster_univar_worker(arg) for arg in args)
+    else:
+        flag = "g"
+        if extended is True:
+            flag += "e"
+        results = (([(None, gscript.parse_command("r3.univar",
+                                                   map=row["id"],
+                                                   flags=flag))], None)
+                   for row in rows)
+
+    results = iter(results)
     for row in rows:
-        string = ""
         id = row["id"]
         start = row["start_time"]
         end = row["end_time"]
 
-        flag = "g"
-
-        if extended is True:
-            flag += "e"
+        try:
+            zone_stats, error = next(results)
+        except Exception as e:
+            if pool is not None:
+                pool.terminate()
+            dbif.close()
+            gscript.fatal(_("Unable to compute the statistics of raster map "
+                            "<%(id)s>: %(error)s") % {'id': id, 'error': e})
 
-        if type == "strds":
-            stats = gscript.parse_command("r.univar", map=id, flags=flag)
-        elif type == "str3ds":
-            stats = gscript.parse_command("r3.univar", map=id, flags=flag)
-
-        if not stats:
+        if not zone_stats or not zone_stats[0][1]:
             if type == "strds":
                 gscript.warning(_("Unable to get statistics for raster map "
                                   "<%s>") % id)
+                if error:
+                    gscript.verbose(error)
             elif type == "str3ds":
                 gscript.warning(_("Unable to get statistics for 3d raster map"
                                   " <%s>") % id)
             continue
 
-        string += str(id) + fs + str(start) + fs + str(end)
-        string += fs + str(stats["mean"]) + fs + str(stats["min"])
-        string += fs + str(stats["max"]) + fs + str(stats["mean_of_abs"])
-        string += fs + str(stats["stddev"]) + fs + str(stats["variance"])
-        string += fs + str(stats["coeff_var"]) + fs + str(stats["sum"])
-        string += fs + str(stats["null_cells"]) + fs + str(stats["cells"])
-        if extended is True:
-            string += fs + str(stats["first_quartile"]) + fs + str(stats["median"])
-            string += fs + str(stats["third_quartile"]) + fs + str(stats["percentile_90"])
-        print string
+        for zone, stats in zone_stats:
+            string = ""
+            string += str(id) + fs + str(start) + fs + str(end)
+            if zones:
+                string += fs + str(zone)
+            string += fs + str(stats["mean"]) + fs + str(stats["min"])
+            string += fs + str(stats["max"]) + fs + str(stats["mean_of_abs"])
+            string += fs + str(stats["stddev"]) + fs + str(stats["variance"])
+            string += fs + str(stats["coeff_var"]) + fs + str(stats["sum"])
+            string += fs + str(stats["null_cells"]) + fs + str(stats["cells"])
+            if extended is True:
+                string += fs + str(stats["first_quartile"]) + fs + str(stats["median"])
+                string += fs + str(stats["third_quartile"]) + fs + str(stats["percentile_90"])
+            print string
+
+    if pool is not None:
+        pool.close()
+        pool.join()
 
     dbif.close()
 
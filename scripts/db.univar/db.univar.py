@@ -27,8 +27,9 @@
 #% required: yes
 #%end
 #%option G_OPT_DB_COLUMN
-#% description: Name of attribute column on which to calculate statistics (must be numeric)
+#% description: Name of attribute column(s) on which to calculate statistics (must be numeric)
 #% required: yes
+#% multiple: yes
 #%end
 #%option G_OPT_DB_DATABASE
 #%end
@@ -60,179 +61,351 @@ import os
 import atexit
 import math
 
-import grass.script as grass 
+try:
+    import numpy as np
+    hasNumPy = True
+except ImportError:
+    hasNumPy = False
 
-def cleanup():
-    for ext in ['', '.sort']:
-        grass.try_remove(tmp + ext)
+import grass.script as grass
+from grass.exceptions import CalledModuleError
 
-def sortfile(infile, outfile):
-    inf = file(infile, 'r')
-    outf = file(outfile, 'w')
+#: number of bytes of the db.select output parsed at once
+CHUNK_SIZE = 2 ** 24
 
-    if grass.find_program('sort', '--help'):
-        grass.run_command('sort', flags = 'n', stdin = inf, stdout = outf)
-    else:
-        # FIXME: we need a large-file sorting function
-        grass.warning(_("'sort' not found: sorting in memory"))
-        lines = inf.readlines()
-        for i in range(len(lines)):
-            lines[i] = float(lines[i].rstrip('\r\n'))
-        lines.sort()
-        for line in lines:
-            outf.write(str(line) + '\n')
-
-    inf.close()
-    outf.close()
+#: number of values of a column kept in memory for the extended statistics,
+#: the values are moved to a temporary file when there are more
+MAX_VALUES = 2 ** 25
 
-def main():
-    global tmp
-    tmp = grass.tempfile()
+#: number of bins used to select the percentiles of the values in a file
+NBINS = 2 ** 16
 
-    extend = flags['e']
-    shellstyle = flags['g']
-    table = options['table']
-    column = options['column']
-    database = options['database']
-    driver = options['driver']
-    where = options['where']
-    perc = options['percentile']
+#: drivers that compute the basic statistics with SQL aggregate functions
+AGGREGATE_DRIVERS = ('sqlite', 'pg')
 
-    perc = [float(p) for p in perc.split(',')]
+tmpfiles = []
 
-    desc_table = grass.db_describe(table, database=database, driver=driver)
-    if not desc_table:
-        grass.fatal(_("Unable to describe table <%s>") % table)
-    found = False
-    for cname, ctype, cwidth in desc_table['cols']:
-        if cname == column:
-            found = True
-            if ctype not in ('INTEGER', 'DOUBLE PRECISION'):
-                grass.fatal(_("Column <%s> is not numeric") % cname)
-    if not found:
-        grass.fatal(_("Column <%s> not found in table <%s>") % (column, table))
 
-    if not shellstyle:
-        grass.verbose(_("Calculation for column <%s> of table <%s>...") % (column, table))
-        grass.message(_("Reading column values..."))
-
-    sql = "SELECT %s FROM %s" % (column, table)
+def cleanup():
+    for tmp in tmpfiles:
+        grass.try_remove(tmp)
+
+
+class ColumnStats(object):
+    """Univariate statistics of a column, updated one chunk of values at
+    a time.
+
+    The squares are summed as differences from the first value, to not
+    lose precision when the variance is small compared to the mean. With
+    `extend` the values are kept, in a temporary file when there are more
+    than MAX_VALUES, to select the percentiles.
+    """
+
+    def __init__(self, extend=False):
+        self.n = 0
+        self.sum = 0.
+        self.sum_abs = 0.
+        self.shift = None
+        self.sum_dev = 0.
+        self.sum_dev2 = 0.
+        self.min = np.inf
+        self.max = -np.inf
+        self.extend = extend
+        self.chunks = []
+        self.tmp = None
+
+    def update(self, values):
+        """Add a chunk of values, NaN values are NULL and ignored"""
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        if self.shift is None:
+            self.shift = values[0]
+        dev = values - self.shift
+        self.n += len(values)
+        self.sum += values.sum()
+        self.sum_abs += np.abs(values).sum()
+        self.sum_dev += dev.sum()
+        self.sum_dev2 += np.dot(dev, dev)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        if not self.extend:
+            return
+        if self.tmp:
+            with open(self.tmp, 'ab') as fd:
+                values.tofile(fd)
+            return
+        self.chunks.append(values)
+        if self.n > MAX_VALUES:
+            self.tmp = grass.tempfile()
+            tmpfiles.append(self.tmp)
+            with open(self.tmp, 'wb') as fd:
+                for chunk in self.chunks:
+                    chunk.tofile(fd)
+            self.chunks = []
+
+    @property
+    def mean(self):
+        return self.sum / self.n
+
+    @property
+    def variance(self):
+        return max((self.sum_dev2 - self.sum_dev * self.sum_dev / self.n) /
+                   self.n, 0.)
+
+    @property
+    def coeff_var(self):
+        if not self.sum:
+            return float('nan')
+        return math.sqrt(self.variance) / (abs(self.sum) / self.n)
+
+    def ranks(self, positions):
+        """Return the values at the given positions (starting from 1) of
+        the sorted values"""
+        kth = sorted(set(int(pos) - 1 for pos in positions))
+        if self.tmp:
+            values = select_ranks(self.read_tmp, kth, self.min, self.max)
+        else:
+            values = np.concatenate(self.chunks)
+            self.chunks = [values]
+            values = dict(zip(kth, np.partition(values, kth)[kth]))
+        return [values[int(pos) - 1] for pos in positions]
+
+    def read_tmp(self):
+        """Iterate over the values written to the temporary file"""
+        with open(self.tmp, 'rb') as fd:
+            while True:
+                values = np.fromfile(fd, dtype=np.float64,
+                                     count=CHUNK_SIZE // 8)
+                if not len(values):
+                    break
+                yield values
+
+
+def bin_index(values, low, high):
+    """Return the bins of NBINS bins between low and high of the values"""
+    if high <= low:
+        return np.zeros(len(values), dtype=np.intp)
+    index = ((values - low) * (NBINS / (high - low))).astype(np.intp)
+    return np.clip(index, 0, NBINS - 1)
+
+
+def select_ranks(read, kth, low, high, levels=4):
+    """Select the values at the kth positions of the sorted values, without
+    keeping all the values in memory.
+
+    The bin containing each position is found with an histogram of the
+    values, then only the values in that bin are read and partitioned; a
+    bin with too many values is split again.
+
+    :param read: function returning an iterator over the chunks of values
+    :param list kth: positions (starting from 0) of the values to select
+    :param float low: minimum of the values
+    :param float high: maximum of the values
+    :param int levels: maximum number of times a bin is split
+
+    :return: dictionary with the selected value of each position
+    """
+    def subset(values, path):
+        for blow, bhigh, index in path:
+            values = values[bin_index(values, blow, bhigh) == index]
+        return values
+
+    # a task is a position, the chain of bins containing it, the range of
+    # the last bin and the position in the last bin
+    tasks = [(pos, (), low, high, pos) for pos in kth]
+    result = {}
+    while tasks:
+        hists = [np.zeros(NBINS, dtype=np.int64) for task in tasks]
+        for values in read():
+            for hist, (pos, path, blow, bhigh, k) in zip(hists, tasks):
+                hist += np.bincount(bin_index(subset(values, path), blow,
+                                              bhigh), minlength=NBINS)
+        collect, split = [], []
+        for hist, (pos, path, blow, bhigh, k) in zip(hists, tasks):
+            cum = np.cumsum(hist)
+            index = int(np.searchsorted(cum, k, side='right'))
+            k -= cum[index] - hist[index]
+            path += ((blow, bhigh, index), )
+            if hist[index] <= MAX_VALUES or len(path) >= levels:
+                collect.append((pos, path, k))
+            else:
+                width = (bhigh - blow) / NBINS
+                split.append((pos, path, blow + index * width,
+                              blow + (index + 1) * width, k))
+        if collect:
+            chunks = [[] for task in collect]
+            for values in read():
+                for chunk, (pos, path, k) in zip(chunks, collect):
+                    chunk.append(subset(values, path))
+            for chunk, (pos, path, k) in zip(chunks, collect):
+                result[pos] = np.partition(np.concatenate(chunk), k)[k]
+        tasks = split
+    return result
+
+
+def read_values(stream, ncols):
+    """Iterate over the rows printed by db.select, as arrays with a column
+    for each selected column, NULL values are NaN"""
+    rest = ''
+    while True:
+        data = stream.read(CHUNK_SIZE)
+        if not data:
+            break
+        data = rest + data
+        end = data.rfind('\n') + 1
+        rest = data[end:]
+        if end:
+            yield parse_values(data[:end], ncols)
+    if rest:
+        yield parse_values(rest + '\n', ncols)
+
+
+def parse_values(text, ncols):
+    """Convert lines of values separated by | to an array"""
+    fields = np.array(text.replace('\r', '').replace('\n', '|').split('|')[:-1])
+    nulls = fields == ''
+    values = np.empty(len(fields))
+    values[nulls] = np.nan
+    values[~nulls] = fields[~nulls].astype(np.float64)
+    return values.reshape(-1, ncols)
+
+
+def aggregate_stats(columns, table, where, database, driver):
+    """Compute the basic statistics with the SQL aggregate functions of
+    the database, without reading the values.
+
+    :return: the statistics of each column and the number of rows, None if
+             the database does not support the query
+    """
+    def select(exprs):
+        sql = "SELECT %s FROM %s" % (', '.join(exprs), table)
+        if where:
+            sql += " WHERE " + where
+        try:
+            output = grass.read_command('db.select', flags='c', sql=sql,
+                                        database=database, driver=driver,
+                                        stderr=nuldev)
+        except CalledModuleError:
+            return None
+        fields = output.rstrip('\r\n').split('|')
+        if len(fields) != len(exprs):
+            return None
+        return [float(field) if field else 0. for field in fields]
+
+    exprs = ['COUNT(*)']
+    for column in columns:
+        value = "CAST(%s AS DOUBLE PRECISION)" % column
+        exprs += ["COUNT(%s)" % column, "MIN(%s)" % value,
+                  "MAX(%s)" % value, "SUM(%s)" % value,
+                  "SUM(ABS(%s))" % value]
+    result = select(exprs)
+    if result is None:
+        return None
+    nrows = int(result[0])
+    stats = []
+    exprs = []
+    for i, column in enumerate(columns):
+        stat = ColumnStats()
+        n, stat.min, stat.max, stat.sum, stat.sum_abs = result[5 * i + 1:
+                                                              5 * i + 6]
+        stat.n = int(n)
+        if stat.n:
+            # the squares are summed as differences from the mean too
+            stat.shift = stat.sum / stat.n
+            dev = "(CAST(%s AS DOUBLE PRECISION) - %.17g)" % (column,
+                                                             stat.shift)
+            exprs += ["SUM(%s)" % dev, "SUM(%s * %s)" % (dev, dev)]
+        stats.append(stat)
+    if exprs:
+        result = select(exprs)
+        if result is None:
+            return None
+        for stat in [stat for stat in stats if stat.n]:
+            stat.sum_dev, stat.sum_dev2 = result[:2]
+            result = result[2:]
+    return stats, nrows
+
+
+def scan_stats(columns, table, where, database, driver, extend):
+    """Compute the statistics reading the values selected by db.select in
+    chunks, all the columns are read with one query.
+
+    :return: the statistics of each column and the number of rows
+    """
+    sql = "SELECT %s FROM %s" % (', '.join(columns), table)
     if where:
         sql += " WHERE " + where
-
-    if not database:
-        database = None
-
-    if not driver:
-        driver = None
-
-    tmpf = file(tmp, 'w')
-    grass.run_command('db.select', flags = 'c', table = table,
-        database = database, driver = driver, sql = sql,
-        stdout = tmpf)
-    tmpf.close()
-
-    # check if result is empty
-    tmpf = file(tmp)
-    if tmpf.read(1) == '':
-        grass.fatal(_("Table <%s> contains no data.") % table)
-        tmpf.close()
-
-    # calculate statistics
+    stats = [ColumnStats(extend) for column in columns]
+    nrows = 0
+    process = grass.pipe_command('db.select', flags='c', sql=sql,
+                                 database=database, driver=driver)
+    for values in read_values(process.stdout, len(columns)):
+        nrows += len(values)
+        for i, stat in enumerate(stats):
+            stat.update(values[:, i])
+    if process.wait() != 0:
+        grass.fatal(_("Unable to select data from table <%s>") % table)
+    return stats, nrows
+
+
+def print_stats(stat, perc, extend, shellstyle, prefix=''):
+    """Print the statistics of a column"""
+    stddev = math.sqrt(stat.variance)
     if not shellstyle:
-        grass.verbose(_("Calculating statistics..."))
-
-    N = 0
-    sum = 0.0
-    sum2 = 0.0
-    sum3 = 0.0
-    minv = 1e300
-    maxv = -1e300
-
-    tmpf = file(tmp)
-    for line in tmpf:
-	if len(line.rstrip('\r\n')) == 0:
-	    continue
-        x = float(line.rstrip('\r\n'))
-        N += 1
-        sum += x
-        sum2 += x * x
-        sum3 += abs(x)
-        maxv = max(maxv, x)
-        minv = min(minv, x)
-    tmpf.close()
-
-    if N <= 0:
-        grass.fatal(_("No non-null values found"))
-
-    if not shellstyle:
-        sys.stdout.write("Number of values: %d\n"% N)
-        sys.stdout.write("Minimum: %.15g\n"% minv)
-        sys.stdout.write("Maximum: %.15g\n"% maxv)
-        sys.stdout.write("Range: %.15g\n"% (maxv - minv))
-        sys.stdout.write("Mean: %.15g\n"% (sum/N))
-        sys.stdout.write("Arithmetic mean of absolute values: %.15g\n"% (sum3/N))
-        sys.stdout.write("Variance: %.15g\n"% ((sum2 - sum*sum/N)/N))
-        sys.stdout.write("Standard deviation: %.15g\n"% (math.sqrt((sum2 - sum*sum/N)/N)))
-        sys.stdout.write("Coefficient of variation: %.15g\n"% ((math.sqrt((sum2 - sum*sum/N)/N))/(math.sqrt(sum*sum)/N)))
-        sys.stdout.write("Sum: %.15g\n"% sum)
+        sys.stdout.write("Number of values: %d\n" % stat.n)
+        sys.stdout.write("Minimum: %.15g\n" % stat.min)
+        sys.stdout.write("Maximum: %.15g\n" % stat.max)
+        sys.stdout.write("Range: %.15g\n" % (stat.max - stat.min))
+        sys.stdout.write("Mean: %.15g\n" % stat.mean)
+        sys.stdout.write("Arithmetic mean of absolute values: %.15g\n" %
+                         (stat.sum_abs / stat.n))
+        sys.stdout.write("Variance: %.15g\n" % stat.variance)
+        sys.stdout.write("Standard deviation: %.15g\n" % stddev)
+        sys.stdout.write("Coefficient of variation: %.15g\n" %
+                         stat.coeff_var)
+        sys.stdout.write("Sum: %.15g\n" % stat.sum)
     else:
-        sys.stdout.write("n=%d\n"% N)
-        sys.stdout.write("min=%.15g\n"% minv)
-        sys.stdout.write("max=%.15g\n"% maxv)
-        sys.stdout.write("range=%.15g\n"% (maxv - minv))
-        sys.stdout.write("mean=%.15g\n"% (sum/N))
-        sys.stdout.write("mean_abs=%.15g\n"% (sum3/N))
-        sys.stdout.write("variance=%.15g\n"% ((sum2 - sum*sum/N)/N))
-        sys.stdout.write("stddev=%.15g\n"% (math.sqrt((sum2 - sum*sum/N)/N)))
-        sys.stdout.write("coeff_var=%.15g\n"% ((math.sqrt((sum2 - sum*sum/N)/N))/(math.sqrt(sum*sum)/N)))
-        sys.stdout.write("sum=%.15g\n"% sum)
+        sys.stdout.write("%sn=%d\n" % (prefix, stat.n))
+        sys.stdout.write("%smin=%.15g\n" % (prefix, stat.min))
+        sys.stdout.write("%smax=%.15g\n" % (prefix, stat.max))
+        sys.stdout.write("%srange=%.15g\n" % (prefix, stat.max - stat.min))
+        sys.stdout.write("%smean=%.15g\n" % (prefix, stat.mean))
+        sys.stdout.write("%smean_abs=%.15g\n" % (prefix,
+                                                  stat.sum_abs / stat.n))
+        sys.stdout.write("%svariance=%.15g\n" % (prefix, stat.variance))
+        sys.stdout.write("%sstddev=%.15g\n" % (prefix, stddev))
+        sys.stdout.write("%scoeff_var=%.15g\n" % (prefix, stat.coeff_var))
+        sys.stdout.write("%ssum=%.15g\n" % (prefix, stat.sum))
 
     if not extend:
         return
 
-    # preparations:
-    sortfile(tmp, tmp + ".sort")
-
-    number = N
+    N = stat.n
     odd = N % 2
-    eostr = ['even','odd'][odd]
+    eostr = ['even', 'odd'][odd]
 
     q25pos = round(N * 0.25)
     if q25pos == 0:
-	q25pos = 1
+        q25pos = 1
     q50apos = round(N * 0.50)
     if q50apos == 0:
-	q50apos = 1
+        q50apos = 1
     q50bpos = q50apos + (1 - odd)
     q75pos = round(N * 0.75)
     if q75pos == 0:
-	q75pos = 1
-
-    ppos = {}
-    pval = {}
-    for i in range(len(perc)):
-        ppos[i] = round(N * perc[i] / 100)
-	if ppos[i] == 0:
-	    ppos[i] = 1
-        pval[i] = 0
-
-    inf = file(tmp + ".sort")
-    l = 1
-    for line in inf:
-        if l == q25pos:
-            q25 = float(line.rstrip('\r\n'))
-        if l == q50apos:
-            q50a = float(line.rstrip('\r\n'))
-        if l == q50bpos:
-            q50b = float(line.rstrip('\r\n'))
-        if l == q75pos:
-            q75 = float(line.rstrip('\r\n'))
-        for i in range(len(ppos)):
-            if l == ppos[i]:
-                pval[i] = float(line.rstrip('\r\n'))
-        l += 1
-
+        q75pos = 1
+
+    ppos = []
+    for p in perc:
+        pos = round(N * p / 100)
+        if pos == 0:
+            pos = 1
+        ppos.append(pos)
+
+    values = stat.ranks([q25pos, q50apos, q50bpos, q75pos] + ppos)
+    q25, q50a, q50b, q75 = values[:4]
+    pval = values[4:]
     q50 = (q50a + q50b) / 2
 
     if not shellstyle:
@@ -252,15 +425,90 @@ def main():
             else:
                 sys.stdout.write("%.15g Percentile: %.15g\n"% (perc[i], pval[i]))
     else:
-        sys.stdout.write("first_quartile=%.15g\n"% q25)
-        sys.stdout.write("median=%.15g\n"% q50)
-        sys.stdout.write("third_quartile=%.15g\n"% q75)
+        sys.stdout.write("%sfirst_quartile=%.15g\n" % (prefix, q25))
+        sys.stdout.write("%smedian=%.15g\n" % (prefix, q50))
+        sys.stdout.write("%sthird_quartile=%.15g\n" % (prefix, q75))
         for i in range(len(perc)):
             percstr = "%.15g" % perc[i]
             percstr = percstr.replace('.','_')
-            sys.stdout.write("percentile_%s=%.15g\n"% (percstr, pval[i]))
+            sys.stdout.write("%spercentile_%s=%.15g\n" % (prefix, percstr,
+                                                         pval[i]))
+
+
+def main():
+    if not hasNumPy:
+        grass.fatal(_("Required dependency NumPy not found. Exiting."))
+
+    extend = flags['e']
+    shellstyle = flags['g']
+    table = options['table']
+    columns = options['column'].split(',')
+    database = options['database']
+    driver = options['driver']
+    where = options['where']
+    perc = options['percentile']
+
+    perc = [float(p) for p in perc.split(',')]
+
+    desc_table = grass.db_describe(table, database=database, driver=driver)
+    if not desc_table:
+        grass.fatal(_("Unable to describe table <%s>") % table)
+    ctypes = dict((cname, ctype) for cname, ctype, cwidth
+                  in desc_table['cols'])
+    for column in columns:
+        if column not in ctypes:
+            grass.fatal(_("Column <%s> not found in table <%s>") %
+                        (column, table))
+        if ctypes[column] not in ('INTEGER', 'DOUBLE PRECISION'):
+            grass.fatal(_("Column <%s> is not numeric") % column)
+
+    if not shellstyle:
+        grass.verbose(_("Calculation for column <%s> of table <%s>...") %
+                      (', '.join(columns), table))
+        grass.message(_("Reading column values..."))
+
+    if not database:
+        database = None
+
+    if not driver:
+        driver = None
+
+    result = None
+    if not extend:
+        # the basic statistics do not need the values
+        if driver:
+            drv = driver
+        else:
+            drv = grass.db_connection().get('driver')
+        if drv in AGGREGATE_DRIVERS:
+            result = aggregate_stats(columns, table, where, database, driver)
+    if result is None:
+        result = scan_stats(columns, table, where, database, driver, extend)
+    stats, nrows = result
+
+    if nrows <= 0:
+        grass.fatal(_("Table <%s> contains no data.") % table)
+
+    # calculate statistics
+    if not shellstyle:
+        grass.verbose(_("Calculating statistics..."))
+
+    for column, stat in zip(columns, stats):
+        if stat.n <= 0:
+            grass.fatal(_("No non-null values found"))
+
+    for column, stat in zip(columns, stats):
+        prefix = ''
+        if len(columns) > 1:
+            if shellstyle:
+                prefix = column + '_'
+            else:
+                sys.stdout.write("Column <%s>:\n" % column)
+        print_stats(stat, perc, extend, shellstyle, prefix)
+
 
 if __name__ == "__main__":
     options, flags = grass.parser()
+    nuldev = open(os.devnull, 'w')
     atexit.register(cleanup)
     main()
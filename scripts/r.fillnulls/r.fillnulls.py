@@ -84,14 +84,33 @@
 #% options : 2-10000
 #% guisection: RST options
 #%end
+#%option
+#% key: nprocs
+#% type: integer
+#% description: Number of holes filled in parallel (RST method)
+#% required: no
+#% multiple: no
+#% answer: 1
+#% guisection: RST options
+#%end
 
 import sys
 import os
 import atexit
+import string
+from functools import partial
+from multiprocessing.pool import ThreadPool
 
 import grass.script as grass
 from grass.exceptions import CalledModuleError
 
+# holes with a bounding box smaller than this number of cells are filled
+# in batches, a batch has at most BATCH_HOLES holes and BATCH_CELLS cells
+BATCH_CELLS = 10000
+BATCH_HOLES = 100
+# maximum number of maps patched by a single r.patch
+PATCH_MAX = 100
+
 tmp_rmaps = list()
 tmp_vmaps = list()
 usermask = None
@@ -108,6 +127,239 @@ def cleanup():
         if grass.find_file(usermask, mapset = mapset)['file']:
             grass.run_command('g.rename', quiet = True, raster = (usermask, 'MASK'), overwrite = True)
 
+def mapcalc(exp, env=None, **kwargs):
+    """Run r.mapcalc, raising CalledModuleError on failure instead of
+    exiting (grass.mapcalc() can not be used in the threads)"""
+    grass.write_command('r.mapcalc', file='-', env=env, quiet=True,
+                        stdin=string.Template(exp).substitute(**kwargs))
+
+
+def hole_bboxes(vector):
+    """Return the categories of the holes and their bounding boxes (north,
+    south, east, west), read from the areas of the holes vector map.
+
+    The areas of a hole have the same category.
+    """
+    # only the rst method needs NumPy and pygrass
+    try:
+        import numpy as np
+    except ImportError:
+        grass.fatal(_("NumPy is required by the rst method"))
+    from grass.pygrass.vector import VectorTopo
+
+    vect = VectorTopo(vector)
+    vect.open('r')
+    cats, bboxes = [], []
+    try:
+        for batch in vect.viter_batches('areas', layer=1):
+            cats.append(batch.cats.copy())
+            bboxes.append(batch.bbox[:, :4].copy())
+    finally:
+        vect.close()
+    if not cats:
+        return []
+    cats = np.concatenate(cats)
+    bboxes = np.concatenate(bboxes)
+    # the isles of the holes are areas without category
+    valid = cats > 0
+    cats, bboxes = cats[valid], bboxes[valid]
+    if not len(cats):
+        return []
+    order = np.argsort(cats, kind='mergesort')
+    cats, bboxes = cats[order], bboxes[order]
+    start = np.flatnonzero(np.r_[True, cats[1:] != cats[:-1]])
+    north = np.maximum.reduceat(bboxes[:, 0], start)
+    south = np.minimum.reduceat(bboxes[:, 1], start)
+    east = np.maximum.reduceat(bboxes[:, 2], start)
+    west = np.minimum.reduceat(bboxes[:, 3], start)
+    return [(str(cat), bbox) for cat, bbox
+            in zip(cats[start], zip(north, south, east, west))]
+
+
+def hole_batches(holes, ns_res, ew_res):
+    """Group the small holes in batches, the large holes are filled one at
+    a time; the largest jobs come first, to balance the workers"""
+    jobs, batch, batch_cells = [], [], 0
+    sizes = [((bbox[0] - bbox[1]) / ns_res) * ((bbox[2] - bbox[3]) / ew_res)
+             for cat, bbox in holes]
+    for hole, cells in zip(holes, sizes):
+        if cells >= BATCH_CELLS:
+            jobs.append((cells, [hole]))
+            continue
+        if batch and (len(batch) >= BATCH_HOLES or
+                      batch_cells + cells > BATCH_CELLS):
+            jobs.append((batch_cells, batch))
+            batch, batch_cells = [], 0
+        batch.append(hole)
+        batch_cells += cells
+    if batch:
+        jobs.append((batch_cells, batch))
+    jobs.sort(key=lambda job: job[0], reverse=True)
+    return [(index, job[1]) for index, job in enumerate(jobs)]
+
+
+def fill_holes(job, params):
+    """Fill a batch of holes with v.surf.rst, executed by the thread pool.
+
+    Each hole is filled in its own region (GRASS_REGION), the filled
+    holes of the batch are patched together.
+
+    :return: the map with the filled holes (None if no hole was filled),
+             the number of holes, the list of the holes not filled and
+             an error message (None on success)
+    """
+    index, holes = job
+    prefix = params['prefix']
+    input = params['input']
+    edge = params['edge']
+    fills = []
+    failed = []
+    try:
+        for cat, (north, south, east, west) in holes:
+            holename = prefix + 'hole_' + cat
+            # zoom to specific hole with a buffer of two cells around the
+            # hole to remove rest of data
+            env = os.environ.copy()
+            env['GRASS_REGION'] = grass.region_env(
+                n='%.15g' % (north + int(edge * 2 * params['ns_res'])),
+                s='%.15g' % (south - int(edge * 2 * params['ns_res'])),
+                e='%.15g' % (east + int(edge * 2 * params['ew_res'])),
+                w='%.15g' % (west - int(edge * 2 * params['ew_res'])),
+                align=input)
+
+            # copy only data around hole
+            tmp_rmaps.append(holename)
+            mapcalc("$out = if($inp == $catn, $inp, null())", env=env,
+                    out=holename, inp=prefix + 'holes', catn=cat)
+
+            # grow hole border to get it's edge area
+            tmp_rmaps.append(holename + '_grown')
+            grass.run_command('r.grow', input=holename, radius=edge + 0.01,
+                              old=-1, out=holename + '_grown', quiet=True,
+                              env=env)
+
+            # no idea why r.grow old=-1 doesn't replace existing values
+            # with NULL
+            tmp_rmaps.append(holename + '_edges')
+            mapcalc("$out = if($inp == -1, null(), $dem)", env=env,
+                    out=holename + '_edges', inp=holename + '_grown',
+                    dem=input)
+
+            # convert to points for interpolation
+            tmp_vmaps.append(holename)
+            grass.run_command('r.to.vect', input=holename + '_edges',
+                              output=holename, type='point', flags='z',
+                              quiet=True, env=env)
+
+            # count number of points to control segmax parameter for
+            # interpolation:
+            pointsnumber = grass.vector_info_topo(map=holename)['points']
+            grass.verbose(_("Interpolating %d points") % pointsnumber)
+
+            if pointsnumber < 2:
+                grass.verbose(_("No points to interpolate"))
+                failed.append(holename)
+                continue
+
+            # Avoid v.surf.rst warnings
+            segmax = params['segmax']
+            npmin = params['npmin']
+            if pointsnumber < segmax:
+                npmin = pointsnumber + 1
+                segmax = pointsnumber
+
+            # launch v.surf.rst
+            tmp_rmaps.append(holename + '_dem')
+            try:
+                grass.run_command('v.surf.rst', quiet=True,
+                                  input=holename, elev=holename + '_dem',
+                                  tension=params['tension'],
+                                  smooth=params['smooth'],
+                                  segmax=segmax, npmin=npmin, env=env)
+            except CalledModuleError:
+                # GTC Hole is NULL area in a raster map
+                return None, len(holes), failed, \
+                    _("Failed to fill hole %s") % cat
+
+            # v.surf.rst sometimes fails with exit code 0
+            # related bug #1813
+            if not grass.find_file(holename + '_dem')['file']:
+                for name in (holename, holename + '_grown',
+                             holename + '_edges', holename + '_dem'):
+                    tmp_rmaps.remove(name)
+                tmp_vmaps.remove(holename)
+                grass.warning(_("Filling has failed silently. Leaving "
+                                "temporary maps with prefix <%s> for "
+                                "debugging.") % holename)
+                failed.append(holename)
+                continue
+
+            # keep only the interpolated values of the hole
+            tmp_rmaps.append(holename + '_fill')
+            mapcalc("$out = if(isnull($inp), null(), $dem)", env=env,
+                    out=holename + '_fill', inp=holename,
+                    dem=holename + '_dem')
+            fills.append(holename + '_fill')
+
+            # remove temporary maps to not overfill disk
+            names = (holename, holename + '_grown', holename + '_edges',
+                     holename + '_dem')
+            grass.run_command('g.remove', quiet=True, flags='fb',
+                              type='raster', name=names)
+            for name in names:
+                tmp_rmaps.remove(name)
+            grass.run_command('g.remove', quiet=True, flags='fb',
+                              type='vector', name=holename)
+            tmp_vmaps.remove(holename)
+
+        if len(fills) < 2:
+            return (fills[0] if fills else None), len(holes), failed, None
+        # patch the holes of the batch in the region covering them
+        filling = prefix + 'filled_%d' % index
+        env = os.environ.copy()
+        env['GRASS_REGION'] = grass.region_env(raster=','.join(fills),
+                                               align=input)
+        tmp_rmaps.append(filling)
+        grass.run_command('r.patch', input=fills, output=filling,
+                          quiet=True, env=env)
+        grass.run_command('g.remove', quiet=True, flags='fb', type='raster',
+                          name=fills)
+        for name in fills:
+            tmp_rmaps.remove(name)
+        return filling, len(holes), failed, None
+    except CalledModuleError:
+        return None, len(holes), failed, \
+            _("abandoned. Removing temporary maps, restoring user mask if needed:")
+
+
+def patch_maps(pool, maps, output, prefix):
+    """Patch maps not overlapping into output, at most PATCH_MAX maps are
+    patched at once, the groups are patched in parallel"""
+    level = 0
+    while len(maps) > PATCH_MAX:
+        groups = [(maps[i:i + PATCH_MAX], prefix + 'patch_%d_%d' % (level, i))
+                  for i in range(0, len(maps), PATCH_MAX)]
+        for group, name in groups:
+            tmp_rmaps.append(name)
+        pool.map(lambda group: grass.run_command('r.patch', input=group[0],
+                                                 output=group[1],
+                                                 quiet=True),
+                 groups)
+        grass.run_command('g.remove', quiet=True, flags='fb', type='raster',
+                          name=maps)
+        for name in maps:
+            tmp_rmaps.remove(name)
+        maps = [name for group, name in groups]
+        level += 1
+    tmp_rmaps.append(output)
+    if len(maps) == 1:
+        grass.run_command('g.rename', raster=(maps[0], output),
+                          overwrite=True, quiet=True)
+        tmp_rmaps.remove(maps[0])
+    else:
+        grass.run_command('r.patch', input=maps, output=output, quiet=True)
+
+
 def main():
     global usermask, mapset, tmp_rmaps, tmp_vmaps
 
@@ -119,6 +371,9 @@ def main():
     edge = int(options['edge'])
     segmax = int(options['segmax'])
     npmin = int(options['npmin'])
+    nprocs = int(options['nprocs'])
+    if nprocs < 1:
+        grass.fatal(_("Number of processes must be at least 1"))
     quiet = True # FIXME 
     
     mapset = grass.gisenv()['MAPSET']
@@ -208,175 +463,45 @@ def main():
             grass.fatal(_("abandoned. Removing temporary maps, restoring user mask if needed:"))
         tmp_vmaps.append(prefix + 'holes')
         
-        # get a list of unique hole cat's
-        cats_file_name = grass.tempfile(False)
-        grass.run_command('v.db.select', flags = 'c', map = prefix + 'holes', columns = 'cat', file = cats_file_name, quiet = quiet)
-        cat_list = list()
-        cats_file = file(cats_file_name)
-        for line in cats_file:
-            cat_list.append(line.rstrip('\n'))
-        cats_file.close()
-        os.remove(cats_file_name)
-        
-        if len(cat_list) < 1:
+        # get the unique hole cat's and their extents
+        holes = hole_bboxes(prefix + 'holes')
+
+        if len(holes) < 1:
             grass.fatal(_("Input map has no holes. Check region settings."))
-        
+
         # GTC Hole is NULL area in a raster map
-        grass.message(_("Processing %d map holes") % len(cat_list))
-        first = True
-        hole_n = 1
-        for cat in cat_list:
-            holename = prefix + 'hole_' + cat
-            # GTC Hole is a NULL area in a raster map
-            grass.message(_("Filling hole %s of %s") % (hole_n, len(cat_list)))
-            hole_n = hole_n + 1
-            # cut out only CAT hole for processing
-            try:
-                grass.run_command('v.extract', input=prefix + 'holes',
-                                  output=holename + '_pol',
-                                  cats=cat, quiet=quiet)
-            except CalledModuleError:
-                grass.fatal(_("abandoned. Removing temporary maps, restoring user mask if needed:"))
-            tmp_vmaps.append(holename + '_pol')
-            
-            # zoom to specific hole with a buffer of two cells around the hole to remove rest of data
-            try:
-                grass.run_command('g.region',
-                                  vector=holename + '_pol', align=input, 
-                                  w = 'w-%d' % (edge * 2 * ew_res),
-                                  e = 'e+%d' % (edge * 2 * ew_res), 
-                                  n = 'n+%d' % (edge * 2 * ns_res),
-                                  s = 's-%d' % (edge * 2 * ns_res),
-                                  quiet=quiet)
-            except CalledModuleError:
-                grass.fatal(_("abandoned. Removing temporary maps, restoring user mask if needed:"))
-            
-            # remove temporary map to not overfill disk
-            try:
-                grass.run_command('g.remove', flags='fb', type='vector',
-                                  name=holename + '_pol', quiet=quiet)
-            except CalledModuleError:
-                grass.fatal(_("abandoned. Removing temporary maps, restoring user mask if needed:"))
-            tmp_vmaps.remove(holename + '_pol')
-            
-            # copy only data around hole
-            grass.mapcalc("$out = if($inp == $catn, $inp, null())",
-                            out = holename, inp = prefix + 'holes', catn = cat)
-            tmp_rmaps.append(holename)
-            
-            # If here loop is split into two, next part of loop can be run in parallel 
-            # (except final result patching)
-            # Downside - on large maps such approach causes large disk usage
-            
-            # grow hole border to get it's edge area
-            tmp_rmaps.append(holename + '_grown')
-            try:
-                grass.run_command('r.grow', input=holename, radius=edge + 0.01,
-                             old=-1, out=holename + '_grown', quiet=quiet)
-            except CalledModuleError:
-                grass.fatal(_("abandoned. Removing temporary map, restoring user mask if needed:"))
-            
-            # no idea why r.grow old=-1 doesn't replace existing values with NULL
-            grass.mapcalc("$out = if($inp == -1, null(), $dem)", 
-                            out = holename + '_edges', inp = holename + '_grown', dem = input)
-            tmp_rmaps.append(holename + '_edges')
-            
-            # convert to points for interpolation
-            tmp_vmaps.append(holename)
-            try:
-                grass.run_command('r.to.vect',
-                                  input=holename + '_edges', output=holename,
-                                  type='point', flags='z', quiet=quiet)
-            except CalledModuleError:
-                grass.fatal(_("abandoned. Removing temporary maps, restoring user mask if needed:"))
-            
-            # count number of points to control segmax parameter for interpolation:
-            pointsnumber = grass.vector_info_topo(map = holename)['points']
-            grass.verbose(_("Interpolating %d points") % pointsnumber)
+        grass.message(_("Processing %d map holes") % len(holes))
+        params = dict(input=input, prefix=prefix, edge=edge,
+                      tension=tension, smooth=smooth, segmax=segmax,
+                      npmin=npmin, ns_res=ns_res, ew_res=ew_res)
+        fills = []
+        done = 0
+        pool = ThreadPool(nprocs)
+        try:
+            for fill, nholes, failed, error in pool.imap_unordered(
+                    partial(fill_holes, params=params),
+                    hole_batches(holes, ns_res, ew_res)):
+                if error:
+                    grass.fatal(error)
+                if fill:
+                    fills.append(fill)
+                failed_list.extend(failed)
+                done += nholes
+                grass.percent(done, len(holes), 1)
 
-            if pointsnumber < 2:
-                grass.verbose(_("No points to interpolate"))
-                failed_list.append(holename)
-                continue
-            
-            # Avoid v.surf.rst warnings
-            if pointsnumber < segmax:
-                npmin = pointsnumber + 1
-                segmax = pointsnumber
-            
-            # launch v.surf.rst
-            tmp_rmaps.append(holename + '_dem')
-            try:
-                grass.run_command('v.surf.rst', quiet=quiet,
-                                  input=holename, elev=holename + '_dem',
-                                  tension=tension, smooth=smooth, 
-                                  segmax=segmax, npmin=npmin)
-            except CalledModuleError:
-                # GTC Hole is NULL area in a raster map
-                grass.fatal(_("Failed to fill hole %s") % cat)
-            
-            # v.surf.rst sometimes fails with exit code 0
-            # related bug #1813
-            if not grass.find_file(holename + '_dem')['file']:
-                try:
-                    tmp_rmaps.remove(holename)
-                    tmp_rmaps.remove(holename + '_grown')
-                    tmp_rmaps.remove(holename + '_edges')
-                    tmp_rmaps.remove(holename + '_dem')
-                    tmp_vmaps.remove(holename)
-                except:
-                    pass
-                grass.warning(_("Filling has failed silently. Leaving temporary maps with prefix <%s> for debugging.") % holename)
-                failed_list.append(holename)
-                continue
-            
-            # append hole result to interpolated version later used to patch into original DEM
-            if first:
-                tmp_rmaps.append(filling)
-                grass.run_command('g.region', align = input, raster = holename + '_dem', quiet = quiet)
-                grass.mapcalc("$out = if(isnull($inp), null(), $dem)", 
-                                out = filling, inp = holename, dem = holename + '_dem')
-                first = False
-            else:
-                tmp_rmaps.append(filling + '_tmp')
-                grass.run_command('g.region', align = input, raster = (filling, holename + '_dem'), quiet = quiet)
-                grass.mapcalc("$out = if(isnull($inp), if(isnull($fill), null(), $fill), $dem)", 
-                                out = filling + '_tmp', inp = holename, dem = holename + '_dem', fill = filling)
-                try:
-                    grass.run_command('g.rename',
-                                      raster=(filling + '_tmp', filling),
-                                      overwrite=True, quiet=quiet)
-                except CalledModuleError:
-                    grass.fatal(_("abandoned. Removing temporary maps, restoring user mask if needed:"))
-                tmp_rmaps.remove(filling + '_tmp') # this map has been removed. No need for later cleanup.
-            
-            # remove temporary maps to not overfill disk
-            try:
-                tmp_rmaps.remove(holename)
-                tmp_rmaps.remove(holename + '_grown')
-                tmp_rmaps.remove(holename + '_edges')
-                tmp_rmaps.remove(holename + '_dem')
-            except:
-                pass
-            try:
-                grass.run_command('g.remove', quiet=quiet,
-                                  flags='fb', type='raster',
-                                  name=(holename,
-                                        holename + '_grown',
-                                        holename + '_edges',
-                                        holename + '_dem'))
-            except CalledModuleError:
-                grass.fatal(_("abandoned. Removing temporary maps, restoring user mask if needed:"))
-            try:
-                tmp_vmaps.remove(holename)
-            except:
-                pass
+            if not fills:
+                grass.fatal(_("No hole was filled"))
+
+            # patch the filled holes into a single map later used to patch
+            # into original DEM
             try:
-                grass.run_command('g.remove', quiet=quiet, flags='fb',
-                                  type='vector', name=holename)
+                patch_maps(pool, fills, filling, prefix)
             except CalledModuleError:
                 grass.fatal(_("abandoned. Removing temporary maps, restoring user mask if needed:"))
-    
+        finally:
+            pool.terminate()
+            pool.join()
+
     #check if method is different from rst to use r.resamp.bspline
     if method != 'rst':
         grass.message(_("Using %s bspline interpolation") % method)
@@ -119,6 +119,14 @@ This program is free software under the GNU General Public License
 #% guisection: Connection
 #%end
 
+#%option
+#% key: connections
+#% type: integer
+#% description: Maximum number of tiles downloaded at the same time
+#% answer: 4
+#% guisection: Connection
+#%end
+
 #%option
 #% key: method
 #% type: string
@@ -168,6 +176,12 @@ This program is free software under the GNU General Public License
 #% guisection: Map style
 #%end
 
+#%flag
+#% key: k
+#% description: Keep the downloaded tiles in the tile cache and reuse them
+#% guisection: Connection
+#%end
+
 #%rules
 #% exclusive: capfile_output, capfile
 #%end
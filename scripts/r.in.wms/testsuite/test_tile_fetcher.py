@@ -0,0 +1,166 @@
+"""Unit test of the tile cache and of the repeated requests of the
+   TileFetcher of the r.in.wms GRASS drivers
+
+(C) 2015 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+from urllib2 import HTTPError
+
+import grass.gunittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wms_drv import TileFetcher
+
+
+class Response(object):
+    """Response of a fake server"""
+
+    def __init__(self, data, ctype):
+        self.data = data
+        self.ctype = ctype
+
+    def read(self):
+        return self.data
+
+    def info(self):
+        return self
+
+    def gettype(self):
+        return self.ctype
+
+
+class Server(object):
+    """Fake server which counts the requests and refuses the first ones"""
+
+    def __init__(self, refused=0, ctype='image/png'):
+        self.refused = refused
+        self.ctype = ctype
+        self.requests = []
+
+    def __call__(self, url):
+        self.requests.append(url)
+        if self.refused > 0:
+            self.refused -= 1
+            raise HTTPError(url, 503, "Service Unavailable", {}, None)
+        return Response("tile of %s" % url, self.ctype)
+
+
+class TestTileFetcher(grass.gunittest.TestCase):
+
+    urls = ["http://example.com/wms?tile=%d" % i for i in range(4)]
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'tile_cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def tempfile(self):
+        fd, path = tempfile.mkstemp(dir=self.tmp_dir)
+        os.close(fd)
+        return path
+
+    def fetcher(self, server, **kwargs):
+        kwargs.setdefault('min_interval', 0)
+        kwargs.setdefault('backoff', 0)
+        return TileFetcher(server, self.tempfile, **kwargs)
+
+    def fetch(self, fetcher, urls=None):
+        """Fetch the tiles and return their content ordered by url"""
+        urls = urls if urls else self.urls
+        tiles = {}
+        for i_url, path, is_temp in fetcher.Fetch(urls):
+            with open(path) as tile:
+                tiles[i_url] = tile.read()
+        return [tiles[i] for i in range(len(urls))]
+
+    def test_no_cache(self):
+        """Without cache directory all the tiles are downloaded"""
+        server = Server()
+        fetcher = self.fetcher(server, connections=2)
+        tiles = self.fetch(fetcher)
+        self.fetch(fetcher)
+        self.assertEqual(tiles, ["tile of %s" % url for url in self.urls])
+        self.assertEqual(len(server.requests), 2 * len(self.urls))
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_cache_hit(self):
+        """The cached tiles are not downloaded again"""
+        server = Server()
+        tiles = self.fetch(self.fetcher(server, cache_dir=self.cache_dir))
+        self.assertEqual(len(server.requests), len(self.urls))
+        cached = self.fetch(self.fetcher(server, cache_dir=self.cache_dir))
+        self.assertEqual(cached, tiles)
+        self.assertEqual(len(server.requests), len(self.urls))
+
+    def test_cache_miss_credentials(self):
+        """The tiles of different credentials are cached separately"""
+        server = Server()
+        self.fetch(self.fetcher(server, cache_dir=self.cache_dir,
+                                credentials=('user', 'secret')))
+        self.fetch(self.fetcher(server, cache_dir=self.cache_dir,
+                                credentials=('user', 'other')))
+        self.fetch(self.fetcher(server, cache_dir=self.cache_dir))
+        self.assertEqual(len(server.requests), 3 * len(self.urls))
+        fetcher = self.fetcher(server, cache_dir=self.cache_dir,
+                               credentials=('user', 'secret'))
+        self.assertNotIn('secret', fetcher.CachePath(self.urls[0]))
+        self.fetch(fetcher)
+        self.assertEqual(len(server.requests), 3 * len(self.urls))
+
+    def test_cache_miss_expired(self):
+        """The expired tiles are downloaded again"""
+        server = Server()
+        fetcher = self.fetcher(server, cache_dir=self.cache_dir,
+                               cache_ttl=3600)
+        self.fetch(fetcher)
+        # make one tile older than the time to live
+        path = fetcher.CachePath(self.urls[0])
+        os.utime(path, (0, 0))
+        self.fetch(fetcher)
+        self.assertEqual(len(server.requests), len(self.urls) + 1)
+        self.assertEqual(server.requests[-1], self.urls[0])
+
+    def test_cache_size(self):
+        """The cache does not exceed the maximum size"""
+        server = Server()
+        tile_size = len(Response("tile of %s" % self.urls[0], None).read())
+        fetcher = self.fetcher(server, cache_dir=self.cache_dir,
+                               cache_size=2 * tile_size)
+        self.fetch(fetcher)
+        cached = [url for url in self.urls
+                  if os.path.exists(fetcher.CachePath(url))]
+        self.assertEqual(len(cached), 2)
+
+    def test_error_not_cached(self):
+        """The error documents of the server are not cached"""
+        server = Server(ctype='application/vnd.ogc.se_xml')
+        self.fetch(self.fetcher(server, cache_dir=self.cache_dir))
+        self.fetch(self.fetcher(server, cache_dir=self.cache_dir))
+        self.assertEqual(len(server.requests), 2 * len(self.urls))
+
+    def test_retries(self):
+        """The refused requests are repeated"""
+        server = Server(refused=3)
+        tiles = self.fetch(self.fetcher(server, connections=1, retries=3))
+        self.assertEqual(tiles, ["tile of %s" % url for url in self.urls])
+        self.assertEqual(len(server.requests), len(self.urls) + 3)
+
+    def test_retries_exceeded(self):
+        """The request fails when the server refuses all the retries"""
+        server = Server(refused=10)
+        fetcher = self.fetcher(server, connections=1, retries=2)
+        self.assertRaises(HTTPError, self.fetch, fetcher, self.urls[:1])
+        self.assertEqual(len(server.requests), 3)
+
+
+if __name__ == '__main__':
+    grass.gunittest.test()
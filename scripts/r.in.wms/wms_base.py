@@ -15,6 +15,7 @@ This program is free software under the GNU General Public License
 """
 
 import os
+import sys
 from math import ceil
 
 import base64
@@ -79,6 +80,17 @@ class WMSBase:
 
         self.params['bgcolor'] = options['bgcolor'].strip()
 
+        # d.wms does not define the options of the tile downloading
+        self.params['connections'] = int(options.get('connections') or 4)
+        if self.params['connections'] < 1:
+            grass.fatal(_("Number of connections must be greater than 0"))
+
+        # the persistent tile cache is used only on request
+        if flags.get('k'):
+            self.params['tile_cache'] = self._tileCacheDir()
+        else:
+            self.params['tile_cache'] = None
+
         if options['format'] == "jpeg" and \
            not 'format' in driver_props['ignored_params']:
             if not flags['o'] and \
@@ -154,6 +166,15 @@ class WMSBase:
 
         return proj
 
+    def _tileCacheDir(self):
+        """!Get directory of the persistent cache of the downloaded tiles"""
+        if sys.platform == 'win32':
+            grass_config_dir = os.path.join(os.getenv('APPDATA'), 'GRASS7')
+        else:
+            grass_config_dir = os.path.join(os.getenv('HOME'), '.grass7')
+
+        return os.path.join(grass_config_dir, 'r.in.wms', 'tile_cache')
+
     def _checkIgnoeredParams(self, options, flags, driver_props):
         """!Write warnings for set parameters and flags, which chosen driver does not use."""
 
@@ -162,7 +183,7 @@ class WMSBase:
 
             if options.has_key(i_param) and \
                options[i_param] and \
-               i_param not in ['srs', 'wms_version', 'format']: # params with default value
+               i_param not in ['srs', 'wms_version', 'format', 'connections']: # params with default value
                 not_relevant_params.append('<' + i_param  + '>')
 
         if len(not_relevant_params) > 0:
@@ -173,7 +194,7 @@ class WMSBase:
         not_relevant_flags = []
         for i_flag in driver_props['ignored_flags']:
 
-            if flags[i_flag]:
+            if flags.get(i_flag):
                 not_relevant_flags.append('<' + i_flag  + '>')
 
         if len(not_relevant_flags) > 0:
@@ -593,9 +614,9 @@ class WMSDriversInfo:
     def _GDALDrvProperties(self):
 
         props = {}
-        props['ignored_flags'] = []
+        props['ignored_flags'] = ['k']
         props['ignored_params'] = ['urlparams', 'bgcolor', 'capfile', 'capfile_output',
-                                    'username', 'password']
+                                    'username', 'password', 'connections']
         props['req_multiple_layers'] = True
 
         return props
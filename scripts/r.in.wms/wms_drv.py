@@ -3,6 +3,7 @@
 
 List of classes:
  - wms_drv::WMSDrv
+ - wms_drv::TileFetcher
  - wms_drv::BaseRequestMgr
  - wms_drv::WMSRequestMgr
  - wms_drv::WMTSRequestMgr
@@ -16,10 +17,15 @@ This program is free software under the GNU General Public License
 @author Stepan Turek <stepan.turek seznam.cz> (Mentor: Martin Landa)
 """
 
-import socket
+import os
+import sys
+import hashlib
+import threading
 import grass.script as grass 
 
-from time      import sleep
+from time      import sleep, time
+from Queue     import Queue
+from urlparse  import urlparse
 
 try:
     from osgeo import gdal
@@ -75,113 +81,91 @@ class WMSDrv(WMSBase):
         init = True
         temp_map = None
 
-        fetch_try = 0
-
-        # iterate through all tiles and download them
+        # get urls for request the tiles and information for placing the tiles into raster
+        tiles = []
         while True:
-
-            if fetch_try == 0:
-                # get url for request the tile and information for placing the tile into raster with other tiles
-                tile = req_mgr.GetNextTile()
-
-            # if last tile has been already downloaded 
+            tile = req_mgr.GetNextTile()
+            # if last tile has been already requested
             if not tile:
                 break
-
-            # url for request the tile
-            query_url = tile[0]
-
-            # the tile size and offset in pixels for placing it into raster where tiles are joined
-            tile_ref = tile[1]
-            grass.debug(query_url, 2)
-            try: 
-                wms_data = self._fetchDataFromServer(query_url, self.params['username'], self.params['password'])
-            except (IOError, HTTPException) as e:
-                if HTTPError == type(e) and e.code == 401:
-                    grass.fatal(_("Authorization failed to '%s' when fetching data.\n%s") % (self.params['url'], str(e)))
-                else:
-                    grass.fatal(_("Unable to fetch data from: '%s'\n%s") % (self.params['url'], str(e)))
-
-            temp_tile = self._tempfile()
-                
-            # download data into temporary file
-            try:
-                temp_tile_opened = open(temp_tile, 'wb')
-                temp_tile_opened.write(wms_data.read())
-            except IOError as e:
-                # some servers are not happy with many subsequent requests for tiles done immediately,
-                # if immediate request was unsuccessful, try to repeat the request after 5s and 30s breaks
-                # TODO probably servers can return more kinds of errors related to this problem (not only 104)
-                if socket.error == type(e) and e[0] == 104 and fetch_try < 2:
-                    fetch_try += 1
-
-                    if fetch_try == 1:
-                        sleep_time = 5
-                    elif fetch_try == 2:
-                        sleep_time = 30
-
-                    grass.warning(_("Server refused to send data for a tile.\nRequest will be repeated after %d s.") % sleep_time)
-
-                    sleep(sleep_time)
-                    continue
-                else:
-                    grass.fatal(_("Unable to write data into tempfile.\n%s") % str(e))
-            finally:
-                temp_tile_opened.close()
-
-            fetch_try = 0
-                
-            tile_dataset_info = gdal.Open(temp_tile, gdal.GA_ReadOnly) 
-            if tile_dataset_info is None:
-                # print error xml returned from server
-                try:
-                    error_xml_opened = open(temp_tile, 'rb')
-                    err_str = error_xml_opened.read()     
-                except IOError as e:
-                    grass.fatal(_("Unable to read data from tempfile.\n%s") % str(e))
-                finally:
-                    error_xml_opened.close()
-
-                if  err_str is not None:
-                    grass.fatal(_("WMS server error: %s") %  err_str)
-                else:
-                    grass.fatal(_("WMS server unknown error") )
-                
-            temp_tile_pct2rgb = None
-            if tile_dataset_info.RasterCount == 1 and \
-               tile_dataset_info.GetRasterBand(1).GetRasterColorTable() is not None:
-                # expansion of color table into bands 
-                temp_tile_pct2rgb = self._tempfile()
-                tile_dataset = self._pct2rgb(temp_tile, temp_tile_pct2rgb)
-            else: 
-                tile_dataset = tile_dataset_info
-                
-            # initialization of temp_map_dataset, where all tiles are merged
-            if init:
-                temp_map = self._tempfile()
+            # the managers reuse the same dictionary for the tile references
+            tiles.append((tile[0], dict(tile[1])))
+
+        fetcher = TileFetcher(lambda url: self._fetchDataFromServer(url, self.params['username'],
+                                                                   self.params['password']),
+                              tempfile = self._tempfile,
+                              connections = self.params['connections'],
+                              cache_dir = self.params['tile_cache'],
+                              credentials = (self.params['username'],
+                                             self.params['password']))
+
+        # download the tiles concurrently and merge them as they arrive
+        try:
+            for i_tile, temp_tile, is_temp in fetcher.Fetch([tile[0] for tile in tiles]):
+                # the tile size and offset in pixels for placing it into raster where tiles are joined
+                tile_ref = tiles[i_tile][1]
+
+                tile_dataset_info = gdal.Open(temp_tile, gdal.GA_ReadOnly) 
+                if tile_dataset_info is None:
+                    # print error xml returned from server
+                    try:
+                        error_xml_opened = open(temp_tile, 'rb')
+                        err_str = error_xml_opened.read()     
+                    except IOError as e:
+                        grass.fatal(_("Unable to read data from tempfile.\n%s") % str(e))
+                    finally:
+                        error_xml_opened.close()
+
+                    if not is_temp:
+                        # do not keep invalid tiles in the cache
+                        grass.try_remove(temp_tile)
+
+                    if  err_str is not None:
+                        grass.fatal(_("WMS server error: %s") %  err_str)
+                    else:
+                        grass.fatal(_("WMS server unknown error") )
                     
-                driver = gdal.GetDriverByName(self.gdal_drv_format)
-                metadata = driver.GetMetadata()
-                if not metadata.has_key(gdal.DCAP_CREATE) or \
-                       metadata[gdal.DCAP_CREATE] == 'NO':
-                    grass.fatal(_('Driver %s does not supports Create() method') % drv_format)  
-                self.temp_map_bands_num = tile_dataset.RasterCount
-                temp_map_dataset = driver.Create(temp_map, map_region['cols'], map_region['rows'],
-                                                 self.temp_map_bands_num, 
-                                                 tile_dataset.GetRasterBand(1).DataType)
-                init = False
-                
-            # tile is written into temp_map
-            tile_to_temp_map = tile_dataset.ReadRaster(0, 0, tile_ref['sizeX'], tile_ref['sizeY'],
-                                                             tile_ref['sizeX'], tile_ref['sizeY'])
-                
-            temp_map_dataset.WriteRaster(tile_ref['t_cols_offset'], tile_ref['t_rows_offset'],
-                                         tile_ref['sizeX'],  tile_ref['sizeY'], tile_to_temp_map) 
-                
-            tile_dataset = None
-            tile_dataset_info = None
-            grass.try_remove(temp_tile)
-            grass.try_remove(temp_tile_pct2rgb)    
+                temp_tile_pct2rgb = None
+                if tile_dataset_info.RasterCount == 1 and \
+                   tile_dataset_info.GetRasterBand(1).GetRasterColorTable() is not None:
+                    # expansion of color table into bands 
+                    temp_tile_pct2rgb = self._tempfile()
+                    tile_dataset = self._pct2rgb(temp_tile, temp_tile_pct2rgb)
+                else: 
+                    tile_dataset = tile_dataset_info
+                    
+                # initialization of temp_map_dataset, where all tiles are merged
+                if init:
+                    temp_map = self._tempfile()
+                        
+                    driver = gdal.GetDriverByName(self.gdal_drv_format)
+                    metadata = driver.GetMetadata()
+                    if not metadata.has_key(gdal.DCAP_CREATE) or \
+                           metadata[gdal.DCAP_CREATE] == 'NO':
+                        grass.fatal(_('Driver %s does not supports Create() method') % drv_format)  
+                    self.temp_map_bands_num = tile_dataset.RasterCount
+                    temp_map_dataset = driver.Create(temp_map, map_region['cols'], map_region['rows'],
+                                                     self.temp_map_bands_num, 
+                                                     tile_dataset.GetRasterBand(1).DataType)
+                    init = False
+                    
+                # tile is written into temp_map
+                tile_to_temp_map = tile_dataset.ReadRaster(0, 0, tile_ref['sizeX'], tile_ref['sizeY'],
+                                                                 tile_ref['sizeX'], tile_ref['sizeY'])
+                    
+                temp_map_dataset.WriteRaster(tile_ref['t_cols_offset'], tile_ref['t_rows_offset'],
+                                             tile_ref['sizeX'],  tile_ref['sizeY'], tile_to_temp_map) 
+                    
+                tile_dataset = None
+                tile_dataset_info = None
+                if is_temp:
+                    grass.try_remove(temp_tile)
+                grass.try_remove(temp_tile_pct2rgb)    
+        except (IOError, HTTPException) as e:
+            if HTTPError == type(e) and e.code == 401:
+                grass.fatal(_("Authorization failed to '%s' when fetching data.\n%s") % (self.params['url'], str(e)))
+            else:
+                grass.fatal(_("Unable to fetch data from: '%s'\n%s") % (self.params['url'], str(e)))
 
         if not temp_map:
             return temp_map
@@ -246,6 +230,237 @@ class WMSDrv(WMSBase):
         
         return tif_ds       
 
+class TileFetcher:
+    """!Download tiles concurrently with a bounded pool of connections.
+
+    The requests to the same host are separated by a minimal interval, the
+    requests refused by the server are repeated with an exponential
+    backoff. If a cache directory is given, the downloaded tiles are stored
+    in a persistent cache, where the file name is the hash of the request
+    url and of the credentials, so the tiles of the same request are read
+    from the disk instead of the server. The cached tiles expire after
+    cache_ttl seconds and the oldest tiles are removed when the cache
+    exceeds cache_size bytes.
+    """
+    # errors of the servers that are not happy with many requests
+    retry_http_codes = (429, 500, 502, 503, 504)
+    # content types of the error messages, which are not cached
+    error_types = ('application/vnd.ogc.se_xml', 'application/xml', 'text/xml',
+                   'text/html', 'text/plain')
+
+    def __init__(self, fetch, tempfile, connections = 4, cache_dir = None,
+                 min_interval = 0.05, retries = 5, backoff = 1.0,
+                 credentials = None, cache_ttl = 7 * 24 * 3600,
+                 cache_size = 512 * 1024 * 1024):
+        """!
+        @param fetch function which returns the response of the server for an url
+        @param tempfile function which returns the path of a new temporary file
+        @param connections maximum number of tiles downloaded at the same time
+        @param cache_dir directory of the tile cache, if None tiles are not cached
+        @param min_interval minimal interval in seconds between requests to the same host
+        @param retries maximum number of repeated requests of a tile
+        @param backoff interval in seconds before the first repeated request,
+               it is doubled for each following request
+        @param credentials tuple with the user name and the password sent to
+               the server, which are part of the cache key
+        @param cache_ttl time in seconds after which a cached tile expires
+        @param cache_size maximum size of the cache in bytes
+        """
+        self.fetch = fetch
+        self.tempfile = tempfile
+        self.connections = max(1, int(connections))
+        self.cache_dir = cache_dir
+        self.min_interval = min_interval
+        self.retries = retries
+        self.backoff = backoff
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+
+        # the tiles of different users must not be shared in the cache
+        if credentials and any(credentials):
+            self._credentials_key = hashlib.sha1('%s:%s' % credentials).hexdigest()
+        else:
+            self._credentials_key = ''
+
+        self._hosts_lock = threading.Lock()
+        self._hosts = {}
+
+    def CachePath(self, url):
+        """!Get path of the cached tile of an url
+        """
+        key = hashlib.sha1('%s\n%s' % (url, self._credentials_key)).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key[2:])
+
+    def _isCached(self, cache_path):
+        """!Check if a cached tile exists and has not expired
+        """
+        try:
+            return time() - os.path.getmtime(cache_path) < self.cache_ttl
+        except OSError:
+            return False
+
+    def PruneCache(self):
+        """!Remove the expired tiles and the oldest tiles exceeding the cache size
+        """
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+
+        now = time()
+        tiles = []
+        total_size = 0
+        for dirpath, dirnames, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                    if now - stat.st_mtime >= self.cache_ttl:
+                        os.remove(path)
+                        continue
+                except OSError:
+                    continue
+                tiles.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        # the cached tiles are touched when they are read, so the least
+        # recently used tiles are removed first
+        tiles.sort()
+        for mtime, size, path in tiles:
+            if total_size <= self.cache_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+
+    def _waitHost(self, url):
+        """!Wait until the host of the url can receive a new request
+        """
+        host = urlparse(url).netloc
+        with self._hosts_lock:
+            now = time()
+            next_time = max(now, self._hosts.get(host, now))
+            self._hosts[host] = next_time + self.min_interval
+        if next_time > now:
+            sleep(next_time - now)
+
+    def _fetchData(self, url):
+        """!Fetch data of a tile, repeat the request if it was refused
+
+        @return tuple with data and content type
+        """
+        fetch_try = 0
+        while True:
+            self._waitHost(url)
+            try:
+                response = self.fetch(url)
+                return response.read(), response.info().gettype()
+            except HTTPError as e:
+                if e.code not in self.retry_http_codes or fetch_try >= self.retries:
+                    raise
+                retry_after = e.info().get('Retry-After', '') if e.info() else ''
+                sleep_time = float(retry_after) if retry_after.isdigit() else None
+            except (IOError, HTTPException) as e:
+                if fetch_try >= self.retries:
+                    raise
+                sleep_time = None
+
+            if sleep_time is None:
+                sleep_time = self.backoff * 2 ** fetch_try
+            fetch_try += 1
+            grass.warning(_("Server refused to send data for a tile.\nRequest will be repeated after %d s.") % sleep_time)
+            sleep(sleep_time)
+
+    def FetchTile(self, url):
+        """!Get a tile from the cache or from the server
+
+        @return tuple with the path of the tile and True if it is a temporary file
+        """
+        if self.cache_dir:
+            cache_path = self.CachePath(url)
+            if self._isCached(cache_path):
+                grass.debug("Tile read from cache: %s" % cache_path, 3)
+                try:
+                    os.utime(cache_path, None)
+                except OSError:
+                    pass
+                return cache_path, False
+
+        data, ctype = self._fetchData(url)
+
+        if self.cache_dir and ctype not in self.error_types:
+            cache_subdir = os.path.dirname(cache_path)
+            try:
+                if not os.path.isdir(cache_subdir):
+                    os.makedirs(cache_subdir)
+                # write a new file and rename it, the cache is always complete
+                temp_cache = "%s.%d.%d" % (cache_path, os.getpid(), threading.current_thread().ident)
+                cache_file = open(temp_cache, 'wb')
+                try:
+                    cache_file.write(data)
+                finally:
+                    cache_file.close()
+                if sys.platform == 'win32' and os.path.exists(cache_path):
+                    os.remove(cache_path)
+                os.rename(temp_cache, cache_path)
+                return cache_path, False
+            except (IOError, OSError) as e:
+                grass.debug("Unable to write tile into cache: %s" % e, 2)
+
+        temp_tile = self.tempfile()
+        temp_tile_opened = open(temp_tile, 'wb')
+        try:
+            temp_tile_opened.write(data)
+        finally:
+            temp_tile_opened.close()
+        return temp_tile, True
+
+    def Fetch(self, urls):
+        """!Download the tiles of the urls in parallel
+
+        @return generator of tuples with the index of the url, the path of
+                the tile and True if it is a temporary file, in the order the
+                tiles are downloaded
+        """
+        requests = Queue()
+        results = Queue()
+        stop = threading.Event()
+
+        for i_url, url in enumerate(urls):
+            requests.put((i_url, url))
+
+        def worker():
+            while not stop.is_set():
+                try:
+                    i_url, url = requests.get_nowait()
+                except Exception:
+                    return
+                grass.debug(url, 2)
+                try:
+                    path, is_temp = self.FetchTile(url)
+                    results.put((i_url, path, is_temp, None))
+                except (Exception, SystemExit) as e:
+                    # grass.fatal can be called while fetching
+                    results.put((i_url, None, None, e))
+
+        threads = []
+        for i in range(min(self.connections, len(urls))):
+            thread = threading.Thread(target = worker)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        try:
+            for i in range(len(urls)):
+                i_url, path, is_temp, error = results.get()
+                if error is not None:
+                    raise error
+                yield i_url, path, is_temp
+        finally:
+            stop.set()
+
+        self.PruneCache()
+
 class BaseRequestMgr:
     """!Base class for request managers. 
     """
@@ -57,12 +57,24 @@
 #%end
 
 import sys
+import os
 import string
+import time
 import grass.script as grass
 from grass.exceptions import CalledModuleError
 
 
+def report_times(times):
+    """Report the time spent by each phase of the join"""
+    for phase, seconds in times:
+        grass.verbose(_("%s: %.3f s") % (phase, seconds))
+    grass.verbose(_("Total: %.3f s") % sum(seconds for phase, seconds
+                                           in times))
+
+
 def main():
+    start = time.time()
+    times = []
     map = options['map']
     layer = options['layer']
     column = options['column']
@@ -115,40 +127,89 @@ def main():
     
     all_cols_tt = grass.vector_columns(map, int(layer)).keys()
 
-    select = "SELECT $colname FROM $otable WHERE $otable.$ocolumn=$table.$column"
-    template = string.Template("UPDATE $table SET $colname=(%s);" % select)
-
+    colnames = []
+    colspecs = []
     for col in cols_to_add:
-	# skip the vector column which is used for join
-	colname = col[0]
-	if colname == column:
-	    continue
-	# Sqlite 3 does not support the precision number any more
-	if len(col) > 2 and driver != "sqlite":
-	    coltype = "%s(%s)" % (col[1], col[2])
-	else:
-	    coltype = "%s" % col[1]
-
-	colspec = "%s %s" % (colname, coltype)
-
-	# add only the new column to the table
-	if colname not in all_cols_tt:
+        # skip the vector column which is used for join
+        colname = col[0]
+        if colname == column:
+            continue
+        colnames.append(colname)
+        # add only the new columns to the table
+        if colname in all_cols_tt:
+            continue
+        # Sqlite 3 does not support the precision number any more
+        if len(col) > 2 and driver != "sqlite":
+            coltype = "%s(%s)" % (col[1], col[2])
+        else:
+            coltype = "%s" % col[1]
+        colspecs.append("%s %s" % (colname, coltype))
+    times.append((_("Checking the tables"), time.time() - start))
+
+    if colspecs:
+        start = time.time()
+        try:
+            grass.run_command('v.db.addcolumn', map=map,
+                              columns=','.join(colspecs), layer=layer)
+        except CalledModuleError:
+            grass.fatal(_("Error creating columns <%s>") %
+                        ', '.join(colspecs))
+        times.append((_("Adding the columns"), time.time() - start))
+
+    if not colnames:
+        report_times(times)
+        grass.vector_history(map)
+        return 0
+
+    # an index on the join column of the other table avoids scanning the
+    # other table for each row, it is removed at the end
+    start = time.time()
+    index = "%s_vdbjoin_%d" % (otable.replace('.', '_'), os.getpid())
+    try:
+        grass.write_command('db.execute', input='-',
+                            stdin="CREATE INDEX %s ON %s (%s);" %
+                            (index, otable, ocolumn),
+                            database=database, driver=driver,
+                            stderr=nuldev)
+    except CalledModuleError:
+        grass.verbose(_("Unable to create an index on column <%s> of "
+                        "table <%s>") % (ocolumn, otable))
+        index = None
+    times.append((_("Indexing the other table"), time.time() - start))
+
+    # all the columns are updated by one statement, with a pass on the table
+    select = "(SELECT $colname FROM $otable WHERE $otable.$ocolumn=$table.$column)"
+    template = string.Template("$colname=%s" % select)
+    stmt = "UPDATE %s SET %s;" % (maptable, ', '.join(
+        [template.substitute(table=maptable, column=column, otable=otable,
+                             ocolumn=ocolumn, colname=colname)
+         for colname in colnames]))
+    grass.debug(stmt, 1)
+    grass.verbose(_("Updating columns <%s> of vector map <%s>...") %
+                  (', '.join(colnames), map))
+    start = time.time()
+    try:
+        grass.write_command('db.execute', stdin=stmt, input='-',
+                            database=database, driver=driver)
+    except CalledModuleError:
+        grass.fatal(_("Error filling columns <%s>") % ', '.join(colnames))
+    finally:
+        if index:
+            if driver == 'mysql':
+                drop = "DROP INDEX %s ON %s;" % (index, otable)
+            elif '.' in otable:
+                # the index is in the schema of the table
+                drop = "DROP INDEX %s.%s;" % (otable.split('.')[0], index)
+            else:
+                drop = "DROP INDEX %s;" % index
             try:
-                grass.run_command('v.db.addcolumn', map=map,
-                                  columns=colspec, layer=layer)
+                grass.write_command('db.execute', input='-', stdin=drop,
+                                    database=database, driver=driver)
             except CalledModuleError:
-                grass.fatal(_("Error creating column <%s>") % colname)
+                grass.warning(_("Unable to remove index <%s>") % index)
+    times.append((_("Filling the columns"), time.time() - start))
 
-	stmt = template.substitute(table = maptable, column = column,
-				   otable = otable, ocolumn = ocolumn,
-				   colname = colname)
-        grass.debug(stmt, 1)
-        grass.verbose(_("Updating column <%s> of vector map <%s>...") % (colname, map))
-        try:
-            grass.write_command('db.execute', stdin=stmt, input='-',
-                                database=database, driver=driver)
-        except CalledModuleError:
-            grass.fatal(_("Error filling column <%s>") % colname)
+    report_times(times)
 
     # write cmd history
     grass.vector_history(map)
@@ -156,4 +217,5 @@ def main():
     return 0
 if __name__ == "__main__":
     options, flags = grass.parser()
+    nuldev = open(os.devnull, 'w')
     sys.exit(main())
@@ -28,8 +28,9 @@
 #%option G_OPT_V_FIELD
 #%end
 #%option G_OPT_DB_COLUMN
-#% description: Name of attribute column on which to calculate statistics (must be numeric)
+#% description: Name of attribute column(s) on which to calculate statistics (must be numeric)
 #% required: yes
+#% multiple: yes
 #%end
 #%option G_OPT_DB_WHERE
 #%end
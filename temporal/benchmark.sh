@@ -11,7 +11,8 @@ export GRASS_OVERWRITE=1
 MAP_LIST="map_list.txt"
 rm ${MAP_LIST}
 
-NUM_MAPS=10000
+# Set NUM_MAPS in the environment to change the number of maps
+NUM_MAPS=${NUM_MAPS:-10000}
 
 echo "### Generate raster maps"
 
@@ -30,14 +31,15 @@ time t.create type=strds temporaltype=absolute output=bench2 title="Bench2" desc
 time t.create type=strds temporaltype=absolute output=bench3 title="Bench3" descr="Bench3"
 time t.create type=strds temporaltype=absolute output=bench4 title="Bench4" descr="Bench4"
 
+# The verbose flag reports the time spent in each registration phase
 echo "### Register maps"
-time t.register -i input=bench1  file=${MAP_LIST} start="2001-01-01 00:00:00" increment="1 day"
+time t.register --v -i input=bench1  file=${MAP_LIST} start="2001-01-01 00:00:00" increment="1 day"
 echo "### Register maps again"
-time t.register input=bench2  file=${MAP_LIST}
+time t.register --v input=bench2  file=${MAP_LIST}
 echo "### Register maps again"
-time t.register input=bench3  file=${MAP_LIST}
+time t.register --v input=bench3  file=${MAP_LIST}
 echo "### Register maps again"
-time t.register input=bench4  file=${MAP_LIST}
+time t.register --v input=bench4  file=${MAP_LIST}
 
 echo "### List maps"
 time t.rast.list input=bench1 column=name,start_time > "/dev/null"
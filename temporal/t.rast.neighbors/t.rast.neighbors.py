@@ -78,6 +78,7 @@ import copy
 import grass.script as grass
 import grass.temporal as tgis
 import grass.pygrass.modules as pymod
+from grass.exceptions import GrassError
 
 
 ############################################################################
@@ -141,7 +142,16 @@ def main():
         process_queue.put(mod)
 
     # Wait for unfinished processes
-    process_queue.wait()
+    try:
+        process_queue.wait()
+    except GrassError as e:
+        # Remove the maps already computed
+        names = [map.get_name() for map in new_maps if map.map_exists()]
+        if names:
+            grass.run_command("g.remove", flags='f', type='raster',
+                              name=",".join(names), quiet=True)
+        dbif.close()
+        grass.fatal(_("Error in computation process: %s") % e)
 
     # Open the new space time raster dataset
     ttype, stype, title, descr = sp.get_initial_values()
@@ -33,11 +33,31 @@
 #% guisection: Formatting
 #%end
 
+#%option G_OPT_R_MAP
+#% key: zones
+#% description: Raster map used for zoning, must be of type CELL
+#% required: no
+#%end
+
+#%option
+#% key: nprocs
+#% type: integer
+#% description: Number of processes used to compute the statistics in parallel
+#% required: no
+#% multiple: no
+#% answer: 1
+#%end
+
 #%flag
 #% key: e
 #% description: Calculate extended statistics
 #%end
 
+#%flag
+#% key: a
+#% description: Approximate the extended statistics of large maps with a bounded amount of memory
+#%end
+
 #%flag
 #% key: s
 #% description: Suppress printing of column names
@@ -56,14 +76,18 @@ def main():
     input = options["input"]
     where = options["where"]
     extended = flags["e"]
+    approximate = flags["a"]
     no_header = flags["s"]
     separator = grass.separator(options["separator"])
+    zones = options["zones"]
+    nprocs = int(options["nprocs"])
 
     # Make sure the temporal database exists
     tgis.init()
 
     tgis.print_gridded_dataset_univar_statistics(
-        "strds", input, where, extended, no_header, separator)
+        "strds", input, where, extended, no_header, separator, nprocs, zones,
+        approximate)
 
 if __name__ == "__main__":
     options, flags = grass.parser()